@@ -0,0 +1,928 @@
+/*
+  Name:     _csample.c
+  Purpose:  Python extension module exposing the exact samplers.
+  Author:   F. A. Saad
+  Copyright (C) 2020 Feras A. Saad, All Rights Reserved.
+
+  Released under Apache 2.0; refer to LICENSE.txt
+*/
+
+#define PY_SSIZE_T_CLEAN
+#include <Python.h>
+#include <pythread.h>
+
+#include <limits.h>
+#include <stdbool.h>
+#include <stdint.h>
+#include <stdlib.h>
+
+#include "fldr.h"
+#include "flip.h"
+#include "sample.h"
+#include "sstructs.h"
+
+// Convert a Python sequence of integers into an array_s.
+static int load_array(PyObject *obj, struct array_s *x) {
+    PyObject *seq = PySequence_Fast(obj, "expected a sequence of integers");
+    if (seq == NULL) {
+        return -1;
+    }
+    Py_ssize_t length = PySequence_Fast_GET_SIZE(seq);
+    if (INT_MAX < length) {
+        PyErr_SetString(PyExc_OverflowError, "sequence is too long");
+        Py_DECREF(seq);
+        return -1;
+    }
+    x->length = (int) length;
+    x->mapped = 0;
+    x->a = (int *) calloc(length ? length : 1, sizeof(int));
+    if (x->a == NULL) {
+        PyErr_NoMemory();
+        Py_DECREF(seq);
+        return -1;
+    }
+    for (Py_ssize_t i = 0; i < length; i++) {
+        long v = PyLong_AsLong(PySequence_Fast_GET_ITEM(seq, i));
+        if ((v == -1 && PyErr_Occurred()) || v < INT_MIN || INT_MAX < v) {
+            if (!PyErr_Occurred()) {
+                PyErr_SetString(PyExc_OverflowError,
+                    "integer does not fit in a C int");
+            }
+            free(x->a);
+            Py_DECREF(seq);
+            return -1;
+        }
+        x->a[i] = (int) v;
+    }
+    Py_DECREF(seq);
+    return 0;
+}
+
+static void free_array(struct array_s x) {
+    free(x.a);
+}
+
+// Convert a Python sequence of sequences of integers into a matrix_s.
+static int load_matrix(PyObject *obj, struct matrix_s *x) {
+    PyObject *seq = PySequence_Fast(obj, "expected a sequence of rows");
+    if (seq == NULL) {
+        return -1;
+    }
+    Py_ssize_t nrows = PySequence_Fast_GET_SIZE(seq);
+    if (INT_MAX < nrows) {
+        PyErr_SetString(PyExc_OverflowError, "sequence is too long");
+        Py_DECREF(seq);
+        return -1;
+    }
+    x->nrows = (int) nrows;
+    x->ncols = 0;
+    x->mapped = 0;
+    x->P = (int **) calloc(nrows ? nrows : 1, sizeof(int *));
+    if (x->P == NULL) {
+        PyErr_NoMemory();
+        Py_DECREF(seq);
+        return -1;
+    }
+    for (Py_ssize_t r = 0; r < nrows; r++) {
+        struct array_s row;
+        if (load_array(PySequence_Fast_GET_ITEM(seq, r), &row) < 0
+                || (0 < r && row.length != x->ncols)) {
+            if (!PyErr_Occurred()) {
+                free_array(row);
+                PyErr_SetString(PyExc_ValueError, "rows must have equal length");
+            }
+            x->nrows = (int) r;
+            for (int i = 0; i < x->nrows; i++) {
+                free(x->P[i]);
+            }
+            free(x->P);
+            Py_DECREF(seq);
+            return -1;
+        }
+        x->ncols = row.length;
+        x->P[r] = row.a;
+    }
+    Py_DECREF(seq);
+    return 0;
+}
+
+static void free_matrix(struct matrix_s x) {
+    for (int i = 0; i < x.nrows; i++) {
+        free(x.P[i]);
+    }
+    free(x.P);
+}
+
+// Return 0 if cdf is nondecreasing from 0 to Z > 0, and -1 otherwise.
+static int check_cdf(struct array_s cdf, int Z) {
+    if (Z < 1 || cdf.length < 2 || cdf.a[0] != 0 || cdf.a[cdf.length-1] != Z) {
+        return -1;
+    }
+    for (int i = 1; i < cdf.length; i++) {
+        if (cdf.a[i] < cdf.a[i-1]) {
+            return -1;
+        }
+    }
+    return 0;
+}
+
+// Return 0 if the random walk over levels 0, ..., k-1 of a DDG tree with
+// h[c] leaves at level c stays in range, and -1 otherwise.  After level
+// k-1 the walk moves to level l if cyclic, else every walk must stop by
+// level k-1.  The walk is at index d <= m on arrival at a level, which
+// must not overflow an int.
+static int check_levels(const int *h, int k, int l, int cyclic) {
+    if (k < 1 || l < 0 || k < l) {
+        return -1;
+    }
+    for (int c = 0; c < k; c++) {
+        if (h[c] < 0) {
+            return -1;
+        }
+    }
+    int64_t m = 1;
+    int64_t m_cycle = -1;
+    int c = 0;
+    while (true) {
+        if (m < h[c]) {
+            return 0;
+        }
+        m = 2 * (m - h[c]) + 1;
+        if (INT_MAX / 2 < m) {
+            return -1;
+        }
+        if (c < k - 1) {
+            c = c + 1;
+            continue;
+        }
+        if (!cyclic || l == k) {
+            return -1;
+        }
+        // The walk repeats levels l, ..., k-1 from a start no larger
+        // than before, so d stays bounded.
+        if (0 <= m_cycle && m <= m_cycle) {
+            return 0;
+        }
+        m_cycle = m;
+        c = l;
+    }
+}
+
+// Return 0 if enc is a packed tree whose pointers stay in enc and whose
+// leaves have labels in 1, ..., n, and -1 otherwise.
+static int check_encoding(struct array_s enc, int n) {
+    if (n < 1 || enc.length < 2) {
+        return -1;
+    }
+    int *a = enc.a;
+    int *stack = (int *) calloc(enc.length, sizeof(int));
+    char *seen = (char *) calloc(enc.length, sizeof(char));
+    if (stack == NULL || seen == NULL) {
+        free(stack);
+        free(seen);
+        return -1;
+    }
+    int status = 0;
+    int size = 1;
+    stack[0] = 0;
+    seen[0] = 1;
+    while (0 < size && status == 0) {
+        int c = stack[--size];
+        if (enc.length - 1 <= c) {
+            status = -1;
+            break;
+        }
+        for (int b = 0; b < 2; b++) {
+            int child = a[c + b];
+            if (child < 0 || enc.length <= child) {
+                status = -1;
+            } else if (a[child] < 0) {
+                if (n < -a[child]) {
+                    status = -1;
+                }
+            } else if (!seen[child]) {
+                seen[child] = 1;
+                stack[size++] = child;
+            }
+        }
+    }
+    free(stack);
+    free(seen);
+    return status;
+}
+
+// Acquire the caller-supplied output buffer, which must hold C ints.
+static int load_output(PyObject *obj, Py_buffer *view) {
+    int flags = PyBUF_WRITABLE | PyBUF_FORMAT | PyBUF_C_CONTIGUOUS;
+    if (PyObject_GetBuffer(obj, view, flags) < 0) {
+        return -1;
+    }
+    const char *fmt = view->format;
+    if (fmt[0] == '@' || fmt[0] == '=' || fmt[0] == '<') {
+        fmt++;
+    }
+    if (view->itemsize != sizeof(int) || fmt[0] != 'i' || fmt[1] != '\0') {
+        PyErr_SetString(PyExc_TypeError, "output buffer must hold C ints");
+        PyBuffer_Release(view);
+        return -1;
+    }
+    return 0;
+}
+
+// The bit stream in flip.c is shared, so the samplers hold flip_lock while
+// the GIL is released.
+static PyThread_type_lock flip_lock = NULL;
+
+// Fill the output buffer by repeatedly calling func_sample on &x.
+#define FILL_OUTPUT(view, func_sample, x) { \
+        int *out = (int *) (view).buf; \
+        Py_ssize_t size = (view).len / sizeof(int); \
+        Py_BEGIN_ALLOW_THREADS \
+        PyThread_acquire_lock(flip_lock, WAIT_LOCK); \
+        for (Py_ssize_t i = 0; i < size; i++) { \
+            out[i] = func_sample(&(x)); \
+        } \
+        PyThread_release_lock(flip_lock); \
+        Py_END_ALLOW_THREADS \
+        PyBuffer_Release(&(view)); \
+    }
+
+static PyObject *py_seed(PyObject *self, PyObject *args) {
+    unsigned int seed;
+    if (!PyArg_ParseTuple(args, "I", &seed)) {
+        return NULL;
+    }
+    Py_BEGIN_ALLOW_THREADS
+    PyThread_acquire_lock(flip_lock, WAIT_LOCK);
+    flip_seed(seed);
+    PyThread_release_lock(flip_lock);
+    Py_END_ALLOW_THREADS
+    Py_RETURN_NONE;
+}
+
+static PyObject *py_seed_chacha20(PyObject *self, PyObject *args) {
+    const unsigned char *key;
+    Py_ssize_t length;
+    uint32_t words[8];
+    if (!PyArg_ParseTuple(args, "y#", &key, &length)) {
+        return NULL;
+    }
+    if (length != 32) {
+        PyErr_SetString(PyExc_ValueError, "key must have 32 bytes");
+        return NULL;
+    }
+    for (int i = 0; i < 8; i++) {
+        words[i] = (uint32_t) key[4*i]
+            | ((uint32_t) key[4*i + 1] << 8)
+            | ((uint32_t) key[4*i + 2] << 16)
+            | ((uint32_t) key[4*i + 3] << 24);
+    }
+    Py_BEGIN_ALLOW_THREADS
+    PyThread_acquire_lock(flip_lock, WAIT_LOCK);
+    flip_seed_chacha20(words);
+    PyThread_release_lock(flip_lock);
+    Py_END_ALLOW_THREADS
+    Py_RETURN_NONE;
+}
+
+static PyObject *py_num_rng_calls(PyObject *self, PyObject *args) {
+    return PyLong_FromUnsignedLong(NUM_RNG_CALLS);
+}
+
+static PyObject *py_sample_encoding(PyObject *args, int trivial,
+        int (*func_sample)(struct sample_ky_encoding_s *)) {
+    PyObject *enc, *out;
+    struct sample_ky_encoding_s x;
+    Py_buffer view;
+    if (!PyArg_ParseTuple(args, "OiiO", &enc, &(x.n), &(x.k), &out)) {
+        return NULL;
+    }
+    if (load_array(enc, &(x.encoding)) < 0) {
+        return NULL;
+    }
+    // The KY sampler returns 1 for the encoding of a single outcome.
+    if (!(trivial && x.encoding.length == 1)
+            && check_encoding(x.encoding, x.n) < 0) {
+        PyErr_SetString(PyExc_ValueError,
+            "enc must be a packed tree with leaves labelled 1, ..., n");
+        free_array(x.encoding);
+        return NULL;
+    }
+    if (load_output(out, &view) < 0) {
+        free_array(x.encoding);
+        return NULL;
+    }
+    FILL_OUTPUT(view, func_sample, x);
+    free_array(x.encoding);
+    Py_RETURN_NONE;
+}
+
+static PyObject *py_sample_ky_encoding(PyObject *self, PyObject *args) {
+    return py_sample_encoding(args, 1, sample_ky_encoding);
+}
+
+static PyObject *py_sample_rejection_encoding(PyObject *self, PyObject *args) {
+    return py_sample_encoding(args, 0, sample_rejection_encoding);
+}
+
+// Return 0 if the entries of P are bits and its k columns form the
+// levels of a DDG tree as in check_levels, and -1 otherwise.
+static int check_matrix(struct matrix_s P, int k, int l) {
+    if (P.nrows < 1 || k < 1 || P.ncols != k) {
+        return -1;
+    }
+    int *h = (int *) calloc(k, sizeof(int));
+    if (h == NULL) {
+        return -1;
+    }
+    for (int r = 0; r < P.nrows; r++) {
+        for (int c = 0; c < k; c++) {
+            if (P.P[r][c] != 0 && P.P[r][c] != 1) {
+                free(h);
+                return -1;
+            }
+            h[c] += P.P[r][c];
+        }
+    }
+    int status = check_levels(h, k, l, 1);
+    free(h);
+    return status;
+}
+
+static PyObject *py_sample_matrix(PyObject *args,
+        int (*func_sample)(struct sample_ky_matrix_s *)) {
+    PyObject *P, *out;
+    struct sample_ky_matrix_s x;
+    Py_buffer view;
+    if (!PyArg_ParseTuple(args, "OiiO", &P, &(x.k), &(x.l), &out)) {
+        return NULL;
+    }
+    if (load_matrix(P, &(x.P)) < 0) {
+        return NULL;
+    }
+    if (x.P.nrows != 1 && check_matrix(x.P, x.k, x.l) < 0) {
+        PyErr_SetString(PyExc_ValueError,
+            "P must have k columns of bits forming a DDG tree");
+        free_matrix(x.P);
+        return NULL;
+    }
+    if (load_output(out, &view) < 0) {
+        free_matrix(x.P);
+        return NULL;
+    }
+    FILL_OUTPUT(view, func_sample, x);
+    free_matrix(x.P);
+    Py_RETURN_NONE;
+}
+
+static PyObject *py_sample_ky_matrix(PyObject *self, PyObject *args) {
+    return py_sample_matrix(args, sample_ky_matrix);
+}
+
+static PyObject *py_sample_rejection_matrix(PyObject *self, PyObject *args) {
+    return py_sample_matrix(args, sample_rejection_matrix);
+}
+
+// Return 0 if h has at most T.nrows leaves per level, forming a DDG tree
+// as in check_levels, and the labels of the leaves of T are rows of T.
+static int check_matrix_cached(struct array_s h, struct matrix_s T,
+        int k, int l, int cyclic) {
+    if (h.length != k || T.nrows < 1 || T.ncols != k) {
+        return -1;
+    }
+    for (int c = 0; c < k; c++) {
+        if (T.nrows < h.a[c]) {
+            return -1;
+        }
+        for (int d = 0; d < h.a[c]; d++) {
+            if (T.P[d][c] < 0 || T.nrows <= T.P[d][c]) {
+                return -1;
+            }
+        }
+    }
+    return check_levels(h.a, k, l, cyclic);
+}
+
+static PyObject *py_sample_matrix_cached(PyObject *args, int cyclic,
+        int (*func_sample)(struct sample_ky_matrix_cached_s *)) {
+    PyObject *h, *T, *out;
+    struct sample_ky_matrix_cached_s x;
+    Py_buffer view;
+    if (!PyArg_ParseTuple(args, "iiOOO", &(x.k), &(x.l), &h, &T, &out)) {
+        return NULL;
+    }
+    if (load_array(h, &(x.h)) < 0) {
+        return NULL;
+    }
+    if (load_matrix(T, &(x.T)) < 0) {
+        free_array(x.h);
+        return NULL;
+    }
+    if (x.k < 1 || x.l < 0 || x.k < x.l || x.h.length != x.k
+            || x.T.nrows < 1 || x.T.ncols != x.k) {
+        PyErr_SetString(PyExc_ValueError,
+            "h and the rows of T must have k entries, with 0 <= l <= k");
+        free_array(x.h);
+        free_matrix(x.T);
+        return NULL;
+    }
+    if (!(cyclic && x.T.nrows == 1)
+            && check_matrix_cached(x.h, x.T, x.k, x.l, cyclic) < 0) {
+        PyErr_SetString(PyExc_ValueError,
+            "h and T must form a DDG tree with labels in the rows of T");
+        free_array(x.h);
+        free_matrix(x.T);
+        return NULL;
+    }
+    if (load_output(out, &view) < 0) {
+        free_array(x.h);
+        free_matrix(x.T);
+        return NULL;
+    }
+    FILL_OUTPUT(view, func_sample, x);
+    free_array(x.h);
+    free_matrix(x.T);
+    Py_RETURN_NONE;
+}
+
+static PyObject *py_sample_ky_matrix_cached(PyObject *self, PyObject *args) {
+    return py_sample_matrix_cached(args, 1, sample_ky_matrix_cached);
+}
+
+static PyObject *py_sample_rejection_matrix_cached(PyObject *self,
+        PyObject *args) {
+    return py_sample_matrix_cached(args, 0, sample_rejection_matrix_cached);
+}
+
+// Return 0 if h has at most n+1 leaves per level, forming a DDG tree as
+// in check_levels, and the labels H[d*k + c] of the leaves are in 0, ..., n.
+static int check_fldr(struct array_s h, struct array_s H, int n, int k) {
+    for (int c = 0; c < k; c++) {
+        if (n + 1 < h.a[c]) {
+            return -1;
+        }
+        for (int d = 0; d < h.a[c]; d++) {
+            int s = H.a[d*k + c];
+            if (s < 0 || n < s) {
+                return -1;
+            }
+        }
+    }
+    return check_levels(h.a, k, k, 0);
+}
+
+// Return 0 if column c of H is H[offsets[c]], ..., of length h[c], the
+// columns form a DDG tree as in check_levels, and the labels are in
+// 0, ..., n.
+static int check_fldr_columns(struct array_s h, struct array_s offsets,
+        struct array_s H, int n) {
+    if (n < 1 || offsets.a[0] != 0) {
+        return -1;
+    }
+    for (int c = 0; c < h.length; c++) {
+        if ((int64_t) offsets.a[c + 1] - offsets.a[c] != h.a[c]) {
+            return -1;
+        }
+    }
+    for (int i = 0; i < H.length; i++) {
+        if (H.a[i] < 0 || n < H.a[i]) {
+            return -1;
+        }
+    }
+    return check_levels(h.a, h.length, h.length, 0);
+}
+
+static PyObject *py_sample_fldr(PyObject *self, PyObject *args) {
+    PyObject *h, *H, *out;
+    struct sample_fldr_s x;
+    struct array_s h_a, H_a;
+    Py_buffer view;
+    if (!PyArg_ParseTuple(args, "iiOOO", &(x.n), &(x.k), &h, &H, &out)) {
+        return NULL;
+    }
+    if (load_array(h, &h_a) < 0) {
+        return NULL;
+    }
+    if (load_array(H, &H_a) < 0) {
+        free_array(h_a);
+        return NULL;
+    }
+    if (x.n < 1 || x.k < 1 || h_a.length != x.k
+            || H_a.length != ((int64_t) x.n + 1) * x.k) {
+        PyErr_SetString(PyExc_ValueError,
+            "h and H must have k and (n+1)*k entries");
+        free_array(h_a);
+        free_array(H_a);
+        return NULL;
+    }
+    if (check_fldr(h_a, H_a, x.n, x.k) < 0) {
+        PyErr_SetString(PyExc_ValueError,
+            "h and H must form a DDG tree with labels in 0, ..., n");
+        free_array(h_a);
+        free_array(H_a);
+        return NULL;
+    }
+    x.h = h_a.a;
+    x.H = H_a.a;
+    if (load_output(out, &view) < 0) {
+        free_array(h_a);
+        free_array(H_a);
+        return NULL;
+    }
+    FILL_OUTPUT(view, sample_fldr, x);
+    free_array(h_a);
+    free_array(H_a);
+    Py_RETURN_NONE;
+}
+
+static PyObject *py_sample_fldr_columns(PyObject *self, PyObject *args) {
+    PyObject *h, *offsets, *H, *out;
+    struct sample_fldr_columns_s x;
+    Py_buffer view;
+    if (!PyArg_ParseTuple(args, "iOOOO", &(x.n), &h, &offsets, &H, &out)) {
+        return NULL;
+    }
+    if (load_array(h, &(x.h)) < 0) {
+        return NULL;
+    }
+    if (load_array(offsets, &(x.offsets)) < 0) {
+        free_array(x.h);
+        return NULL;
+    }
+    if (load_array(H, &(x.H)) < 0) {
+        free_array(x.h);
+        free_array(x.offsets);
+        return NULL;
+    }
+    if (x.h.length < 1 || x.offsets.length != x.h.length + 1
+            || x.offsets.a[x.h.length] != x.H.length) {
+        PyErr_SetString(PyExc_ValueError,
+            "offsets must have k+1 entries, ending at the length of H");
+        free_array(x.h);
+        free_array(x.offsets);
+        free_array(x.H);
+        return NULL;
+    }
+    if (check_fldr_columns(x.h, x.offsets, x.H, x.n) < 0) {
+        PyErr_SetString(PyExc_ValueError,
+            "h, offsets and H must form a DDG tree with labels in 0, ..., n");
+        free_array(x.h);
+        free_array(x.offsets);
+        free_array(x.H);
+        return NULL;
+    }
+    if (load_output(out, &view) < 0) {
+        free_array(x.h);
+        free_array(x.offsets);
+        free_array(x.H);
+        return NULL;
+    }
+    FILL_OUTPUT(view, sample_fldr_columns, x);
+    free_array(x.h);
+    free_array(x.offsets);
+    free_array(x.H);
+    Py_RETURN_NONE;
+}
+
+// Return (k, h, H) for weights given as a buffer of 64-bit limbs.
+static PyObject *py_preprocess_fldr(PyObject *self, PyObject *args) {
+    PyObject *limbs;
+    int nlimbs;
+    Py_buffer view;
+    struct sample_fldr_s x;
+    if (!PyArg_ParseTuple(args, "Oi", &limbs, &nlimbs)) {
+        return NULL;
+    }
+    int flags = PyBUF_FORMAT | PyBUF_C_CONTIGUOUS;
+    if (PyObject_GetBuffer(limbs, &view, flags) < 0) {
+        return NULL;
+    }
+    const char *fmt = view.format;
+    if (fmt[0] == '@' || fmt[0] == '=' || fmt[0] == '<') {
+        fmt++;
+    }
+    if (view.itemsize != sizeof(uint64_t) || fmt[1] != '\0'
+            || (fmt[0] != 'Q' && fmt[0] != 'L')) {
+        PyErr_SetString(PyExc_TypeError,
+            "limbs must hold unsigned 64-bit ints");
+        PyBuffer_Release(&view);
+        return NULL;
+    }
+    Py_ssize_t count = view.len / sizeof(uint64_t);
+    if (nlimbs < 1 || view.len % (sizeof(uint64_t) * nlimbs) != 0
+            || INT_MAX / 2 < count / nlimbs) {
+        PyErr_SetString(PyExc_ValueError, "invalid buffer of limbs");
+        PyBuffer_Release(&view);
+        return NULL;
+    }
+    int n = (int) (count / nlimbs);
+    const uint64_t *a = (const uint64_t *) view.buf;
+    int status = (nlimbs == 1)
+        ? preprocess_fldr_u64(a, n, &x)
+        : preprocess_fldr_mw(a, n, nlimbs, &x);
+    PyBuffer_Release(&view);
+    if (status < 0) {
+        PyErr_SetString(PyExc_ValueError, "weights must have a positive sum");
+        return NULL;
+    }
+    PyObject *h = PyList_New(x.k);
+    PyObject *H = PyList_New((Py_ssize_t) (n + 1) * x.k);
+    if (h == NULL || H == NULL) {
+        Py_XDECREF(h);
+        Py_XDECREF(H);
+        free_sample_fldr_s(x);
+        return NULL;
+    }
+    for (int j = 0; j < x.k; j++) {
+        PyList_SET_ITEM(h, j, PyLong_FromLong(x.h[j]));
+    }
+    for (Py_ssize_t i = 0; i < (Py_ssize_t) (n + 1) * x.k; i++) {
+        PyList_SET_ITEM(H, i, PyLong_FromLong(x.H[i]));
+    }
+    int k = x.k;
+    free_sample_fldr_s(x);
+    return Py_BuildValue("iNN", k, h, H);
+}
+
+static PyObject *py_sample_fdr(PyObject *self, PyObject *args) {
+    PyObject *out;
+    struct sample_fdr_s x;
+    Py_buffer view;
+    if (!PyArg_ParseTuple(args, "iO", &(x.n), &out)) {
+        return NULL;
+    }
+    if (x.n < 1) {
+        PyErr_SetString(PyExc_ValueError, "n must be positive");
+        return NULL;
+    }
+    if (load_output(out, &view) < 0) {
+        return NULL;
+    }
+    FILL_OUTPUT(view, sample_fdr, x);
+    Py_RETURN_NONE;
+}
+
+static PyObject *py_sample_inversion_bernoulli(PyObject *self, PyObject *args) {
+    PyObject *out;
+    struct sample_inversion_bernoulli_s x;
+    Py_buffer view;
+    if (!PyArg_ParseTuple(args, "iiO", &(x.a), &(x.M), &out)) {
+        return NULL;
+    }
+    if (x.M < 1 || x.a < 0 || x.M < x.a) {
+        PyErr_SetString(PyExc_ValueError, "must have 0 <= a <= M and 0 < M");
+        return NULL;
+    }
+    if (load_output(out, &view) < 0) {
+        return NULL;
+    }
+    FILL_OUTPUT(view, sample_inversion_bernoulli, x);
+    Py_RETURN_NONE;
+}
+
+static PyObject *py_sample_rejection_uniform(PyObject *self, PyObject *args) {
+    PyObject *Ms, *out;
+    struct sample_rejection_uniform_s x;
+    Py_buffer view;
+    if (!PyArg_ParseTuple(args, "OiiO", &Ms, &(x.M), &(x.n), &out)) {
+        return NULL;
+    }
+    if (load_array(Ms, &(x.Ms)) < 0) {
+        return NULL;
+    }
+    int positive = 0;
+    for (int i = 0; i < x.Ms.length; i++) {
+        if (x.Ms.a[i] < 0 || x.M < x.Ms.a[i]) {
+            positive = -1;
+            break;
+        }
+        positive = positive || (0 < x.Ms.a[i]);
+    }
+    if (x.n < 1 || x.Ms.length != x.n || positive != 1) {
+        PyErr_SetString(PyExc_ValueError,
+            "Ms must have n entries in [0, M], not all zero");
+        free_array(x.Ms);
+        return NULL;
+    }
+    x.ratios = (struct sample_inversion_bernoulli_s *)
+        calloc(x.Ms.length, sizeof(struct sample_inversion_bernoulli_s));
+    if (x.ratios == NULL) {
+        free_array(x.Ms);
+        return PyErr_NoMemory();
+    }
+    for (int i = 0; i < x.Ms.length; i++) {
+        struct sample_inversion_bernoulli_s y = {.a = x.Ms.a[i], .M = x.M};
+        x.ratios[i] = y;
+    }
+    if (load_output(out, &view) < 0) {
+        free_array(x.Ms);
+        free(x.ratios);
+        return NULL;
+    }
+    FILL_OUTPUT(view, sample_rejection_uniform, x);
+    free_array(x.Ms);
+    free(x.ratios);
+    Py_RETURN_NONE;
+}
+
+static PyObject *py_sample_rejection_hash_table(PyObject *self,
+        PyObject *args) {
+    PyObject *T, *out;
+    struct sample_rejection_hash_table_s x;
+    Py_buffer view;
+    if (!PyArg_ParseTuple(args, "OiiO", &T, &(x.Z), &(x.k), &out)) {
+        return NULL;
+    }
+    if (load_array(T, &(x.T)) < 0) {
+        return NULL;
+    }
+    if (x.k < 0 || 30 < x.k || x.Z < 1 || (1 << x.k) < x.Z
+            || x.T.length != x.Z) {
+        PyErr_SetString(PyExc_ValueError,
+            "T must have Z entries, with 0 < Z <= 2**k <= 2**30");
+        free_array(x.T);
+        return NULL;
+    }
+    if (load_output(out, &view) < 0) {
+        free_array(x.T);
+        return NULL;
+    }
+    FILL_OUTPUT(view, sample_rejection_hash_table, x);
+    free_array(x.T);
+    Py_RETURN_NONE;
+}
+
+static PyObject *py_sample_rejection_binary_search(PyObject *self,
+        PyObject *args) {
+    PyObject *cdf, *out;
+    struct sample_rejection_binary_search_s x;
+    Py_buffer view;
+    if (!PyArg_ParseTuple(args, "OiiO", &cdf, &(x.Z), &(x.k), &out)) {
+        return NULL;
+    }
+    if (load_array(cdf, &(x.cdf)) < 0) {
+        return NULL;
+    }
+    if (x.k < 0 || 30 < x.k || (1 << x.k) < x.Z
+            || check_cdf(x.cdf, x.Z) < 0) {
+        PyErr_SetString(PyExc_ValueError,
+            "cdf must run from 0 to Z, with 0 < Z <= 2**k <= 2**30");
+        free_array(x.cdf);
+        return NULL;
+    }
+    if (load_output(out, &view) < 0) {
+        free_array(x.cdf);
+        return NULL;
+    }
+    FILL_OUTPUT(view, sample_rejection_binary_search, x);
+    free_array(x.cdf);
+    Py_RETURN_NONE;
+}
+
+static PyObject *py_sample_interval(PyObject *self, PyObject *args) {
+    PyObject *cdf, *out;
+    struct sample_interval_s x;
+    Py_buffer view;
+    if (!PyArg_ParseTuple(args, "OiiO", &cdf, &(x.Z), &(x.k), &out)) {
+        return NULL;
+    }
+    if (load_array(cdf, &(x.cdf)) < 0) {
+        return NULL;
+    }
+    if (check_cdf(x.cdf, x.Z) < 0) {
+        PyErr_SetString(PyExc_ValueError,
+            "cdf must run from 0 to Z, with 0 < Z");
+        free_array(x.cdf);
+        return NULL;
+    }
+    if (load_output(out, &view) < 0) {
+        free_array(x.cdf);
+        return NULL;
+    }
+    FILL_OUTPUT(view, sample_interval, x);
+    free_array(x.cdf);
+    Py_RETURN_NONE;
+}
+
+static PyObject *py_sample_alias_exact(PyObject *self, PyObject *args) {
+    PyObject *qs, *Ms, *j, *out;
+    struct sample_alias_exact_s x;
+    struct array_s qs_a, Ms_a;
+    Py_buffer view;
+    if (!PyArg_ParseTuple(args, "iOOOO", &(x.n), &qs, &Ms, &j, &out)) {
+        return NULL;
+    }
+    if (load_array(qs, &qs_a) < 0) {
+        return NULL;
+    }
+    if (load_array(Ms, &Ms_a) < 0) {
+        free_array(qs_a);
+        return NULL;
+    }
+    if (load_array(j, &(x.j)) < 0) {
+        free_array(qs_a);
+        free_array(Ms_a);
+        return NULL;
+    }
+    int valid = (0 < x.n && qs_a.length == x.n && Ms_a.length == x.n
+        && x.j.length == x.n);
+    for (int i = 0; valid && i < x.n; i++) {
+        valid = (0 < Ms_a.a[i] && 0 <= qs_a.a[i] && qs_a.a[i] <= Ms_a.a[i]
+            && 0 <= x.j.a[i] && x.j.a[i] < x.n);
+    }
+    if (!valid) {
+        PyErr_SetString(PyExc_ValueError,
+            "qs, Ms, and j must have length n, with 0 <= qs <= Ms "
+            "and 0 <= j < n");
+        free_array(qs_a);
+        free_array(Ms_a);
+        free_array(x.j);
+        return NULL;
+    }
+    x.ratios = (struct sample_inversion_bernoulli_s *)
+        calloc(x.n, sizeof(struct sample_inversion_bernoulli_s));
+    if (x.ratios == NULL) {
+        free_array(qs_a);
+        free_array(Ms_a);
+        free_array(x.j);
+        return PyErr_NoMemory();
+    }
+    for (int i = 0; i < x.n; i++) {
+        struct sample_inversion_bernoulli_s y = {.a = qs_a.a[i], .M = Ms_a.a[i]};
+        x.ratios[i] = y;
+    }
+    free_array(qs_a);
+    free_array(Ms_a);
+    if (load_output(out, &view) < 0) {
+        free_array(x.j);
+        free(x.ratios);
+        return NULL;
+    }
+    FILL_OUTPUT(view, sample_alias_exact, x);
+    free_array(x.j);
+    free(x.ratios);
+    Py_RETURN_NONE;
+}
+
+static PyMethodDef CSampleMethods[] = {
+    {"seed", py_seed, METH_VARARGS,
+        "seed(s): Reset the bit stream using seed s."},
+    {"seed_chacha20", py_seed_chacha20, METH_VARARGS,
+        "seed_chacha20(key): Reset the bit stream to the ChaCha20 keystream."},
+    {"num_rng_calls", py_num_rng_calls, METH_NOARGS,
+        "num_rng_calls(): Return number of calls to the PRNG."},
+    {"sample_ky_encoding", py_sample_ky_encoding, METH_VARARGS,
+        "sample_ky_encoding(enc, n, k, out)"},
+    {"sample_ky_matrix", py_sample_ky_matrix, METH_VARARGS,
+        "sample_ky_matrix(P, k, l, out)"},
+    {"sample_ky_matrix_cached", py_sample_ky_matrix_cached, METH_VARARGS,
+        "sample_ky_matrix_cached(k, l, h, T, out)"},
+    {"sample_fdr", py_sample_fdr, METH_VARARGS,
+        "sample_fdr(n, out)"},
+    {"sample_inversion_bernoulli", py_sample_inversion_bernoulli, METH_VARARGS,
+        "sample_inversion_bernoulli(a, M, out)"},
+    {"sample_rejection_uniform", py_sample_rejection_uniform, METH_VARARGS,
+        "sample_rejection_uniform(Ms, M, n, out)"},
+    {"sample_rejection_hash_table", py_sample_rejection_hash_table,
+        METH_VARARGS, "sample_rejection_hash_table(T, Z, k, out)"},
+    {"sample_rejection_binary_search", py_sample_rejection_binary_search,
+        METH_VARARGS, "sample_rejection_binary_search(cdf, Z, k, out)"},
+    {"sample_rejection_encoding", py_sample_rejection_encoding, METH_VARARGS,
+        "sample_rejection_encoding(enc, n, k, out)"},
+    {"sample_rejection_matrix", py_sample_rejection_matrix, METH_VARARGS,
+        "sample_rejection_matrix(P, k, l, out)"},
+    {"sample_rejection_matrix_cached", py_sample_rejection_matrix_cached,
+        METH_VARARGS, "sample_rejection_matrix_cached(k, l, h, T, out)"},
+    {"sample_fldr", py_sample_fldr, METH_VARARGS,
+        "sample_fldr(n, k, h, H, out)"},
+    {"sample_fldr_columns", py_sample_fldr_columns, METH_VARARGS,
+        "sample_fldr_columns(n, h, offsets, H, out)"},
+    {"preprocess_fldr", py_preprocess_fldr, METH_VARARGS,
+        "preprocess_fldr(limbs, nlimbs): Return (k, h, H) of the weights."},
+    {"sample_interval", py_sample_interval, METH_VARARGS,
+        "sample_interval(cdf, Z, k, out)"},
+    {"sample_alias_exact", py_sample_alias_exact, METH_VARARGS,
+        "sample_alias_exact(n, qs, Ms, j, out)"},
+    {NULL, NULL, 0, NULL}
+};
+
+static struct PyModuleDef csamplemodule = {
+    PyModuleDef_HEAD_INIT,
+    "_csample",
+    "Exact samplers from c/sample.c.\n\n"
+    "Each sampler takes the structure returned by the corresponding\n"
+    "discrete_sampling.construct.construct_sample_* function and fills\n"
+    "the writable output buffer of C ints with independent samples.",
+    -1,
+    CSampleMethods
+};
+
+PyMODINIT_FUNC PyInit__csample(void) {
+    if (flip_lock == NULL) {
+        flip_lock = PyThread_allocate_lock();
+        if (flip_lock == NULL) {
+            return PyErr_NoMemory();
+        }
+    }
+    return PyModule_Create(&csamplemodule);
+}
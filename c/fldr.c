@@ -0,0 +1,161 @@
+/*
+  Name:     fldr.c
+  Purpose:  FLDR preprocessing for 64-bit and multiword integer weights.
+  Author:   F. A. Saad
+  Copyright (C) 2020 Feras A. Saad, All Rights Reserved.
+
+  Released under Apache 2.0; refer to LICENSE.txt
+*/
+
+// The weights a[0], ..., a[n-1] are followed by the rejection weight
+// r = 2^k - Z, where Z is their sum and k = ceil(log2(Z)).  Level j of
+// the DDG tree holds the outcomes whose weight has bit k-1-j set, stored
+// in column j of H, i.e., H[d*k + j] for d < h[j]; unused cells are -1
+// and the rejection outcome is n.  Although Z and the weights may not fit
+// in 64 bits, the counts h[j] are at most n+1 and the depth d of the
+// random walk stays below 2(n+1), so h and H are arrays of ints.
+
+#include <stdlib.h>
+#include <string.h>
+
+#include "fldr.h"
+
+static int alloc_fldr(int n, int k, struct sample_fldr_s *x) {
+    x->n = n;
+    x->k = k;
+    x->h = calloc(k ? k : 1, sizeof(int));
+    x->H = malloc((size_t) (n + 1) * (k ? k : 1) * sizeof(int));
+    if (x->h == NULL || x->H == NULL) {
+        free(x->h);
+        free(x->H);
+        return -1;
+    }
+    memset(x->H, -1, (size_t) (n + 1) * (k ? k : 1) * sizeof(int));
+    return 0;
+}
+
+static void push_fldr(struct sample_fldr_s *x, int i, int j) {
+    x->H[x->h[j] * x->k + j] = i;
+    x->h[j] += 1;
+}
+
+// Weights which fit in 64 bits; Z and r use a 128-bit accumulator.
+int preprocess_fldr_u64(const uint64_t *a, int n, struct sample_fldr_s *x) {
+    unsigned __int128 Z = 0;
+    for (int i = 0; i < n; i++) {
+        Z += a[i];
+    }
+    if (Z == 0) {
+        return -1;
+    }
+    int k = 0;
+    while (((unsigned __int128) 1 << k) < Z) {
+        k += 1;
+    }
+    k = k ? k : 1;
+    unsigned __int128 r = ((unsigned __int128) 1 << k) - Z;
+    if (alloc_fldr(n, k, x) < 0) {
+        return -1;
+    }
+    for (int j = 0; j < k; j++) {
+        int s = (k - 1) - j;
+        if (s < 64) {
+            for (int i = 0; i < n; i++) {
+                if ((a[i] >> s) & 1) {
+                    push_fldr(x, i, j);
+                }
+            }
+        }
+        if ((r >> s) & 1) {
+            push_fldr(x, n, j);
+        }
+    }
+    return 0;
+}
+
+static int get_bit(const uint64_t *w, int s) {
+    return (w[s / 64] >> (s % 64)) & 1;
+}
+
+// Weights with nlimbs 64-bit limbs each, least significant limb first,
+// so that weight i is a[i*nlimbs], ..., a[i*nlimbs + nlimbs - 1].
+int preprocess_fldr_mw(const uint64_t *a, int n, int nlimbs,
+        struct sample_fldr_s *x) {
+    // Z < n * 2^(64 nlimbs) fits in nlimbs + 1 limbs, and so does 2^k.
+    int m = nlimbs + 1;
+    uint64_t *Z = calloc(m, sizeof(uint64_t));
+    uint64_t *r = calloc(m, sizeof(uint64_t));
+    if (Z == NULL || r == NULL) {
+        free(Z);
+        free(r);
+        return -1;
+    }
+    for (int i = 0; i < n; i++) {
+        unsigned __int128 carry = 0;
+        for (int t = 0; t < m; t++) {
+            carry += Z[t];
+            if (t < nlimbs) {
+                carry += a[i*nlimbs + t];
+            }
+            Z[t] = (uint64_t) carry;
+            carry >>= 64;
+        }
+    }
+    // k is the bit length of Z - 1.
+    int k = 0;
+    int borrow = 1;
+    for (int t = 0; t < m; t++) {
+        uint64_t v = Z[t] - borrow;
+        borrow = borrow && (Z[t] == 0);
+        for (int b = 0; b < 64; b++) {
+            if ((v >> b) & 1) {
+                k = 64*t + b + 1;
+            }
+        }
+    }
+    if (borrow) {
+        // Z is zero.
+        free(Z);
+        free(r);
+        return -1;
+    }
+    k = k ? k : 1;
+    if (m * 64 <= k) {
+        free(Z);
+        free(r);
+        return -1;
+    }
+    // r = 2^k - Z.
+    r[k / 64] = (uint64_t) 1 << (k % 64);
+    borrow = 0;
+    for (int t = 0; t < m; t++) {
+        unsigned __int128 v = (unsigned __int128) r[t] - Z[t] - borrow;
+        r[t] = (uint64_t) v;
+        borrow = (v >> 64) != 0;
+    }
+    free(Z);
+    if (alloc_fldr(n, k, x) < 0) {
+        free(r);
+        return -1;
+    }
+    for (int j = 0; j < k; j++) {
+        int s = (k - 1) - j;
+        if (s < 64 * nlimbs) {
+            for (int i = 0; i < n; i++) {
+                if (get_bit(a + i*nlimbs, s)) {
+                    push_fldr(x, i, j);
+                }
+            }
+        }
+        if (get_bit(r, s)) {
+            push_fldr(x, n, j);
+        }
+    }
+    free(r);
+    return 0;
+}
+
+void free_sample_fldr_s(struct sample_fldr_s x) {
+    free(x.h);
+    free(x.H);
+}
@@ -0,0 +1,22 @@
+/*
+  Name:     fldr.h
+  Purpose:  FLDR preprocessing for 64-bit and multiword integer weights.
+  Author:   F. A. Saad
+  Copyright (C) 2020 Feras A. Saad, All Rights Reserved.
+
+  Released under Apache 2.0; refer to LICENSE.txt
+*/
+
+#ifndef FLDR_H
+#define FLDR_H
+
+#include <stdint.h>
+
+#include "sstructs.h"
+
+int preprocess_fldr_u64(const uint64_t *a, int n, struct sample_fldr_s *x);
+int preprocess_fldr_mw(const uint64_t *a, int n, int nlimbs,
+    struct sample_fldr_s *x);
+void free_sample_fldr_s(struct sample_fldr_s x);
+
+#endif
@@ -8,21 +8,101 @@
 */
 
 #include <stdlib.h>
+#include <string.h>
 
 #include "flip.h"
 
 unsigned long NUM_RNG_CALLS = 0;
 
-// RAND_MAX is 2**31-1 signed, so bits are 0,...29 with 30th
-static int k = 30;
-static int flip_word = 0;
+// The bits are served most significant first from words of width bits,
+// drawn from the current word source.
+static uint64_t (*flip_source)(void);
+static int flip_width = 0;
+static uint64_t flip_word = 0;
 static int flip_pos = 0;
 
+// RAND_MAX is 2**31-1 signed, so bits are 0,...29 with 30th
+static uint64_t rand_word(void) {
+    return (uint64_t) rand();
+}
+
+void flip_set_source(uint64_t (*source)(void), int width) {
+    flip_source = source;
+    flip_width = width;
+    flip_word = 0;
+    flip_pos = 0;
+    NUM_RNG_CALLS = 0;
+}
+
+void flip_seed(unsigned int seed) {
+    srand(seed);
+    flip_set_source(rand_word, 30);
+}
+
+// ChaCha20 keystream of RFC 7539 with a zero nonce, as in chacha.py.
+static uint32_t chacha_key[8];
+static uint32_t chacha_counter = 0;
+static uint32_t chacha_block[16];
+static int chacha_index = 16;
+
+#define ROTL(x, r) (((x) << (r)) | ((x) >> (32 - (r))))
+#define QUARTER_ROUND(x, a, b, c, d) { \
+        x[a] += x[b]; x[d] ^= x[a]; x[d] = ROTL(x[d], 16); \
+        x[c] += x[d]; x[b] ^= x[c]; x[b] = ROTL(x[b], 12); \
+        x[a] += x[b]; x[d] ^= x[a]; x[d] = ROTL(x[d], 8); \
+        x[c] += x[d]; x[b] ^= x[c]; x[b] = ROTL(x[b], 7); \
+    }
+
+static void chacha20_next_block(void) {
+    uint32_t state[16] = {
+        0x61707865, 0x3320646e, 0x79622d32, 0x6b206574,
+    };
+    memcpy(state + 4, chacha_key, sizeof(chacha_key));
+    state[12] = chacha_counter++;
+    uint32_t *x = chacha_block;
+    memcpy(x, state, sizeof(state));
+    for (int i = 0; i < 10; i++) {
+        QUARTER_ROUND(x, 0, 4, 8, 12);
+        QUARTER_ROUND(x, 1, 5, 9, 13);
+        QUARTER_ROUND(x, 2, 6, 10, 14);
+        QUARTER_ROUND(x, 3, 7, 11, 15);
+        QUARTER_ROUND(x, 0, 5, 10, 15);
+        QUARTER_ROUND(x, 1, 6, 11, 12);
+        QUARTER_ROUND(x, 2, 7, 8, 13);
+        QUARTER_ROUND(x, 3, 4, 9, 14);
+    }
+    for (int i = 0; i < 16; i++) {
+        x[i] += state[i];
+    }
+    chacha_index = 0;
+}
+
+// Return the next 8 bytes of the keystream as a little-endian word.
+static uint64_t chacha20_word(void) {
+    if (chacha_index == 16) {
+        chacha20_next_block();
+    }
+    uint64_t word = (uint64_t) chacha_block[chacha_index]
+        | ((uint64_t) chacha_block[chacha_index + 1] << 32);
+    chacha_index += 2;
+    return word;
+}
+
+void flip_seed_chacha20(const uint32_t key[8]) {
+    memcpy(chacha_key, key, sizeof(chacha_key));
+    chacha_counter = 0;
+    chacha_index = 16;
+    flip_set_source(chacha20_word, 64);
+}
+
 int flip(void){
     if (flip_pos == 0) {
+        if (flip_source == NULL) {
+            flip_seed(1);
+        }
         NUM_RNG_CALLS++;
-        flip_word = rand();
-        flip_pos = k;
+        flip_word = flip_source();
+        flip_pos = flip_width;
     }
     --flip_pos;
     return (flip_word >> flip_pos) & 1;
@@ -10,8 +10,16 @@
 #ifndef FLIP_H
 #define FLIP_H
 
+#include <stdint.h>
+
 extern unsigned long NUM_RNG_CALLS;
 
+// Draw the bits from words of width bits returned by source.
+void flip_set_source(uint64_t (*source)(void), int width);
+// Draw the bits from rand(), 30 bits per word (the default).
+void flip_seed(unsigned int seed);
+// Draw the bits from the ChaCha20 keystream of key, 64 bits per word.
+void flip_seed_chacha20(const uint32_t key[8]);
 int flip(void);
 int randint(int k);
 
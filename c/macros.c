@@ -18,7 +18,10 @@
         var_t, \
         var_x) \
     if(strcmp(var_sampler, key) == 0) { \
-        struct struct_name s = func_read(var_path); \
+        struct struct_name s; \
+        if (func_read(var_path, &s) < 0) { \
+            return EXIT_FAILURE; \
+        } \
         var_t = clock(); \
         for (int i = 0; i < var_steps; i++) { \
             var_x += func_sample(&s); \
@@ -149,6 +149,7 @@ int main(int argc, char **argv) {
         sample_alias_exact,
         free_sample_alias_exact_s,
         path, steps, t, x)
+#ifndef SAMPLE_NO_GSL
     else READ_SAMPLE_TIME("alias.gsl",
         sampler,
         sample_alias_gsl_s,
@@ -156,6 +157,7 @@ int main(int argc, char **argv) {
         sample_alias_gsl,
         free_sample_alias_gsl_s,
         path, steps, t, x)
+#endif
     else {
         printf("Unknown sampler: %s\n", sampler);
         exit(1);
@@ -7,72 +7,41 @@
   Released under Apache 2.0; refer to LICENSE.txt
 */
 
-#include <stdbool.h>
+#include <inttypes.h>
+#include <stdint.h>
 #include <stdio.h>
 #include <time.h>
 
+#ifndef SAMPLE_NO_GSL
 #include <gsl/gsl_randist.h>
+#endif
 
+#include "fldr.h"
 #include "readio.h"
 #include "sstructs.h"
 
-int ceil_log2(unsigned long long x) {
-  static const unsigned long long t[6] = {
-    0xFFFFFFFF00000000ull,
-    0x00000000FFFF0000ull,
-    0x000000000000FF00ull,
-    0x00000000000000F0ull,
-    0x000000000000000Cull,
-    0x0000000000000002ull
-  };
-
-  int y = (((x & (x - 1)) == 0) ? 0 : 1);
-  int j = 32;
-  int i;
-
-  for (i = 0; i < 6; i++) {
-    int k = (((x & t[i]) == 0) ? 0 : j);
-    y += k;
-    x >>= k;
-    j >>= 1;
-  }
-
-  return y;
-}
-
-int preprocess_fldr(struct array_s x, int m) {
-    int k = ceil_log2(m);
-    int r = (1 << k) - m;
-    int n = x.length + 1;
-
-    int *h = calloc(k, sizeof(int));
-    int *H = calloc(n*k, sizeof(int));
-
-    int d;
-    for(int j = 0; j < k; j++) {
-        d = 0;
-        for (int i = 0 ; i < x.length; i++) {
-            bool w = (x.a[i] >> ((k-1) -j)) & 1;
-            h[j] += w;
-            if (w) {
-                H[d*k + j] = i;
-                d += 1;
-            }
-        }
-        // Reject outcome.
-        bool w = (w >> ((k-1) -j)) & 1;
-        h[j] += w;
-        if (w) {
-            H[d*k + j] = n;
-            d += 1;
-        }
+// Return the number of outcomes at the last level, as a check value.
+int preprocess_fldr(const uint64_t *a, int n) {
+    struct sample_fldr_s y;
+    if (preprocess_fldr_u64(a, n, &y) < 0) {
+        printf("failed to preprocess\n");
+        exit(1);
     }
+    int d = y.h[y.k - 1];
+    free_sample_fldr_s(y);
     return d;
 }
 
-void preprocess_alias_gsl(struct array_s x, int m) {
-    gsl_ran_discrete_preproc(x.length, (double*)x.a);
+#ifndef SAMPLE_NO_GSL
+void preprocess_alias_gsl(const uint64_t *a, int n) {
+    double *p = calloc(n ? n : 1, sizeof(double));
+    for (int i = 0; i < n; i++) {
+        p[i] = (double) a[i];
+    }
+    gsl_ran_discrete_free(gsl_ran_discrete_preproc(n, p));
+    free(p);
 }
+#endif
 
 int main(int argc, char **argv) {
     // Read command line arguments.
@@ -82,25 +51,50 @@ int main(int argc, char **argv) {
     }
     char *path = argv[1];
 
-    // Load the distribution.
+    // Load the distribution, whose weights must sum to Z.
     FILE *fp = fopen(path, "r");
-    int Z;
-    fscanf(fp, "%d", &Z);
-    struct array_s x = load_array(fp);
+    if (fp == NULL) {
+        printf("cannot open %s\n", path);
+        exit(1);
+    }
+    uint64_t Z;
+    int n;
+    uint64_t *a = NULL;
+    if (fscanf(fp, "%" SCNu64, &Z) == 1) {
+        a = load_array_u64(fp, &n);
+    }
     fclose(fp);
+    if (a == NULL) {
+        printf("cannot read Z and the weights from %s\n", path);
+        exit(1);
+    }
+    uint64_t rest = Z;
+    int i = 0;
+    while (i < n && a[i] <= rest) {
+        rest -= a[i];
+        i++;
+    }
+    if (Z == 0 || i < n || rest != 0) {
+        printf("weights do not sum to Z = %" PRIu64 "\n", Z);
+        exit(1);
+    }
 
     // Measure time of FLDR.
     clock_t t;
     t = clock();
-    int d = preprocess_fldr(x, Z);
+    int d = preprocess_fldr(a, n);
     t = clock() - t;
     double t_fldr = ((double) t) / CLOCKS_PER_SEC;
 
     // Measure time of Alias GSL.
+    double t_alias = 0;
+#ifndef SAMPLE_NO_GSL
     t = clock();
-    preprocess_alias_gsl(x, Z);
+    preprocess_alias_gsl(a, n);
     t = clock() - t;
-    double t_alias = ((double) t) / CLOCKS_PER_SEC;
+    t_alias = ((double) t) / CLOCKS_PER_SEC;
+#endif
 
+    free(a);
     printf("%dc %1.6f %1.6f\n", d, t_fldr, t_alias);
 }
@@ -7,7 +7,15 @@
   Released under Apache 2.0; refer to LICENSE.txt
 */
 
+#include <fcntl.h>
+#include <inttypes.h>
+#include <limits.h>
+#include <stdint.h>
 #include <stdlib.h>
+#include <string.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <unistd.h>
 
 #include "readio.h"
 #include "sstructs.h"
@@ -17,6 +25,7 @@ struct matrix_s load_matrix(FILE *fp) {
 
     struct matrix_s mat;
     fscanf(fp, "%d %d", &(mat.nrows), &(mat.ncols));
+    mat.mapped = 0;
 
     mat.P = (int **) calloc(mat.nrows, sizeof(int **));
     for(int r = 0; r < mat.nrows; ++r) {
@@ -30,8 +39,12 @@ struct matrix_s load_matrix(FILE *fp) {
 }
 
 void free_matrix_s (struct matrix_s x) {
-    for (int i = 0; i < x.nrows; i++) {
-        free(x.P[i]);
+    if (x.mapped) {
+        munmap(x.P[0], (size_t) x.nrows * x.ncols * sizeof(int));
+    } else {
+        for (int i = 0; i < x.nrows; i++) {
+            free(x.P[i]);
+        }
     }
     free(x.P);
 }
@@ -41,6 +54,7 @@ struct array_s load_array(FILE *fp) {
 
     struct array_s arr;
     fscanf(fp, "%d", &(arr.length));
+    arr.mapped = 0;
 
     arr.a = (int *) calloc(arr.length, sizeof(int));
     for (int i = 0; i < arr.length; i++) {
@@ -50,20 +64,253 @@ struct array_s load_array(FILE *fp) {
     return arr;
 }
 
+// Load array of unsigned 64-bit integers from file, or NULL on failure.
+uint64_t *load_array_u64(FILE *fp, int *length) {
+    if (fscanf(fp, "%d", length) != 1 || *length < 0) {
+        return NULL;
+    }
+    uint64_t *a = (uint64_t *) calloc(*length ? *length : 1, sizeof(uint64_t));
+    if (a == NULL) {
+        return NULL;
+    }
+    for (int i = 0; i < *length; i++) {
+        if (fscanf(fp, "%" SCNu64, &a[i]) != 1) {
+            free(a);
+            return NULL;
+        }
+    }
+    return a;
+}
+
 void free_array_s (struct array_s x) {
-    free(x.a);
+    if (x.mapped) {
+        munmap(x.a, (size_t) x.length * sizeof(int));
+    } else {
+        free(x.a);
+    }
+}
+
+// Binary container written by writeio.write_binary in Python: a header
+// (magic, version, number of fields, kind), one record of five int64 per
+// field (ndim, itemsize, value or offset, nrows, ncols), and the arrays,
+// each starting at a page-aligned offset so that it can be mapped as is.
+#define BINARY_MAGIC "DSAMPLER"
+#define BINARY_VERSION 1
+
+struct binary_s {
+    char *fname;
+    int fd;
+    off_t size;
+    int nfields;
+    char kind[33];
+    int64_t (*fields)[5];
+};
+
+int is_binary(char *fname) {
+    char magic[8] = {0};
+    FILE *fp = fopen(fname, "rb");
+    if (fp == NULL) {
+        return 0;
+    }
+    size_t n = fread(magic, 1, sizeof(magic), fp);
+    fclose(fp);
+    return n == sizeof(magic) && memcmp(magic, BINARY_MAGIC, sizeof(magic)) == 0;
+}
+
+// Report an invalid binary file on stderr and return -1.
+static int binary_error(struct binary_s *b, char *msg) {
+    fprintf(stderr, "%s: %s\n", b->fname, msg);
+    return -1;
+}
+
+void close_binary(struct binary_s b) {
+    if (0 <= b.fd) {
+        close(b.fd);
+    }
+    free(b.fields);
+}
+
+// Return 1 if the host stores integers little-endian, as the file does.
+static int is_little_endian(void) {
+    uint16_t x = 1;
+    return *(unsigned char *) &x == 1;
+}
+
+// Read the header and field records of fname, which must be of kind.
+int open_binary(char *fname, char *kind, struct binary_s *b) {
+    b->fname = fname;
+    b->fd = -1;
+    b->fields = NULL;
+    b->nfields = 0;
+    memset(b->kind, 0, sizeof(b->kind));
+    // The records and arrays are read and mapped without byte swapping.
+    if (!is_little_endian()) {
+        return binary_error(b, "binary files require a little-endian host");
+    }
+
+    FILE *fp = fopen(fname, "rb");
+    if (fp == NULL) {
+        return binary_error(b, "cannot open file");
+    }
+    char magic[8];
+    int32_t version;
+    int32_t nfields;
+    int ok = fread(magic, 1, sizeof(magic), fp) == sizeof(magic)
+        && fread(&version, sizeof(version), 1, fp) == 1
+        && fread(&nfields, sizeof(nfields), 1, fp) == 1
+        && fread(b->kind, 1, 32, fp) == 32;
+    if (!ok || memcmp(magic, BINARY_MAGIC, sizeof(magic)) != 0) {
+        fclose(fp);
+        return binary_error(b, "not a binary sampler file");
+    }
+    if (version != BINARY_VERSION) {
+        fclose(fp);
+        return binary_error(b, "unsupported binary version");
+    }
+    if (strcmp(b->kind, kind) != 0) {
+        fclose(fp);
+        return binary_error(b, "binary file has the wrong kind");
+    }
+    if (nfields < 0) {
+        fclose(fp);
+        return binary_error(b, "invalid number of fields");
+    }
+    b->fields = calloc(nfields ? nfields : 1, sizeof(*b->fields));
+    if (b->fields == NULL) {
+        fclose(fp);
+        return binary_error(b, "cannot allocate fields");
+    }
+    b->nfields = nfields;
+    ok = fread(b->fields, sizeof(*b->fields), nfields, fp) == (size_t) nfields;
+    fclose(fp);
+    if (!ok) {
+        return binary_error(b, "truncated field records");
+    }
+
+    struct stat st;
+    b->fd = open(fname, O_RDONLY);
+    if (b->fd < 0 || fstat(b->fd, &st) < 0) {
+        return binary_error(b, "cannot open file");
+    }
+    b->size = st.st_size;
+    return 0;
+}
+
+// Check that field i exists and has ndim dimensions.
+static int binary_field(struct binary_s *b, int i, int ndim) {
+    if (b->nfields <= i) {
+        return binary_error(b, "missing field");
+    }
+    if (b->fields[i][0] != ndim) {
+        return binary_error(b, "field has the wrong number of dimensions");
+    }
+    return 0;
+}
+
+int binary_scalar(struct binary_s *b, int i, int *x) {
+    if (binary_field(b, i, 0) < 0) {
+        return -1;
+    }
+    if (b->fields[i][2] < INT_MIN || INT_MAX < b->fields[i][2]) {
+        return binary_error(b, "scalar field does not fit in int");
+    }
+    *x = (int) b->fields[i][2];
+    return 0;
+}
+
+// Map ncells int32 entries of field i; the mapping stays valid after close.
+static int binary_map(struct binary_s *b, int i, int64_t ncells, int **a) {
+    int64_t offset = b->fields[i][2];
+    if (b->fields[i][1] != sizeof(int)) {
+        return binary_error(b, "array field is not int32");
+    }
+    if (offset < 0 || offset % sysconf(_SC_PAGESIZE) != 0) {
+        return binary_error(b, "array field is not page aligned");
+    }
+    if ((b->size - offset) / (int64_t) sizeof(int) < ncells) {
+        return binary_error(b, "array field extends past the end of file");
+    }
+    void *m = mmap(NULL, (size_t) ncells * sizeof(int), PROT_READ,
+        MAP_PRIVATE, b->fd, (off_t) offset);
+    if (m == MAP_FAILED) {
+        return binary_error(b, "cannot map array field");
+    }
+    *a = (int *) m;
+    return 0;
+}
+
+int binary_array(struct binary_s *b, int i, struct array_s *arr) {
+    if (binary_field(b, i, 1) < 0) {
+        return -1;
+    }
+    if (b->fields[i][3] < 0 || INT_MAX < b->fields[i][3]) {
+        return binary_error(b, "invalid array length");
+    }
+    arr->length = (int) b->fields[i][3];
+    arr->mapped = 0 < arr->length;
+    arr->a = NULL;
+    if (arr->mapped) {
+        return binary_map(b, i, arr->length, &(arr->a));
+    }
+    return 0;
+}
+
+int binary_matrix(struct binary_s *b, int i, struct matrix_s *mat) {
+    if (binary_field(b, i, 2) < 0) {
+        return -1;
+    }
+    int64_t nrows = b->fields[i][3];
+    int64_t ncols = b->fields[i][4];
+    if (nrows < 0 || INT_MAX < nrows || ncols < 0 || INT_MAX < ncols) {
+        return binary_error(b, "invalid matrix shape");
+    }
+    mat->nrows = (int) nrows;
+    mat->ncols = (int) ncols;
+    mat->mapped = 0 < nrows * ncols;
+    mat->P = (int **) calloc(nrows ? nrows : 1, sizeof(int *));
+    if (mat->P == NULL) {
+        return binary_error(b, "cannot allocate matrix rows");
+    }
+    if (!mat->mapped) {
+        return 0;
+    }
+    int *a;
+    if (binary_map(b, i, nrows * ncols, &a) < 0) {
+        free(mat->P);
+        return -1;
+    }
+    for (int r = 0; r < mat->nrows; ++r) {
+        mat->P[r] = a + (size_t) r * mat->ncols;
+    }
+    return 0;
+}
+
+// Abandon loading an invalid binary file and return -1.
+static int exit_binary(struct binary_s b) {
+    close_binary(b);
+    return -1;
 }
 
 // Load sample_ky_encoding data structure from file path.
-struct sample_ky_encoding_s read_sample_ky_encoding(char *fname) {
-    FILE *fp = fopen(fname, "r");
+int read_sample_ky_encoding(char *fname, struct sample_ky_encoding_s *x) {
+    if (is_binary(fname)) {
+        struct binary_s b;
+        if (open_binary(fname, "ky_encoding", &b) < 0
+                || binary_array(&b, 0, &(x->encoding)) < 0
+                || binary_scalar(&b, 1, &(x->n)) < 0
+                || binary_scalar(&b, 2, &(x->k)) < 0) {
+            return exit_binary(b);
+        }
+        close_binary(b);
+        return 0;
+    }
 
-    struct sample_ky_encoding_s x;
-    fscanf(fp, "%d %d", &(x.n), &(x.k));
-    x.encoding = load_array(fp);
+    FILE *fp = fopen(fname, "r");
+    fscanf(fp, "%d %d", &(x->n), &(x->k));
+    x->encoding = load_array(fp);
 
     fclose(fp);
-    return x;
+    return 0;
 }
 
 void free_sample_ky_encoding_s (struct sample_ky_encoding_s x) {
@@ -71,15 +318,25 @@ void free_sample_ky_encoding_s (struct sample_ky_encoding_s x) {
 }
 
 // Load sample_ky_matrix data structure from file path.
-struct sample_ky_matrix_s read_sample_ky_matrix(char *fname) {
-    FILE *fp = fopen(fname, "r");
+int read_sample_ky_matrix(char *fname, struct sample_ky_matrix_s *x) {
+    if (is_binary(fname)) {
+        struct binary_s b;
+        if (open_binary(fname, "ky_matrix", &b) < 0
+                || binary_matrix(&b, 0, &(x->P)) < 0
+                || binary_scalar(&b, 1, &(x->k)) < 0
+                || binary_scalar(&b, 2, &(x->l)) < 0) {
+            return exit_binary(b);
+        }
+        close_binary(b);
+        return 0;
+    }
 
-    struct sample_ky_matrix_s x;
-    fscanf(fp, "%d %d", &(x.k), &(x.l));
-    x.P = load_matrix(fp);
+    FILE *fp = fopen(fname, "r");
+    fscanf(fp, "%d %d", &(x->k), &(x->l));
+    x->P = load_matrix(fp);
 
     fclose(fp);
-    return x;
+    return 0;
 }
 
 void free_sample_ky_matrix_s (struct sample_ky_matrix_s x) {
@@ -87,16 +344,27 @@ void free_sample_ky_matrix_s (struct sample_ky_matrix_s x) {
 }
 
 // Load sample_ky_matrix_cached data structure from file path.
-struct sample_ky_matrix_cached_s read_sample_ky_matrix_cached(char *fname) {
-    FILE *fp = fopen(fname, "r");
+int read_sample_ky_matrix_cached(char *fname, struct sample_ky_matrix_cached_s *x) {
+    if (is_binary(fname)) {
+        struct binary_s b;
+        if (open_binary(fname, "ky_matrix_cached", &b) < 0
+                || binary_scalar(&b, 0, &(x->k)) < 0
+                || binary_scalar(&b, 1, &(x->l)) < 0
+                || binary_array(&b, 2, &(x->h)) < 0
+                || binary_matrix(&b, 3, &(x->T)) < 0) {
+            return exit_binary(b);
+        }
+        close_binary(b);
+        return 0;
+    }
 
-    struct sample_ky_matrix_cached_s x;
-    fscanf(fp, "%d %d", &(x.k), &(x.l));
-    x.h = load_array(fp);
-    x.T = load_matrix(fp);
+    FILE *fp = fopen(fname, "r");
+    fscanf(fp, "%d %d", &(x->k), &(x->l));
+    x->h = load_array(fp);
+    x->T = load_matrix(fp);
 
     fclose(fp);
-    return x;
+    return 0;
 }
 
 void free_sample_ky_matrix_cached_s (struct sample_ky_matrix_cached_s x) {
@@ -105,51 +373,81 @@ void free_sample_ky_matrix_cached_s (struct sample_ky_matrix_cached_s x) {
 }
 
 // Load sample_fdr data structure from file path.
-struct sample_fdr_s read_sample_fdr(char *fname) {
-    FILE *fp = fopen(fname, "r");
+int read_sample_fdr(char *fname, struct sample_fdr_s *x) {
+    if (is_binary(fname)) {
+        struct binary_s b;
+        if (open_binary(fname, "fdr", &b) < 0
+                || binary_scalar(&b, 0, &(x->n)) < 0) {
+            return exit_binary(b);
+        }
+        close_binary(b);
+        return 0;
+    }
 
-    struct sample_fdr_s x;
-    fscanf(fp, "%d", &(x.n));
+    FILE *fp = fopen(fname, "r");
+    fscanf(fp, "%d", &(x->n));
 
     fclose(fp);
-    return x;
+    return 0;
 }
 
 void free_sample_fdr_s(struct sample_fdr_s x) {
 }
 
 // Load sample_bernoulli data structure from file path.
-struct sample_inversion_bernoulli_s read_sample_inversion_bernoulli(char *fname) {
-    FILE *fp = fopen(fname, "r");
+int read_sample_inversion_bernoulli(char *fname, struct sample_inversion_bernoulli_s *x) {
+    if (is_binary(fname)) {
+        struct binary_s b;
+        if (open_binary(fname, "inversion_bernoulli", &b) < 0
+                || binary_scalar(&b, 0, &(x->a)) < 0
+                || binary_scalar(&b, 1, &(x->M)) < 0) {
+            return exit_binary(b);
+        }
+        close_binary(b);
+        return 0;
+    }
 
-    struct sample_inversion_bernoulli_s x;
-    fscanf(fp, "%d %d", &(x.a), &(x.M));
+    FILE *fp = fopen(fname, "r");
+    fscanf(fp, "%d %d", &(x->a), &(x->M));
 
     fclose(fp);
-    return x;
+    return 0;
 }
 
 void free_sample_inversion_bernoulli_s(struct sample_inversion_bernoulli_s x) {
 }
 
 // Load sample_rejection_uniform data structure from file path.
-struct sample_rejection_uniform_s read_sample_rejection_uniform(char *fname) {
-    FILE *fp = fopen(fname, "r");
-
-    struct sample_rejection_uniform_s x;
-    fscanf(fp, "%d %d", &(x.n), &(x.M));
-    x.Ms = load_array(fp);
+int read_sample_rejection_uniform(char *fname, struct sample_rejection_uniform_s *x) {
+    if (is_binary(fname)) {
+        struct binary_s b;
+        if (open_binary(fname, "rejection_uniform", &b) < 0
+                || binary_array(&b, 0, &(x->Ms)) < 0
+                || binary_scalar(&b, 1, &(x->M)) < 0
+                || binary_scalar(&b, 2, &(x->n)) < 0) {
+            return exit_binary(b);
+        }
+        if (x->Ms.length != x->n) {
+            binary_error(&b, "length of Ms does not match n");
+            return exit_binary(b);
+        }
+        close_binary(b);
+    } else {
+        FILE *fp = fopen(fname, "r");
+        fscanf(fp, "%d %d", &(x->n), &(x->M));
+        x->Ms = load_array(fp);
+        fclose(fp);
+    }
 
-    x.ratios = (struct sample_inversion_bernoulli_s*)
-        calloc(x.n, sizeof(struct sample_inversion_bernoulli_s));
+    x->ratios = (struct sample_inversion_bernoulli_s*)
+        calloc(x->n, sizeof(struct sample_inversion_bernoulli_s));
 
-    for (int i = 0; i < x.n; i++) {
-        struct sample_inversion_bernoulli_s y = {.a = x.Ms.a[i], .M = x.M};
-        x.ratios[i] = y;
+    for (int i = 0; i < x->n; i++) {
+        struct sample_inversion_bernoulli_s y = {.a = x->Ms.a[i], .M = x->M};
+        x->ratios[i] = y;
     }
 
-    fclose(fp);
-    return x;
+    return 0;
 }
 
 void free_sample_rejection_uniform_s (struct sample_rejection_uniform_s x) {
@@ -160,15 +458,25 @@ void free_sample_rejection_uniform_s (struct sample_rejection_uniform_s x) {
 }
 
 // Load sample_rejection_hash_table data structure from file path.
-struct sample_rejection_hash_table_s read_sample_rejection_hash_table(char *fname) {
-    FILE *fp = fopen(fname, "r");
+int read_sample_rejection_hash_table(char *fname, struct sample_rejection_hash_table_s *x) {
+    if (is_binary(fname)) {
+        struct binary_s b;
+        if (open_binary(fname, "rejection_hash_table", &b) < 0
+                || binary_array(&b, 0, &(x->T)) < 0
+                || binary_scalar(&b, 1, &(x->Z)) < 0
+                || binary_scalar(&b, 2, &(x->k)) < 0) {
+            return exit_binary(b);
+        }
+        close_binary(b);
+        return 0;
+    }
 
-    struct sample_rejection_hash_table_s x;
-    fscanf(fp, "%d %d", &(x.k), &(x.Z));
-    x.T = load_array(fp);
+    FILE *fp = fopen(fname, "r");
+    fscanf(fp, "%d %d", &(x->k), &(x->Z));
+    x->T = load_array(fp);
 
     fclose(fp);
-    return x;
+    return 0;
 }
 
 void free_sample_rejection_hash_table_s(
@@ -177,15 +485,25 @@ void free_sample_rejection_hash_table_s(
 }
 
 // Load sample_rejection_binary_search data structure from file path.
-struct sample_rejection_binary_search_s read_sample_rejection_binary_search(char *fname) {
-    FILE *fp = fopen(fname, "r");
+int read_sample_rejection_binary_search(char *fname, struct sample_rejection_binary_search_s *x) {
+    if (is_binary(fname)) {
+        struct binary_s b;
+        if (open_binary(fname, "rejection_binary_search", &b) < 0
+                || binary_array(&b, 0, &(x->cdf)) < 0
+                || binary_scalar(&b, 1, &(x->Z)) < 0
+                || binary_scalar(&b, 2, &(x->k)) < 0) {
+            return exit_binary(b);
+        }
+        close_binary(b);
+        return 0;
+    }
 
-    struct sample_rejection_binary_search_s x;
-    fscanf(fp, "%d %d", &(x.k), &(x.Z));
-    x.cdf = load_array(fp);
+    FILE *fp = fopen(fname, "r");
+    fscanf(fp, "%d %d", &(x->k), &(x->Z));
+    x->cdf = load_array(fp);
 
     fclose(fp);
-    return x;
+    return 0;
 }
 
 void free_sample_rejection_binary_search_s(
@@ -194,71 +512,95 @@ void free_sample_rejection_binary_search_s(
 }
 
 // Load sample_interval data structure from file path.
-struct sample_interval_s read_sample_interval(char *fname) {
-    FILE *fp = fopen(fname, "r");
+int read_sample_interval(char *fname, struct sample_interval_s *x) {
+    if (is_binary(fname)) {
+        struct binary_s b;
+        if (open_binary(fname, "interval", &b) < 0
+                || binary_array(&b, 0, &(x->cdf)) < 0
+                || binary_scalar(&b, 1, &(x->Z)) < 0
+                || binary_scalar(&b, 2, &(x->k)) < 0) {
+            return exit_binary(b);
+        }
+        close_binary(b);
+        return 0;
+    }
 
-    struct sample_interval_s x;
-    fscanf(fp, "%d %d", &(x.k), &(x.Z));
-    x.cdf = load_array(fp);
+    FILE *fp = fopen(fname, "r");
+    fscanf(fp, "%d %d", &(x->k), &(x->Z));
+    x->cdf = load_array(fp);
 
     fclose(fp);
-    return x;
+    return 0;
 }
 
 void free_sample_interval_s(struct sample_interval_s x) {
     free_array_s(x.cdf);
 }
 
-
+#ifndef SAMPLE_NO_GSL
 // Load sample_alias_gsl data structure from file path.
-struct sample_alias_gsl_s read_sample_alias_gsl(char *fname) {
+int read_sample_alias_gsl(char *fname, struct sample_alias_gsl_s *x) {
     FILE *fp = fopen(fname, "r");
 
-    struct sample_alias_gsl_s x;
     int Z;
     fscanf(fp, "%d", &Z);
     struct array_s numerators = load_array(fp);
     fclose(fp);
 
-    x.distribution = gsl_ran_discrete_preproc(
+    x->distribution = gsl_ran_discrete_preproc(
         numerators.length, (double*)numerators.a);
 
     const gsl_rng_type *rT = gsl_rng_default;
-    x.prng = gsl_rng_alloc(rT);
+    x->prng = gsl_rng_alloc(rT);
 
-    return x;
+    return 0;
 }
 
 void free_sample_alias_gsl_s (struct sample_alias_gsl_s x) {
     gsl_ran_discrete_free(x.distribution);
     gsl_rng_free(x.prng);
 }
+#endif
 
 // Load sample_alias_exact data structure from file path.
-// Load sample_rejection_uniform data structure from file path.
-struct sample_alias_exact_s read_sample_alias_exact(char *fname) {
-    FILE *fp = fopen(fname, "r");
-
-    struct sample_alias_exact_s x;
-    fscanf(fp, "%d", &(x.n));
-    struct array_s qs = load_array(fp);
-    struct array_s Ms = load_array(fp);
-    x.j = load_array(fp);
+int read_sample_alias_exact(char *fname, struct sample_alias_exact_s *x) {
+    struct array_s qs;
+    struct array_s Ms;
+    if (is_binary(fname)) {
+        struct binary_s b;
+        if (open_binary(fname, "alias", &b) < 0
+                || binary_scalar(&b, 0, &(x->n)) < 0
+                || binary_array(&b, 1, &qs) < 0
+                || binary_array(&b, 2, &Ms) < 0
+                || binary_array(&b, 3, &(x->j)) < 0) {
+            return exit_binary(b);
+        }
+        if (qs.length != x->n || Ms.length != x->n || x->j.length != x->n) {
+            binary_error(&b, "lengths of qs, Ms and j do not match n");
+            return exit_binary(b);
+        }
+        close_binary(b);
+    } else {
+        FILE *fp = fopen(fname, "r");
+        fscanf(fp, "%d", &(x->n));
+        qs = load_array(fp);
+        Ms = load_array(fp);
+        x->j = load_array(fp);
+        fclose(fp);
+    }
 
-    x.ratios = (struct sample_inversion_bernoulli_s*)
-        calloc(x.n, sizeof(struct sample_inversion_bernoulli_s));
+    x->ratios = (struct sample_inversion_bernoulli_s*)
+        calloc(x->n, sizeof(struct sample_inversion_bernoulli_s));
 
-    for (int i = 0; i < x.n; i++) {
+    for (int i = 0; i < x->n; i++) {
         struct sample_inversion_bernoulli_s y = {.a = qs.a[i], .M = Ms.a[i]};
-        x.ratios[i] = y;
+        x->ratios[i] = y;
     }
 
-    fclose(fp);
-
     free_array_s(qs);
     free_array_s(Ms);
 
-    return x;
+    return 0;
 }
 
 void free_sample_alias_exact_s (struct sample_alias_exact_s x) {
@@ -10,22 +10,27 @@
 #ifndef READIO_H
 #define READIO_H
 
+#include <stdint.h>
 #include <stdio.h>
 #include "sstructs.h"
 
+int is_binary(char *fname);
 struct matrix_s load_matrix(FILE *fp);
 struct array_s load_array(FILE *fp);
-struct sample_ky_encoding_s read_sample_ky_encoding(char *fname);
-struct sample_ky_matrix_s read_sample_ky_matrix(char *fname);
-struct sample_ky_matrix_cached_s read_sample_ky_matrix_cached(char *fname);
-struct sample_fdr_s read_sample_fdr(char *fname);
-struct sample_inversion_bernoulli_s read_sample_inversion_bernoulli(char *fname);
-struct sample_rejection_uniform_s read_sample_rejection_uniform(char *fname);
-struct sample_rejection_hash_table_s read_sample_rejection_hash_table(char *fname);
-struct sample_rejection_binary_search_s read_sample_rejection_binary_search(char *fname);
-struct sample_interval_s read_sample_interval(char *fname);
-struct sample_alias_gsl_s read_sample_alias_gsl(char *fname);
-struct sample_alias_exact_s read_sample_alias_exact(char *fname);
+uint64_t *load_array_u64(FILE *fp, int *length);
+int read_sample_ky_encoding(char *fname, struct sample_ky_encoding_s *x);
+int read_sample_ky_matrix(char *fname, struct sample_ky_matrix_s *x);
+int read_sample_ky_matrix_cached(char *fname, struct sample_ky_matrix_cached_s *x);
+int read_sample_fdr(char *fname, struct sample_fdr_s *x);
+int read_sample_inversion_bernoulli(char *fname, struct sample_inversion_bernoulli_s *x);
+int read_sample_rejection_uniform(char *fname, struct sample_rejection_uniform_s *x);
+int read_sample_rejection_hash_table(char *fname, struct sample_rejection_hash_table_s *x);
+int read_sample_rejection_binary_search(char *fname, struct sample_rejection_binary_search_s *x);
+int read_sample_interval(char *fname, struct sample_interval_s *x);
+#ifndef SAMPLE_NO_GSL
+int read_sample_alias_gsl(char *fname, struct sample_alias_gsl_s *x);
+#endif
+int read_sample_alias_exact(char *fname, struct sample_alias_exact_s *x);
 
 void free_matrix_s(struct matrix_s x);
 void free_array_s(struct array_s x);
@@ -38,7 +43,9 @@ void free_sample_rejection_uniform_s(struct sample_rejection_uniform_s x);
 void free_sample_rejection_hash_table_s(struct sample_rejection_hash_table_s x);
 void free_sample_rejection_binary_search_s(struct sample_rejection_binary_search_s x);
 void free_sample_interval_s(struct sample_interval_s x);
+#ifndef SAMPLE_NO_GSL
 void free_sample_alias_gsl_s(struct sample_alias_gsl_s x);
+#endif
 void free_sample_alias_exact_s(struct sample_alias_exact_s x);
 
 #endif
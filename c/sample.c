@@ -8,6 +8,7 @@
 */
 
 #include <stdbool.h>
+#include <stdint.h>
 #include <stdlib.h>
 
 #include "flip.h"
@@ -210,39 +211,105 @@ int sample_rejection_matrix_cached(struct sample_ky_matrix_cached_s *x) {
     }
 }
 
-int sample_interval(struct sample_interval_s *x) {
-    int alpha = 0;
-    int beta = 1;
-    int alpha_prev = 0;
-    int denominator = 1;
-    int location = -1;
-    int b = 0;
-
-    while (location == -1) {
-        b = flip();
-
-        alpha_prev = alpha;
-        alpha = 2 * alpha + (beta - alpha) * b;
-        beta = 2 * alpha_prev + (beta - alpha_prev) * (b+1);
-
-        if ((alpha % 2 == 0) && (beta % 2 == 0)) {
-            alpha /= 2;
-            beta /= 2;
+int sample_fldr(struct sample_fldr_s *x) {
+
+    int *h = x->h;
+    int *H = x->H;
+
+    int n = x->n;
+    int k = x->k;
+    int c = 0;
+    int d = 0;
+
+    while (true) {
+        int b = flip();
+        d = 2 * d + (1-b);
+        if (d < h[c]) {
+            int s = H[d*k + c];
+            if (s < n) {
+                return s + 1;
+            } else {
+                d = 0;
+                c = 0;
+            }
+        } else {
+            d = d - h[c];
+            c = c + 1;
+        }
+    }
+}
+
+int sample_fldr_columns(struct sample_fldr_columns_s *x) {
+
+    int *h = x->h.a;
+    int *offsets = x->offsets.a;
+    int *H = x->H.a;
+
+    int n = x->n;
+    int c = 0;
+    int d = 0;
+
+    while (true) {
+        int b = flip();
+        d = 2 * d + (1-b);
+        if (d < h[c]) {
+            int s = H[offsets[c] + d];
+            if (s < n) {
+                return s + 1;
+            } else {
+                d = 0;
+                c = 0;
+            }
         } else {
-            denominator *= 2;
+            d = d - h[c];
+            c = c + 1;
         }
+    }
+}
 
-        location = binary_search_interval_nested(
-            x->cdf.a, x->Z, x->cdf.length, alpha, beta, denominator);
+// As sample_interval in sample.py: while the interval [y, y+Z)/2^m of
+// Z*U holds two or more points of cdf, y < Z*2^m with m <= bits(Z) + 1,
+// so y fits in a uint64.  Once one point c is left, t = c*2^m - y stays
+// in (0, Z) until the interval falls on either side of c.
+int sample_interval(struct sample_interval_s *x) {
+    int *cdf = x->cdf.a;
+    uint64_t Z = (uint64_t) x->Z;
+    uint64_t y = 0;
+    int m = 0;
+    int lo = 0;
+    int hi = x->cdf.length;
+
+    while (true) {
+        lo = bisect_right(cdf, lo, hi, (int64_t) (y >> m)) - 1;
+        hi = bisect_left(cdf, lo, hi, (int64_t) ((y + Z - 1) >> m) + 1);
+        if (hi == lo + 1) {
+            return lo;
+        }
+        if (cdf[lo + 1] == cdf[hi - 1]) {
+            break;
+        }
+        y = 2 * y + flip() * Z;
+        m = m + 1;
     }
 
-    return location;
+    int64_t t = ((int64_t) cdf[lo + 1] << m) - (int64_t) y;
+    while (true) {
+        t = 2 * t - flip() * (int64_t) Z;
+        if (t <= 0) {
+            return hi - 1;
+        }
+        if ((int64_t) Z <= t) {
+            return lo;
+        }
+    }
 }
 
+#ifndef SAMPLE_NO_GSL
 int sample_alias_gsl(struct sample_alias_gsl_s *x) {
     int draw = gsl_ran_discrete(x->prng, x->distribution);
     return draw;
 }
+#endif
 
 int sample_alias_exact(struct sample_alias_exact_s *x) {
     struct sample_fdr_s xn = {.n = x->n};
@@ -26,8 +26,12 @@ int sample_rejection_binary_search(struct sample_rejection_binary_search_s *x);
 int sample_rejection_encoding(struct sample_ky_encoding_s *x);
 int sample_rejection_matrix(struct sample_ky_matrix_s *x);
 int sample_rejection_matrix_cached(struct sample_ky_matrix_cached_s *x);
+int sample_fldr(struct sample_fldr_s *x);
+int sample_fldr_columns(struct sample_fldr_columns_s *x);
 
 int sample_interval(struct sample_interval_s *x);
+#ifndef SAMPLE_NO_GSL
 int sample_alias_gsl(struct sample_alias_gsl_s *x);
+#endif
 int sample_alias_exact(struct sample_alias_exact_s *x);
 #endif
@@ -13,20 +13,24 @@
 #include <stdlib.h>
 #include <stdio.h>
 
+#ifndef SAMPLE_NO_GSL
 #include <gsl/gsl_rng.h>
 #include <gsl/gsl_randist.h>
+#endif
 
-// matrix
+// matrix (if mapped, the rows are consecutive in a single mmap region)
 struct matrix_s {
     int nrows;
     int ncols;
     int **P;
+    int mapped;
 };
 
-// array
+// array (if mapped, a is an mmap region rather than from calloc)
 struct array_s {
     int length;
     int *a;
+    int mapped;
 };
 
 
@@ -52,6 +56,22 @@ struct sample_ky_matrix_cached_s {
     struct matrix_s T;
 };
 
+// sample_fldr (H is the flattened (n+1) x k matrix, see fldr.c)
+struct sample_fldr_s {
+    int n;
+    int k;
+    int *h;
+    int *H;
+};
+
+// sample_fldr_columns (column j is H[offsets[j]], ..., of length h[j])
+struct sample_fldr_columns_s {
+    int n;
+    struct array_s h;
+    struct array_s offsets;
+    struct array_s H;
+};
+
 // sample_fdr
 struct sample_fdr_s {
     int n;
@@ -100,9 +120,11 @@ struct sample_alias_exact_s {
 };
 
 // sample_alias_gsl
+#ifndef SAMPLE_NO_GSL
 struct sample_alias_gsl_s {
     gsl_rng *prng;
     gsl_ran_discrete_t *distribution;
 };
+#endif
 
 #endif
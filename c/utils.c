@@ -10,7 +10,8 @@
 #include "utils.h"
 
 int binary_search_interval(int *arr, int length, int x) {
-    int l = 0;
+    // Start at 1 since arr[0] = 0 and arr[mid-1] is read below.
+    int l = 1;
     int r = length - 1;
 
     while (l <= r) {
@@ -25,25 +26,28 @@ int binary_search_interval(int *arr, int length, int x) {
     }
 }
 
-int binary_search_interval_nested(int *arr, int arr_denominator, int length,
-        int a, int b, int denominator) {
-
-    int l = 0;
-    int r = length - 1;
-
-    int common_a = a * arr_denominator;
-    int common_b = b * arr_denominator;
+// Return the first index i in [lo, hi) with x < arr[i], or hi.
+int bisect_right(int *arr, int lo, int hi, int64_t x) {
+    while (lo < hi) {
+        int mid = lo + (hi - lo) / 2;
+        if (x < arr[mid]) {
+            hi = mid;
+        } else {
+            lo = mid + 1;
+        }
+    }
+    return lo;
+}
 
-    while (l <= r) {
-        int mid = l + (r - l) / 2;
-        if ((arr[mid-1] * denominator <= common_a)
-                && (common_b <= arr[mid] * denominator)) {
-            return mid - 1;
-        } else if (arr[mid] * denominator <= common_a) {
-            l = mid + 1;
+// Return the first index i in [lo, hi) with x <= arr[i], or hi.
+int bisect_left(int *arr, int lo, int hi, int64_t x) {
+    while (lo < hi) {
+        int mid = lo + (hi - lo) / 2;
+        if (arr[mid] < x) {
+            lo = mid + 1;
         } else {
-            r = mid - 1;
+            hi = mid;
         }
     }
-    return -1;
+    return lo;
 }
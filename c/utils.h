@@ -10,8 +10,10 @@
 #ifndef UTILS_H
 #define UTILS_H
 
+#include <stdint.h>
+
 int binary_search_interval(int *arr, int length, int x);
-int binary_search_interval_nested(int *arr, int arr_denominator,
-    int length, int a, int b, int denominator);
+int bisect_right(int *arr, int lo, int hi, int64_t x);
+int bisect_left(int *arr, int lo, int hi, int64_t x);
 
 #endif
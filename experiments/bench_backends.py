@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+#
+# Released under Apache 2.0; refer to LICENSE.txt
+
+import time
+
+import numpy as np
+
+from discrete_sampling.flip import BACKENDS
+from discrete_sampling.flip import BufferedBitStream
+from discrete_sampling.flip import make_rng
+from discrete_sampling.samplers import SAMPLERS
+from discrete_sampling.utils import sample_dirichlet_multinomial_positive
+
+from parsable import parsable
+
+def measure_bits(backend, seed, num_bits):
+    bitstream = BufferedBitStream(make_rng(backend, seed))
+    start = time.time()
+    for _i in range(num_bits // 64):
+        bitstream.take(64)
+    elapsed = time.time() - start
+    return num_bits / elapsed
+
+def measure_samples(backend, seed, sampler, num_samples):
+    sampler.bitstream = BufferedBitStream(make_rng(backend, seed))
+    start = time.time()
+    for _i in range(num_samples):
+        sampler.sample()
+    elapsed = time.time() - start
+    return (num_samples / elapsed, sampler.bitstream.calls / elapsed)
+
+@parsable
+def benchmark(N=100, Z=10001, seed=1, num_samples=100000, num_bits=10**7,
+        backends='', samplers=''):
+    """Report bits/second and samples/second of each backend and sampler."""
+    backends = backends.split(' ') if backends else BACKENDS
+    samplers = samplers.split(' ') if samplers else []
+    rng = np.random.RandomState(seed)
+    p_target = sample_dirichlet_multinomial_positive(1, N, Z, rng)
+    instances = [
+        (name, cls.from_target(p_target))
+        for name, cls in SAMPLERS.items()
+        if not samplers or name in samplers
+    ]
+    print('%-10s %-14s %14s %14s'
+        % ('backend', 'sampler', 'bits/s', 'samples/s'))
+    for backend in backends:
+        bits_per_second = measure_bits(backend, seed, num_bits)
+        print('%-10s %-14s %14.0f %14s'
+            % (backend, 'raw', bits_per_second, '-'))
+        for name, sampler in instances:
+            samples_per_second, bits_per_second = measure_samples(
+                backend, seed, sampler, num_samples)
+            print('%-10s %-14s %14.0f %14.0f' % (
+                backend, name, bits_per_second, samples_per_second))
+
+if __name__ == '__main__':
+    parsable()
@@ -15,29 +15,7 @@ matplotlib.use('Agg')
 import matplotlib.pyplot as plt
 import numpy as np
 
-from discrete_sampling.construct import construct_sample_alias
-from discrete_sampling.construct import construct_sample_interval
-from discrete_sampling.construct import construct_sample_ky_approx_encoding
-from discrete_sampling.construct import construct_sample_ky_approx_matrix
-from discrete_sampling.construct import construct_sample_ky_approx_matrix_cached
-from discrete_sampling.construct import construct_sample_ky_encoding
-from discrete_sampling.construct import construct_sample_ky_matrix
-from discrete_sampling.construct import construct_sample_ky_matrix_cached
-from discrete_sampling.construct import construct_sample_rejection_binary_search
-from discrete_sampling.construct import construct_sample_rejection_encoding
-from discrete_sampling.construct import construct_sample_rejection_hash_table
-from discrete_sampling.construct import construct_sample_rejection_matrix
-from discrete_sampling.construct import construct_sample_rejection_matrix_cached
-from discrete_sampling.construct import construct_sample_rejection_uniform
-
-from discrete_sampling.writeio import write_sample_alias
-from discrete_sampling.writeio import write_sample_interval
-from discrete_sampling.writeio import write_sample_ky_encoding
-from discrete_sampling.writeio import write_sample_ky_matrix
-from discrete_sampling.writeio import write_sample_ky_matrix_cached
-from discrete_sampling.writeio import write_sample_rejection_binary_search
-from discrete_sampling.writeio import write_sample_rejection_hash_table
-from discrete_sampling.writeio import write_sample_rejection_uniform
+from discrete_sampling.samplers import SAMPLERS
 
 from discrete_sampling.entropy import compute_entropy
 from discrete_sampling.entropy import get_alpha_entropies
@@ -75,61 +53,14 @@ def get_distribution_entropy_bounds(n, Z):
 
 def write_samplers(args):
     (samplers, dirname, idx, p_target, entropy) = args
-    structures = [
-        ('ky.enc',
-            construct_sample_ky_encoding,
-            write_sample_ky_encoding),
-        ('ky.mat',
-            construct_sample_ky_matrix,
-            write_sample_ky_matrix),
-        ('ky.matc',
-            construct_sample_ky_matrix_cached,
-            write_sample_ky_matrix_cached),
-
-        ('ky.approx.enc',
-            construct_sample_ky_approx_encoding,
-            write_sample_ky_encoding),
-        ('ky.approx.mat',
-            construct_sample_ky_approx_matrix,
-            write_sample_ky_matrix),
-        ('ky.approx.matc',
-            construct_sample_ky_approx_matrix_cached,
-            write_sample_ky_matrix_cached),
-
-        ('rej.uniform',
-            construct_sample_rejection_uniform,
-            write_sample_rejection_uniform),
-        ('rej.table',
-            construct_sample_rejection_hash_table,
-            write_sample_rejection_hash_table),
-        ('rej.binary',
-            construct_sample_rejection_binary_search,
-            write_sample_rejection_binary_search),
-
-        ('rej.enc',
-            construct_sample_rejection_encoding,
-            write_sample_ky_encoding),
-        ('rej.mat',
-            construct_sample_rejection_matrix,
-            write_sample_ky_matrix),
-        ('rej.matc',
-            construct_sample_rejection_matrix_cached,
-            write_sample_ky_matrix_cached),
-
-        ('interval',
-            construct_sample_interval,
-            write_sample_interval),
-        ('alias.exact',
-            construct_sample_alias,
-            write_sample_alias),
-    ]
-
-    for suffix, f_construct, f_write in structures:
-        if samplers and suffix not in samplers:
+    for name, cls in SAMPLERS.items():
+        if samplers and name not in samplers:
+            continue
+        if cls.f_write is None:
+            # No text format for c/main.c.
             continue
-        fpath = os.path.join(dirname, 'd.%05d.%s' % (idx, suffix))
-        struc = f_construct(p_target)
-        f_write(*struc, fpath)
+        fpath = os.path.join(dirname, 'd.%05d.%s' % (idx, name))
+        cls.from_target(p_target).write(fpath)
         print(fpath)
 
     fname_dist = 'd.%05d.dist' % (idx,)
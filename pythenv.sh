@@ -9,7 +9,7 @@ version=$("${PYTHON}" -c 'import sys; print(sys.version[0:3])')
 
 # The lib directory varies depending on
 #
-# (a) whether there are extension modules (here, no); and
+# (a) whether there are extension modules (here, yes); and
 # (b) whether some Debian maintainer decided to patch the local Python
 # to behave as though there were.
 #
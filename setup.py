@@ -129,13 +129,19 @@ setup(
         'build_py': local_build_py,
         'sdist': local_sdist,
     },
-    package_data={
-        'discrete_sampling': [
-            'binexp',
-            'decimal',
-            'orderm2',
-            'phi',
-        ],
-    },
+    ext_modules=[
+        Extension('discrete_sampling._csample',
+            sources=[
+                'c/_csample.c',
+                'c/flip.c',
+                'c/fldr.c',
+                'c/sample.c',
+                'c/utils.c',
+            ],
+            include_dirs=['c'],
+            define_macros=[('SAMPLE_NO_GSL', None)],
+            optional=True,
+        ),
+    ],
     install_requires=['numpy', 'pytest', 'scipy']
 )
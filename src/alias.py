@@ -33,6 +33,32 @@ def alias_preprocess(p_target):
             greater.add(k)
     return (K, q, j)
 
+def alias_preprocess_weights(Ms, Z):
+    """Vose's alias method for the distribution Ms/Z, in integer arithmetic.
+
+    Returns (K, Q, j) where column l keeps outcome l with probability
+    Q[l]/Z and otherwise yields j[l].  Scaling q[l] = K*Ms[l]/Z by Z turns
+    every update into an integer one, so all columns share the modulus Z.
+    """
+    K = len(Ms)
+    Q = [K * M for M in Ms]
+    j = [0] * K
+    smaller = [l for l in range(K) if Q[l] < Z]
+    greater = [l for l in range(K) if Z <= Q[l]]
+    while smaller and greater:
+        l = smaller.pop()
+        k = greater.pop()
+        j[l] = k
+        Q[k] = Q[k] - (Z - Q[l])
+        if Q[k] < Z:
+            smaller.append(k)
+        else:
+            greater.append(k)
+    # In exact arithmetic the remaining columns are full.
+    for l in smaller + greater:
+        assert Q[l] == Z
+    return (K, Q, j)
+
 def alias_sample(K, q, j):
     # Inexact version, see sample.py for exact.
     from random import random
@@ -0,0 +1,85 @@
+# Released under Apache 2.0; refer to LICENSE.txt
+
+"""Fast Loaded Dice Rollers for many distributions at once.
+
+Row i of a matrix of nonnegative integer numerators (each row with a
+positive sum Z_i) is preprocessed into the FLDR tables of the weights
+followed by the rejection weight 2^k_i - Z_i, where k_i = ceil(log2(Z_i)),
+using a single pass of NumPy operations.  The tables are stored in a
+compressed sparse row layout:
+
+    k_ptr   row i owns levels k_ptr[i], ..., k_ptr[i+1] - 1
+    h       h[k_ptr[i] + j] is the number of leaves of row i at level j
+    H_ptr   exclusive cumulative sum of h
+    H       H[H_ptr[t]:H_ptr[t+1]] are the outcomes at level t, where
+            outcome n denotes rejection
+"""
+
+import numpy
+
+from discrete_sampling.sample import sample_ddg_lockstep
+
+def get_bit_lengths(x):
+    """Return x.bit_length() for an array of nonnegative int64."""
+    x = numpy.asarray(x, dtype=numpy.int64)
+    b = numpy.zeros(x.shape, dtype=numpy.int64)
+    for s in [32, 16, 8, 4, 2, 1]:
+        big = (x >> s) > 0
+        x = numpy.where(big, x >> s, x)
+        b += numpy.where(big, s, 0)
+    return b + (x > 0)
+
+def get_precisions(Z):
+    """Return ceil(log2(Z)) for an array of positive integers (at least 1)."""
+    return numpy.maximum(get_bit_lengths(Z - 1), 1)
+
+def construct_fldr_batch(numerators):
+    """Return (n, k, k_ptr, h, H_ptr, H) for the rows of numerators."""
+    M = numpy.asarray(numerators, dtype=numpy.int64)
+    assert M.ndim == 2
+    assert numpy.all(0 <= M)
+    m, n = M.shape
+    Z = M.sum(axis=1)
+    assert numpy.all(0 < Z)
+    assert numpy.all(Z < 2**62)
+    k = get_precisions(Z)
+    M = numpy.concatenate([M, ((numpy.int64(1) << k) - Z)[:, None]], axis=1)
+    # Level j of row i holds bit k[i] - 1 - j of the numerators.
+    levels = numpy.arange(k.max())
+    shifts = k[:, None] - 1 - levels[None, :]
+    valid = 0 <= shifts
+    bits = numpy.zeros((m, len(levels), n + 1), dtype=bool)
+    for j in levels:
+        s = numpy.maximum(shifts[:, j], 0)
+        bits[:, j, :] = ((M >> s[:, None]) & 1).astype(bool)
+    bits &= valid[:, :, None]
+    h = bits.sum(axis=2, dtype=numpy.int64)[valid]
+    # Nonzero entries of bits come out ordered by (row, level, outcome).
+    H = numpy.nonzero(bits)[2]
+    k_ptr = numpy.concatenate([[0], numpy.cumsum(k)])
+    H_ptr = numpy.concatenate([[0], numpy.cumsum(h)])
+    return n, k, k_ptr, h, H_ptr, H
+
+def get_fldr_row(batch, i):
+    """Return (k, l, h, T) of row i, for sample_rejection_matrix_cached."""
+    n, k, k_ptr, h, H_ptr, H = batch
+    ki = int(k[i])
+    hi = h[k_ptr[i]:k_ptr[i+1]]
+    T = numpy.full((n + 1, ki), -1, dtype=numpy.int64)
+    for j in range(ki):
+        start = H_ptr[k_ptr[i] + j]
+        T[:hi[j], j] = H[start:start + hi[j]]
+    return ki, ki, hi.tolist(), T.tolist()
+
+def sample_rows(batch, rng, rows=None):
+    """Return one sample in 1, ..., n from each row (or from each of rows).
+
+    The random walks of all rows advance in lockstep, one bit per step,
+    and walks which reach an outcome drop out of the active set.
+    Rejected walks restart from the first level of their row.
+    """
+    n, k, k_ptr, h, H_ptr, H = batch
+    rows = numpy.arange(len(k)) if rows is None \
+        else numpy.asarray(rows, dtype=numpy.int64)
+    return sample_ddg_lockstep(h, k_ptr[rows],
+        lambda t, d: H[H_ptr[t] + d], n, rng)
@@ -0,0 +1,87 @@
+# Released under Apache 2.0; refer to LICENSE.txt
+
+"""Bounded LRU cache for number-theoretic quantities such as orderm2.
+
+The cache optionally persists its entries to an sqlite database, so that
+preprocessing runs which share a common denominator (e.g., the fixed Z
+of a sweep in experiments/dists.py) skip the number-theoretic work even
+across processes.  Keys and values are stored as decimal text since they
+may exceed the range of sqlite integers.
+"""
+
+import os
+import sqlite3
+
+from collections import OrderedDict
+
+class LRUCache(object):
+    def __init__(self, maxsize=4096, path=None):
+        assert 0 < maxsize
+        self.maxsize = maxsize
+        self.path = path
+        self.table = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.db = None
+        self.pid = None
+
+    def connect(self):
+        # Connections must not be shared with forked worker processes.
+        if self.db is None or self.pid != os.getpid():
+            self.db = sqlite3.connect(self.path, isolation_level=None)
+            self.db.execute('CREATE TABLE IF NOT EXISTS cache'
+                ' (key TEXT PRIMARY KEY, value TEXT)')
+            self.pid = os.getpid()
+        return self.db
+
+    def load(self, key):
+        if self.path is None:
+            return None
+        cursor = self.connect().execute(
+            'SELECT value FROM cache WHERE key = ?', (str(key),))
+        row = cursor.fetchone()
+        return int(row[0]) if row is not None else None
+
+    def store(self, key, value):
+        if self.path is not None:
+            self.connect().execute(
+                'INSERT OR REPLACE INTO cache VALUES (?, ?)',
+                (str(key), str(value)))
+
+    def insert(self, key, value):
+        self.table[key] = value
+        if self.maxsize < len(self.table):
+            self.table.popitem(last=False)
+
+    def get(self, key, f):
+        """Return f(key), computing it only if key is not cached."""
+        if key in self.table:
+            self.hits += 1
+            self.table.move_to_end(key)
+            return self.table[key]
+        value = self.load(key)
+        if value is not None:
+            self.disk_hits += 1
+        else:
+            self.misses += 1
+            value = f(key)
+            self.store(key, value)
+        self.insert(key, value)
+        return value
+
+    def clear(self):
+        self.table.clear()
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+
+    def info(self):
+        return {
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'size': len(self.table),
+            'maxsize': self.maxsize,
+            'path': self.path,
+        }
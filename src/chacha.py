@@ -0,0 +1,81 @@
+# Released under Apache 2.0; refer to LICENSE.txt
+
+"""ChaCha20 keystream generator, following
+
+    ChaCha20 and Poly1305 for IETF Protocols.
+    Y. Nir and A. Langley, RFC 7539, May 2015.
+    https://tools.ietf.org/html/rfc7539
+
+The 20 rounds are computed with NumPy over many blocks at once (one
+column of the state matrix per block), so the keystream is produced at
+a rate suitable for a bit source.
+"""
+
+import os
+
+import numpy
+
+CONSTANTS = numpy.frombuffer(b'expand 32-byte k', dtype='<u4')
+
+def rotl(x, r):
+    return (x << numpy.uint32(r)) | (x >> numpy.uint32(32 - r))
+
+def quarter_round(x, a, b, c, d):
+    x[a] += x[b]; x[d] ^= x[a]; x[d] = rotl(x[d], 16)
+    x[c] += x[d]; x[b] ^= x[c]; x[b] = rotl(x[b], 12)
+    x[a] += x[b]; x[d] ^= x[a]; x[d] = rotl(x[d], 8)
+    x[c] += x[d]; x[b] ^= x[c]; x[b] = rotl(x[b], 7)
+
+def chacha20_blocks(key, nonce, counter, nblocks):
+    """Return nblocks consecutive 64-byte keystream blocks as bytes."""
+    assert len(key) == 32
+    assert len(nonce) == 12
+    assert counter + nblocks <= 2**32
+    state = numpy.zeros((16, nblocks), dtype=numpy.uint32)
+    state[0:4] = CONSTANTS[:, None]
+    state[4:12] = numpy.frombuffer(key, dtype='<u4')[:, None]
+    state[12] = numpy.arange(counter, counter + nblocks, dtype=numpy.uint64)
+    state[13:16] = numpy.frombuffer(nonce, dtype='<u4')[:, None]
+    x = state.copy()
+    for _i in range(10):
+        quarter_round(x, 0, 4, 8, 12)
+        quarter_round(x, 1, 5, 9, 13)
+        quarter_round(x, 2, 6, 10, 14)
+        quarter_round(x, 3, 7, 11, 15)
+        quarter_round(x, 0, 5, 10, 15)
+        quarter_round(x, 1, 6, 11, 12)
+        quarter_round(x, 2, 7, 8, 13)
+        quarter_round(x, 3, 4, 9, 14)
+    x += state
+    return x.T.astype('<u4').tobytes()
+
+class ChaCha20(object):
+    """Source of random bytes from the ChaCha20 keystream.
+
+    The bytes method has the same signature as in numpy.random.Generator,
+    so instances can be used as the rng of a BufferedBitStream.
+    """
+    def __init__(self, key=None, nonce=bytes(12), counter=0):
+        self.key = os.urandom(32) if key is None else key
+        self.nonce = nonce
+        self.counter = counter
+        self.leftover = b''
+
+    @classmethod
+    def from_seed(cls, seed):
+        """Return generator keyed by a SeedSequence of seed, if not None."""
+        if seed is None:
+            return cls()
+        sequence = numpy.random.SeedSequence(seed)
+        key = sequence.generate_state(8, dtype=numpy.uint32)
+        return cls(key.astype('<u4').tobytes())
+
+    def bytes(self, length):
+        need = length - len(self.leftover)
+        nblocks = max(0, -(-need // 64))
+        data = self.leftover
+        if nblocks:
+            data += chacha20_blocks(self.key, self.nonce, self.counter, nblocks)
+            self.counter += nblocks
+        self.leftover = data[length:]
+        return data[:length]
@@ -1,52 +1,128 @@
 # Released under Apache 2.0; refer to LICENSE.txt
 
-from math import ceil
-from math import log2
+"""Preprocess a distribution into the structure of each sampler.
+
+Each construct_sample_X(p_target) takes a list of Fractions summing to one,
+and construct_sample_X_from_weights(weights) takes nonnegative integer
+weights (a list or a numpy array) instead, going directly to the numerators
+Ms and their sum Z without any rational arithmetic.  Both give the same
+structure for the same distribution.
+"""
+
+import numpy
 
 from discrete_sampling.matrix import make_ddg_matrix
 from discrete_sampling.matrix import make_hamming_matrix
 from discrete_sampling.matrix import make_hamming_vector
 
-from discrete_sampling.rejection import get_rejection_Ms_k
-from discrete_sampling.rejection import get_rejection_cdf
-from discrete_sampling.rejection import get_rejection_precision
-from discrete_sampling.rejection import get_rejection_table
+from discrete_sampling.alias import alias_preprocess_weights
 
-from discrete_sampling.alias import alias_preprocess
+from discrete_sampling.fldr import get_fldr_precision
+from discrete_sampling.rejection import get_bit_planes
+from discrete_sampling.rejection import get_rejection_k
+from discrete_sampling.rejection import make_rejection_cdf
+from discrete_sampling.rejection import make_rejection_table
 
 from discrete_sampling.utils import get_Zkl
 from discrete_sampling.utils import get_binary_expansion_length
 from discrete_sampling.utils import get_common_denominator
 from discrete_sampling.utils import get_common_numerators
 from discrete_sampling.utils import get_dyadic_approximation
+from discrete_sampling.utils import reduce_weights
 
+from discrete_sampling.packing import make_dyadic_encoding
+from discrete_sampling.packing import make_encoding_table
 from discrete_sampling.packing import pack_tree
 from discrete_sampling.tree import make_ddg_tree
 
+def get_target_weights(p_target):
+    """Return the numerators of p_target in their common denominator."""
+    Z = get_common_denominator(p_target)
+    return get_common_numerators(Z, p_target)
+
 def construct_sample_ky_encoding(p_target):
-    P, k, l = construct_sample_ky_matrix(p_target)
+    return construct_sample_ky_encoding_from_weights(
+        get_target_weights(p_target))
+
+def construct_sample_ky_encoding_from_weights(weights):
+    P, k, l = construct_sample_ky_matrix_from_weights(weights)
     root = make_ddg_tree(P, k, l)
     enc = {}
     pack_tree(enc, root, 0)
     n = len(P)
     return [enc[i] for i in range(len(enc))], n, k
 
+def construct_sample_ky_encoding_table(p_target, r=4):
+    return construct_sample_ky_encoding_table_from_weights(
+        get_target_weights(p_target), r)
+
+def construct_sample_ky_encoding_table_from_weights(weights, r=4):
+    """Return (r, steps, targets) for sample_ky_encoding_table.
+
+    Larger r takes fewer lookups per sample, for 2^r entries per table."""
+    enc, _n, _k = construct_sample_ky_encoding_from_weights(weights)
+    steps, targets = make_encoding_table(enc, r)
+    return r, steps, targets
+
 def construct_sample_ky_matrix(p_target):
-    Z = get_common_denominator(p_target)
+    return construct_sample_ky_matrix_from_weights(
+        get_target_weights(p_target))
+
+def construct_sample_ky_matrix_from_weights(weights):
+    Ms, Z = reduce_weights(weights)
     k, l = get_binary_expansion_length(Z)
     Zkl = get_Zkl(k, l)
-    Ms = get_common_numerators(Zkl, p_target)
-    P, kp, lp = make_ddg_matrix(Ms, k, l)
+    scale = Zkl // Z
+    P, kp, lp = make_ddg_matrix([M * scale for M in Ms], k, l)
     return P, kp, lp
 
 def construct_sample_ky_matrix_cached(p_target):
-    P, k, l = construct_sample_ky_matrix(p_target)
+    return construct_sample_ky_matrix_cached_from_weights(
+        get_target_weights(p_target))
+
+def construct_sample_ky_matrix_cached_from_weights(weights):
+    P, k, l = construct_sample_ky_matrix_from_weights(weights)
     h = make_hamming_vector(P)
     T = make_hamming_matrix(P)
     return k, l, h, T
 
+def get_ky_word_chunks(h, k, l, width):
+    """Return the thresholds of the levels 0, ..., k-1 in chunks of at most
+    width levels, followed by those of the periodic levels l, ..., k-1."""
+    def get_chunks(start):
+        chunks = []
+        for a in range(start, k, width):
+            m = min(width, k - a)
+            B = 0
+            G = []
+            for j in range(m):
+                B = 2*B + h[a + j]
+                G.append(B << (m - 1 - j))
+            chunks.append((a, m, G))
+        return chunks
+    chunks = get_chunks(0)
+    cycle = len(chunks)
+    return chunks + get_chunks(l), cycle
+
+def construct_sample_ky_word(p_target, width=64):
+    return construct_sample_ky_word_from_weights(
+        get_target_weights(p_target), width)
+
+def construct_sample_ky_word_from_weights(weights, width=64):
+    """Return (h, T, chunks, cycle) for sample_ky_word."""
+    k, l, h, T = construct_sample_ky_matrix_cached_from_weights(weights)
+    chunks, cycle = get_ky_word_chunks(h, k, l, width)
+    return h, T, chunks, cycle
+
 def construct_sample_ky_approx_encoding(p_target):
     P, k, l = construct_sample_ky_approx_matrix(p_target)
+    return get_approx_encoding(P, k, l)
+
+def construct_sample_ky_approx_encoding_from_weights(weights):
+    P, k, l = construct_sample_ky_approx_matrix_from_weights(weights)
+    return get_approx_encoding(P, k, l)
+
+def get_approx_encoding(P, k, l):
     root = make_ddg_tree(P, k, l)
     enc = {}
     pack_tree(enc, root, 0)
@@ -59,12 +135,23 @@ def construct_sample_ky_approx_matrix(p_target):
     lp = len(P[0])
     return (P, kp, lp)
 
+def construct_sample_ky_approx_matrix_from_weights(weights):
+    # The approximation is of the floating-point probabilities.
+    Ms, Z = reduce_weights(weights)
+    return construct_sample_ky_approx_matrix([M / Z for M in Ms])
+
 def construct_sample_ky_approx_matrix_cached(p_target):
     P, k, l = construct_sample_ky_approx_matrix(p_target)
     h = make_hamming_vector(P)
     T = make_hamming_matrix(P)
     return k, l, h, T
 
+def construct_sample_ky_approx_matrix_cached_from_weights(weights):
+    P, k, l = construct_sample_ky_approx_matrix_from_weights(weights)
+    h = make_hamming_vector(P)
+    T = make_hamming_matrix(P)
+    return k, l, h, T
+
 def construct_sample_fdr(n):
     return n
 
@@ -72,53 +159,112 @@ def construct_sample_bernoulli(a, n):
     return a, n
 
 def construct_sample_rejection_uniform(p_target):
-    Z = get_common_denominator(p_target)
-    Ms = get_common_numerators(Z, p_target)
+    return construct_sample_rejection_uniform_from_weights(
+        get_target_weights(p_target))
+
+def construct_sample_rejection_uniform_from_weights(weights):
+    Ms, _Z = reduce_weights(weights)
     M = max(Ms)
-    n = len(p_target)
+    n = len(Ms)
     return Ms, M, n
 
 def construct_sample_rejection_hash_table(p_target):
-    Z = get_common_denominator(p_target)
-    k = get_rejection_precision(p_target)
-    T = get_rejection_table(p_target)
+    return construct_sample_rejection_hash_table_from_weights(
+        get_target_weights(p_target))
+
+def construct_sample_rejection_hash_table_from_weights(weights):
+    Ms, Z = reduce_weights(weights)
+    T = make_rejection_table(Ms)
+    k = get_rejection_k(Z)
     return T, Z, k
 
 def construct_sample_rejection_binary_search(p_target):
-    cdf = get_rejection_cdf(p_target)
-    Z = get_common_denominator(p_target)
-    k = get_rejection_precision(p_target)
+    return construct_sample_rejection_binary_search_from_weights(
+        get_target_weights(p_target))
+
+def construct_sample_rejection_binary_search_from_weights(weights):
+    Ms, Z = reduce_weights(weights)
+    cdf = make_rejection_cdf(Ms)
+    k = get_rejection_k(Z)
     return cdf, Z, k
 
+def get_rejection_weights_k(weights):
+    Ms, Z = reduce_weights(weights)
+    k = get_rejection_k(Z)
+    return Ms + [2**k - Z], k
+
 def construct_sample_rejection_encoding(p_target):
-    P, k, l = construct_sample_rejection_matrix(p_target)
-    root = make_ddg_tree(P, k, l)
-    enc = {}
-    pack_tree(enc, root, 0)
-    encoding = [enc[i] for i in range(len(enc))]
-    n = len(P)
-    return encoding, n, k
+    return construct_sample_rejection_encoding_from_weights(
+        get_target_weights(p_target))
+
+def construct_sample_rejection_encoding_from_weights(weights):
+    Ms, k = get_rejection_weights_k(weights)
+    encoding, kp = make_dyadic_encoding(Ms, k)
+    n = len(Ms)
+    return encoding, n, kp
+
+def construct_sample_rejection_encoding_table(p_target, r=4):
+    return construct_sample_rejection_encoding_table_from_weights(
+        get_target_weights(p_target), r)
+
+def construct_sample_rejection_encoding_table_from_weights(weights, r=4):
+    """Return (r, steps, targets, n) for sample_rejection_encoding_table."""
+    enc, n, _k = construct_sample_rejection_encoding_from_weights(weights)
+    steps, targets = make_encoding_table(enc, r)
+    return r, steps, targets, n
 
 def construct_sample_rejection_matrix(p_target):
-    Ms, k = get_rejection_Ms_k(p_target)
+    return construct_sample_rejection_matrix_from_weights(
+        get_target_weights(p_target))
+
+def construct_sample_rejection_matrix_from_weights(weights):
+    Ms, k = get_rejection_weights_k(weights)
     P, kp, lp = make_ddg_matrix(Ms, k, k)
     return P, kp, lp
 
 def construct_sample_rejection_matrix_cached(p_target):
-    P, k, l = construct_sample_rejection_matrix(p_target)
+    return construct_sample_rejection_matrix_cached_from_weights(
+        get_target_weights(p_target))
+
+def construct_sample_rejection_matrix_cached_from_weights(weights):
+    P, k, l = construct_sample_rejection_matrix_from_weights(weights)
     h = make_hamming_vector(P)
     T = make_hamming_matrix(P)
     return k, l, h, T
 
+def construct_sample_fldr_columns(p_target):
+    return construct_sample_fldr_columns_from_weights(
+        get_target_weights(p_target))
+
+def construct_sample_fldr_columns_from_weights(weights):
+    """Return (n, h, offsets, H) with the columns of the FLDR matrix stored
+    contiguously: column j is H[offsets[j]:offsets[j+1]], of length h[j],
+    and outcome n denotes rejection."""
+    Ms, Z = reduce_weights(weights)
+    n = len(Ms)
+    k = get_fldr_precision(Z)
+    bits = get_bit_planes(Ms + [2**k - Z], k)
+    h = bits.sum(axis=0, dtype=numpy.int32)
+    offsets = numpy.concatenate([[0], numpy.cumsum(h)])
+    # The nonzero bits of the transpose come out ordered by column.
+    H = numpy.nonzero(bits.T)[1]
+    return n, h.tolist(), offsets.tolist(), H.tolist()
+
 def construct_sample_interval(p_target):
-    n = len(p_target)
-    cdf = get_rejection_cdf(p_target)
-    Z = get_common_denominator(p_target)
-    k = ceil(log2(n))
+    return construct_sample_interval_from_weights(
+        get_target_weights(p_target))
+
+def construct_sample_interval_from_weights(weights):
+    Ms, Z = reduce_weights(weights)
+    n = len(Ms)
+    cdf = make_rejection_cdf(Ms)
+    k = (n - 1).bit_length()
     return cdf, Z, k
 
 def construct_sample_alias(p_target):
-    (n, q, j) = alias_preprocess(p_target)
-    qs = [x.numerator for x in q]
-    Ms = [x.denominator for x in q]
-    return n, qs, Ms, j
+    return construct_sample_alias_from_weights(get_target_weights(p_target))
+
+def construct_sample_alias_from_weights(weights):
+    Ms, Z = reduce_weights(weights)
+    (n, qs, j) = alias_preprocess_weights(Ms, Z)
+    return n, qs, [Z] * n, j
@@ -1,5 +1,6 @@
 # Released under Apache 2.0; refer to LICENSE.txt
 
+from fractions import Fraction
 from math import log2
 
 import multiprocessing
@@ -18,6 +19,80 @@ def compute_entropy(ps):
     """Compute binary entropy of the probability vector ps."""
     return sum(-log2(p)*p for p in ps if p != 0)
 
+def compute_ddg_expected_bits(h, k, l):
+    """Compute expected number of flips to reach a leaf of a DDG tree.
+
+    Column j of the DDG matrix has h[j] leaves at depth j+1, and columns
+    l, ..., k-1 repeat forever with period k - l (if l < k).
+    """
+    m = k - l
+    r = Fraction(1, 2**m)
+    total = Fraction(0)
+    for j in range(k):
+        mass = Fraction(h[j], 2**(j+1))
+        if j < l:
+            total += (j+1) * mass
+        else:
+            total += mass * ((j+1) / (1-r) + m*r / (1-r)**2)
+    return float(total)
+
+def compute_fdr_expected_bits(n):
+    """Compute expected number of flips used by sample_fdr(n)."""
+    # After each flip v doubles and, once n <= v, the sampler continues
+    # with probability (v - n)/v <= 1/2 from the v - n remaining states.
+    total = 0.
+    p = 1.
+    v = 1
+    while 1e-17 < p:
+        total += p
+        v = 2*v
+        if n <= v:
+            p *= (v - n) / v
+            v = v - n
+    return total
+
+def compute_interval_expected_bits(cdf, Z):
+    """Compute expected number of flips used by sample_interval(cdf, Z)."""
+    # After d flips the sampler holds a dyadic interval of width 2^-d and
+    # stops unless some cdf[i]/Z lies in its interior.  When 2^d > Z, no
+    # two such points lie in the same interval.
+    Z = int(Z)
+    boundaries = sorted(set(int(c) for c in cdf if 0 < c < Z))
+    D = Z.bit_length()
+    # The first flip is needed unless a single outcome has all the mass.
+    total = Fraction(1) if boundaries else Fraction(0)
+    for d in range(1, D):
+        straddled = {(c << d) // Z for c in boundaries if (c << d) % Z}
+        total += Fraction(len(straddled), 2**d)
+    for c in boundaries:
+        b = Fraction(c, Z).denominator
+        e = b.bit_length() - 1
+        if b != 1 << e:
+            total += Fraction(2, 2**D)
+        elif D < e:
+            total += Fraction(2, 2**D) - Fraction(2, 2**e)
+    return float(total)
+
+def compute_table_expected_bits(r, steps, targets, n=None):
+    """Compute expected number of flips used by sample_ky_encoding_table,
+    or by sample_rejection_encoding_table if n is given."""
+    if len(steps) == 0:
+        return 0.
+    # Each of the 2^r entries of table i is taken with probability 2^-r,
+    # after which the walk stops, moves to table targets[e], or (for the
+    # label n) restarts from table 0.
+    m = len(steps) >> r
+    A = numpy.eye(m)
+    b = numpy.zeros(m)
+    for e, (s, t) in enumerate(zip(steps, targets)):
+        i = e >> r
+        b[i] += s / 2**r
+        if 0 <= t:
+            A[i, t] -= 1 / 2**r
+        elif -t == n:
+            A[i, 0] -= 1 / 2**r
+    return float(numpy.linalg.solve(A, b)[0])
+
 def get_alpha_entropies(n, maxalpha=5, numalpha=1000, parallel=None):
     """Get alphas for generating dists with entropies [0, ..., log(n)]."""
     rng = numpy.random.RandomState(1)
@@ -0,0 +1,135 @@
+# Released under Apache 2.0; refer to LICENSE.txt
+
+"""Fast Loaded Dice Roller over a mutable table of integer weights.
+
+The sampler stores the matrices h and H from make_rejection_ddg_matrix,
+where column j of H lists the outcomes whose weight has bit j set (most
+significant bit first) and the last outcome n denotes rejection.  The
+order of the outcomes within a column does not affect the distribution,
+so changing one weight only needs to insert or remove the outcome from
+the columns of the bits that changed, plus the same for the rejection
+weight 2^k - Z.  The structure is rebuilt from scratch only when the
+precision k = ceil(log2(Z)) changes.
+
+The weights (and so Z and k) may be arbitrarily large, while the entries
+of h and H, and the depth d of the random walk, stay below 2(n+1).  The
+C version is _csample.preprocess_fldr, whose weights are passed as 64-bit
+limbs from get_weight_limbs.
+"""
+
+import numpy
+
+from discrete_sampling.rejection import get_bit_planes
+from discrete_sampling.sample import sample_rejection_matrix_cached_batch
+
+def get_fldr_precision(Z):
+    """Return k = ceil(log2(Z)), using at least one bit."""
+    return max(1, (Z - 1).bit_length())
+
+def get_weight_limbs(weights):
+    """Return (limbs, nlimbs) for _csample.preprocess_fldr.
+
+    Each weight is split into nlimbs 64-bit limbs, least significant first,
+    where nlimbs is the fewest that hold the largest weight.
+    """
+    weights = [int(w) for w in weights]
+    assert all(0 <= w for w in weights)
+    nlimbs = max(1, (max(weights, default=0).bit_length() + 63) // 64)
+    data = b''.join(w.to_bytes(8*nlimbs, 'little') for w in weights)
+    limbs = numpy.frombuffer(data, dtype='<u8').astype(numpy.uint64)
+    return limbs, nlimbs
+
+class FLDRSampler(object):
+    def __init__(self, weights):
+        self.weights = [int(w) for w in weights]
+        assert all(0 <= w for w in self.weights)
+        self.rebuild()
+
+    def rebuild(self):
+        self.n = len(self.weights)
+        self.Z = sum(self.weights)
+        assert 0 < self.Z
+        self.k = get_fldr_precision(self.Z)
+        n, k = self.n, self.k
+        numerators = self.weights + [(1 << k) - self.Z]
+        bits = get_bit_planes(numerators, k).astype(numpy.int64)
+        h = bits.sum(axis=0)
+        order = numpy.argsort(1 - bits, axis=0, kind='stable')
+        depth = numpy.arange(n+1)[:, None]
+        H = numpy.where(depth < h[None, :], order, -1)
+        # loc[i*k + j] is the depth of outcome i in column j, or -1.
+        loc = numpy.where(bits == 1, numpy.cumsum(bits, axis=0) - 1, -1)
+        self.h = h.tolist()
+        self.H = H.ravel().tolist()
+        self.loc = loc.ravel().tolist()
+
+    def insert(self, i, j):
+        k = self.k
+        d = self.h[j]
+        self.H[d*k + j] = i
+        self.loc[i*k + j] = d
+        self.h[j] += 1
+
+    def remove(self, i, j):
+        # Move the last outcome in column j into the vacated slot.
+        k = self.k
+        d = self.loc[i*k + j]
+        last = self.h[j] - 1
+        r = self.H[last*k + j]
+        self.H[d*k + j] = r
+        self.loc[r*k + j] = d
+        self.H[last*k + j] = -1
+        self.loc[i*k + j] = -1
+        self.h[j] -= 1
+
+    def patch(self, i, M_old, M_new):
+        k = self.k
+        diff = M_old ^ M_new
+        while diff:
+            s = diff.bit_length() - 1
+            j = (k - 1) - s
+            if (M_new >> s) & 1:
+                self.insert(i, j)
+            else:
+                self.remove(i, j)
+            diff ^= 1 << s
+
+    def update(self, i, weight):
+        """Set weights[i] to weight, patching h and H in place."""
+        weight = int(weight)
+        assert 0 <= weight
+        Z = self.Z - self.weights[i] + weight
+        assert 0 < Z
+        if get_fldr_precision(Z) != self.k:
+            self.weights[i] = weight
+            self.rebuild()
+            return
+        M_reject = 1 << self.k
+        self.patch(i, self.weights[i], weight)
+        self.patch(self.n, M_reject - self.Z, M_reject - Z)
+        self.weights[i] = weight
+        self.Z = Z
+
+    def sample(self, bitstream):
+        """Return an outcome in 1, ..., n with probability weights[i-1]/Z."""
+        n, k, h, H = self.n, self.k, self.h, self.H
+        d = 0
+        c = 0
+        while True:
+            b = next(bitstream)
+            d = 2*d + (1 - b)
+            if d < h[c]:
+                s = H[d*k + c]
+                if s < n:
+                    return s + 1
+                d = 0
+                c = 0
+            else:
+                d = d - h[c]
+                c = c + 1
+
+    def sample_n(self, size, rng):
+        """Return size samples, using sample_rejection_matrix_cached_batch."""
+        T = numpy.reshape(self.H, (self.n + 1, self.k))
+        return sample_rejection_matrix_cached_batch(
+            self.k, self.k, self.h, T, size, rng)
@@ -7,6 +7,12 @@
     https://arxiv.org/abs/1304.1916
 """
 
+import os
+
+import numpy
+
+from discrete_sampling.chacha import ChaCha20
+
 class BitStream(object):
     def __init__(self, k, rng):
         self.k = k
@@ -25,3 +31,135 @@ class BitStream(object):
     def __next__(self):
         self.calls += 1
         return self.flip()
+
+    def __iter__(self):
+        return self
+
+    def take(self, m):
+        x = 0
+        for _i in range(m):
+            x = (x << 1) | next(self)
+        return x
+
+class BufferedBitStream(object):
+    """Bit source which serves bits from a block of 64-bit words.
+
+    The words are drawn block at a time from rng (a numpy Generator or
+    RandomState) or from os.urandom if rng is None.  As in BitStream,
+    calls counts the number of bits consumed and words counts the number
+    of 64-bit words used.
+    """
+    def __init__(self, rng=None, block=1024):
+        self.rng = rng
+        self.block = block
+        self.buffer = []
+        self.index = 0
+        self.word = 0
+        self.pos = 0
+        self.calls = 0
+        self.words = 0
+
+    def refill(self):
+        if self.index == len(self.buffer):
+            self.buffer = get_random_words(self.rng, self.block).tolist()
+            self.index = 0
+        self.word = self.buffer[self.index]
+        self.index += 1
+        self.pos = 64
+        self.words += 1
+
+    def flip(self):
+        if self.pos == 0:
+            self.refill()
+        self.pos -= 1
+        return (self.word >> self.pos) & 1
+
+    def __next__(self):
+        self.calls += 1
+        if self.pos == 0:
+            self.refill()
+        self.pos -= 1
+        return (self.word >> self.pos) & 1
+
+    def __iter__(self):
+        return self
+
+    def take(self, m):
+        """Return the integer whose binary digits are the next m bits."""
+        self.calls += m
+        if m <= self.pos:
+            self.pos -= m
+            return (self.word >> self.pos) & ((1 << m) - 1)
+        x = 0
+        while m > 0:
+            if self.pos == 0:
+                self.refill()
+            t = min(m, self.pos)
+            self.pos -= t
+            x = (x << t) | ((self.word >> self.pos) & ((1 << t) - 1))
+            m -= t
+        return x
+
+    def bytes(self, nbytes):
+        """Return the next nbytes // 8 whole words as bytes, so that the
+        bitstream can stand in for rng in get_random_words.  The bits of
+        the words are counted as consumed."""
+        assert nbytes % 8 == 0
+        size = nbytes // 8
+        rest = self.buffer[self.index:self.index + size]
+        self.index += len(rest)
+        words = numpy.concatenate([numpy.array(rest, dtype='<u8'),
+            get_random_words(self.rng, size - len(rest))])
+        self.calls += 64 * size
+        self.words += size
+        return words.tobytes()
+
+    def peek(self, m):
+        """Return the integer of the next m bits, without consuming them."""
+        if m <= self.pos:
+            return (self.word >> (self.pos - m)) & ((1 << m) - 1)
+        x = 0
+        word = self.word
+        pos = self.pos
+        index = self.index
+        while m > 0:
+            if pos == 0:
+                if index == len(self.buffer):
+                    # Append a block after the unread words, so that the
+                    # bits still come from rng in the same order.
+                    block = get_random_words(self.rng, self.block).tolist()
+                    self.buffer = self.buffer[self.index:] + block
+                    index -= self.index
+                    self.index = 0
+                word = self.buffer[index]
+                index += 1
+                pos = 64
+            t = min(m, pos)
+            pos -= t
+            x = (x << t) | ((word >> pos) & ((1 << t) - 1))
+            m -= t
+        return x
+
+def get_random_words(rng, size):
+    """Return size independent uniform 64-bit words from rng or os.urandom."""
+    data = os.urandom(8*size) if rng is None else rng.bytes(8*size)
+    return numpy.frombuffer(data, dtype='<u8')
+
+BACKENDS = ('pcg64', 'philox', 'chacha20', 'urandom')
+
+def make_rng(backend, seed=None):
+    """Return a byte source for BufferedBitStream using the given backend.
+
+    The pcg64 and philox backends are numpy Generators, chacha20 is the
+    ChaCha20 keystream, and urandom reads the OS entropy pool (in which
+    case None is returned and seed is ignored).
+    """
+    if backend == 'pcg64':
+        return numpy.random.Generator(numpy.random.PCG64(seed))
+    if backend == 'philox':
+        return numpy.random.Generator(numpy.random.Philox(seed))
+    if backend == 'chacha20':
+        return ChaCha20.from_seed(seed)
+    if backend == 'urandom':
+        return None
+    raise ValueError('Unknown backend: %s' % (backend,))
@@ -14,6 +14,8 @@
     consumption in either case is the same).
 """
 
+from bisect import bisect_right
+
 from discrete_sampling.utils import cumsum
 
 def preprocess_interval(p_target, k):
@@ -27,27 +29,22 @@ def preprocess_interval(p_target, k):
 
 def sample_interval_no_preprocess(p_target, k, J, bitstream):
     # Implementation assumes cached J, for benchmarking.
-    u = 2**(k-1)
     R = 2**(k-1)
-    N = len(p_target)
-    s = ()
-    alpha = {s: 0}
-    beta = {s: u}
-    I = {s: (alpha[s], beta[s])}
+    starts = [j[0] for j in J]
+    alpha = 0
     nflips = 0
     while True:
         nflips += 1
         a = 1 + next(bitstream)
-        sa = s + (a,)
-        alpha[sa] = alpha[s] + (a-1)*R/2
-        beta[sa] = alpha[s] + a*R/2
-        I[sa] = (alpha[sa], beta[sa])
-        R = R/2
-        # TODO: Use binary search.
-        for b in range(N):
-            if J[b][0] <= alpha[sa] <= beta[sa] <= J[b][1]:
-                return b
-        s = sa
+        # Halving R = 2^(k-1) stays exact for the k-1 flips allowed.
+        R = R // 2
+        alpha = alpha + (a-1)*R
+        beta = alpha + R
+        # The last interval starting at or before alpha is the only one
+        # which can contain [alpha, beta].
+        b = bisect_right(starts, alpha) - 1
+        if beta <= J[b][1]:
+            return b
         if nflips == k-1:
             assert False, 'Fatal error: too many bits consumed.'
 
@@ -1,5 +1,9 @@
 # !/usr/bin/env python
 
+import numpy
+
+from discrete_sampling.rejection import get_bit_planes
+
 def pack_tree(enc, node, offset):
     assert node.loc is None
     node.loc = offset
@@ -22,3 +26,112 @@ def pack_tree(enc, node, offset):
         w = pack_tree(enc, node.right, w)
     # Return the next offset.
     return w
+
+def make_dyadic_encoding(Ms, k):
+    """Return packed encoding of the DDG tree of (M/2^k | M in Ms).
+
+    The encoding is emitted level by level directly from the numerators,
+    without building the intermediate tree.  Each internal node occupies
+    two cells (the locations of its left and right children) and each
+    leaf occupies one cell (the negated label).  In each level, the
+    internal nodes are stored before the leaves and, as in make_leaf_table,
+    outcomes are assigned to the leaves from right to left.
+
+    Returns the encoding and the depth of the tree.
+    """
+    assert 0 < k
+    assert sum(Ms) == 1 << k
+    for i, M in enumerate(Ms):
+        if M == 1 << k:
+            return [-(i+1)], 1
+    # The rows with a nonzero bit at each level, found once from the bit
+    # planes, in increasing order of level and then of row.
+    levels, planes = numpy.nonzero(get_bit_planes(Ms, k).T)
+    bounds = numpy.searchsorted(levels, numpy.arange(k + 1)).tolist()
+    planes = planes.tolist()
+    enc = []
+    # Number of internal nodes and leaves at the current level.
+    internal = 1
+    leaves = []
+    depth = 0
+    while internal > 0:
+        rows = planes[bounds[depth]:bounds[depth+1]]
+        internal_next = 2*internal - len(rows)
+        assert 0 <= internal_next
+        # The next level starts after the cells of the current level.
+        start = len(enc) + 2*internal + len(leaves)
+        for t in range(2*internal):
+            if t < internal_next:
+                enc.append(start + 2*t)
+            else:
+                enc.append(start + 2*internal_next + (t - internal_next))
+        enc.extend(leaves)
+        leaves = [-(rows[2*internal - 1 - t] + 1)
+            for t in range(internal_next, 2*internal)]
+        internal = internal_next
+        depth += 1
+    enc.extend(leaves)
+    return enc, depth
+
+def get_encoding_levels(enc):
+    """Return the leaf labels at each level of the packed encoding enc.
+
+    The levels are found by a breadth-first walk from the root.  The walk
+    stops when a level has no internal nodes or has the same internal
+    nodes as an earlier level l, in which case levels l, ..., k-1 repeat
+    forever as in a DDG matrix with parameters (k, l).
+
+    Returns the list of labels of the leaves at depth 1, ..., k and (k, l).
+    """
+    if len(enc) == 1:
+        return [], 0, 0
+    seen = {}
+    level = (0,)
+    leaves = []
+    while level and frozenset(level) not in seen:
+        seen[frozenset(level)] = len(leaves)
+        children = [enc[c + b] for c in level for b in [0, 1]]
+        leaves.append([-enc[c] for c in children if enc[c] < 0])
+        level = tuple(c for c in children if 0 <= enc[c])
+    k = len(leaves)
+    l = seen[frozenset(level)] if level else k
+    return leaves, k, l
+
+def make_encoding_table(enc, r):
+    """Return jump tables (steps, targets) which walk enc r bits at a time.
+
+    Table i belongs to an internal node of enc (table 0 to the root) and
+    has 2^r entries, one for each r-bit chunk x of randomness.  Entry
+    e = i*2^r + x records the walk from the node along the bits of x (most
+    significant first): it stops after steps[e] bits at the leaf with label
+    -targets[e], or after all r bits at the internal node with table
+    targets[e] >= 0.  Tables are made only for the nodes reached this way,
+    so memory grows as 2^r times the number of such nodes.
+    """
+    assert 0 < r
+    if len(enc) == 1:
+        return [], []
+    index = {0: 0}
+    nodes = [0]
+    steps = []
+    targets = []
+    i = 0
+    while i < len(nodes):
+        node = nodes[i]
+        i += 1
+        for x in range(1 << r):
+            c = node
+            for t in range(1, r + 1):
+                c = enc[c + ((x >> (r - t)) & 1)]
+                if enc[c] < 0:
+                    break
+            if enc[c] < 0:
+                steps.append(t)
+                targets.append(enc[c])
+            else:
+                if c not in index:
+                    index[c] = len(nodes)
+                    nodes.append(c)
+                steps.append(r)
+                targets.append(index[c])
+    return steps, targets
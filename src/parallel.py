@@ -0,0 +1,103 @@
+# Released under Apache 2.0; refer to LICENSE.txt
+
+"""Draw many samples from one FLDR structure using several processes.
+
+The arrays h and H of the structure are copied once into shared memory,
+which each worker maps read-only.  Worker i fills its contiguous slice of
+a shared output array using sample_rejection_matrix_cached_batch, driven
+by the i-th child of numpy.random.SeedSequence(seed).spawn(workers), so
+the output depends only on the seed and the number of workers.
+"""
+
+import multiprocessing
+import weakref
+
+from multiprocessing import shared_memory
+
+import numpy
+
+from discrete_sampling.sample import sample_rejection_matrix_cached_batch
+
+def get_fldr_arrays(sampler):
+    """Return (k, h, T) of an FLDRSampler or a 'rej.matc' Sampler."""
+    if hasattr(sampler, 'H'):
+        k = sampler.k
+        h = numpy.asarray(sampler.h, dtype=numpy.int64)
+        T = numpy.reshape(numpy.asarray(sampler.H, dtype=numpy.int64),
+            (sampler.n + 1, k))
+    else:
+        assert sampler.l == sampler.k
+        k = sampler.k
+        h = numpy.asarray(sampler.h, dtype=numpy.int64)
+        T = numpy.asarray(sampler.T, dtype=numpy.int64)
+    return k, h, T
+
+def share_array(array):
+    shm = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+    view = numpy.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)
+    view[...] = array
+    return shm
+
+def attach_array(name, shape):
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, numpy.ndarray(shape, dtype=numpy.int64, buffer=shm.buf)
+
+def sample_worker(args):
+    (k, h_name, h_shape, T_name, T_shape, out_name, out_shape,
+        start, stop, seed, chunk) = args
+    rng = numpy.random.default_rng(seed)
+    blocks = [attach_array(h_name, h_shape), attach_array(T_name, T_shape),
+        attach_array(out_name, out_shape)]
+    (_, h), (_, T), (_, out) = blocks
+    for i in range(start, stop, chunk):
+        j = min(i + chunk, stop)
+        out[i:j] = sample_rejection_matrix_cached_batch(k, k, h, T, j - i, rng)
+    del h, T, out
+    for shm, _view in blocks:
+        shm.close()
+
+def release_array(shm):
+    shm.close()
+    shm.unlink()
+
+def parallel_sample(sampler, total, workers=None, seed=None, chunk=2**20):
+    """Return total samples from the FLDR sampler, using workers processes.
+
+    The result is reproducible for a given seed and number of workers.  It
+    is a view of the shared memory which the workers filled (not a copy),
+    and the shared memory is released with the array.
+    """
+    workers = multiprocessing.cpu_count() if workers is None else workers
+    assert 0 < workers
+    k, h, T = get_fldr_arrays(sampler)
+    seeds = numpy.random.SeedSequence(seed).spawn(workers)
+    out_shape = (total,)
+    out_shm = shared_memory.SharedMemory(create=True, size=max(1, 8*total))
+    try:
+        blocks = [share_array(h), share_array(T)]
+    except BaseException:
+        release_array(out_shm)
+        raise
+    try:
+        h_shm, T_shm = blocks
+        bounds = [total * i // workers for i in range(workers + 1)]
+        args = [
+            (k, h_shm.name, h.shape, T_shm.name, T.shape,
+                out_shm.name, out_shape, bounds[i], bounds[i+1], seeds[i],
+                chunk)
+            for i in range(workers)
+        ]
+        if workers == 1:
+            list(map(sample_worker, args))
+        else:
+            with multiprocessing.Pool(workers) as pool:
+                pool.map(sample_worker, args)
+    except BaseException:
+        release_array(out_shm)
+        raise
+    finally:
+        for shm in blocks:
+            release_array(shm)
+    out = numpy.ndarray(out_shape, dtype=numpy.int64, buffer=out_shm.buf)
+    weakref.finalize(out, release_array, out_shm)
+    return out
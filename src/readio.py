@@ -0,0 +1,77 @@
+# Released under Apache 2.0; refer to LICENSE.txt
+
+"""Loading sampling data structures written by writeio.write_*_binary.
+
+Arrays are returned as read-only numpy.memmap objects over the file, so
+loading a structure costs no parsing and the pages are faulted in only
+as the sampler touches them.
+"""
+
+import numpy
+
+from discrete_sampling.writeio import BINARY_FIELD
+from discrete_sampling.writeio import BINARY_HEADER
+from discrete_sampling.writeio import BINARY_MAGIC
+from discrete_sampling.writeio import BINARY_VERSION
+
+def is_binary(fname):
+    with open(fname, 'rb') as f:
+        return f.read(len(BINARY_MAGIC)) == BINARY_MAGIC
+
+def read_binary(fname):
+    """Return the kind and list of fields stored in a binary file."""
+    with open(fname, 'rb') as f:
+        header = f.read(BINARY_HEADER.size)
+        magic, version, nfields, kind = BINARY_HEADER.unpack(header)
+        assert magic == BINARY_MAGIC, 'Not a binary sampler file: %s' % (fname,)
+        assert version == BINARY_VERSION, 'Unknown version: %d' % (version,)
+        records = [BINARY_FIELD.unpack(f.read(BINARY_FIELD.size))
+            for _i in range(nfields)]
+    fields = []
+    for ndim, itemsize, value, nrows, ncols in records:
+        if ndim == 0:
+            fields.append(value)
+            continue
+        dtype = numpy.dtype('<i%d' % (itemsize,))
+        shape = (nrows,) if ndim == 1 else (nrows, ncols)
+        if nrows * max(ncols, 1) == 0:
+            fields.append(numpy.zeros(shape, dtype=dtype))
+        else:
+            fields.append(numpy.memmap(fname, dtype=dtype, mode='r',
+                offset=value, shape=shape))
+    return kind.rstrip(b'\0').decode('ascii'), fields
+
+def read_sample_binary(kind, fname):
+    kind_file, fields = read_binary(fname)
+    assert kind_file == kind, 'Expected %s, found %s' % (kind, kind_file)
+    return tuple(fields)
+
+def read_sample_ky_encoding_binary(fname):
+    return read_sample_binary('ky_encoding', fname)
+
+def read_sample_ky_matrix_binary(fname):
+    return read_sample_binary('ky_matrix', fname)
+
+def read_sample_ky_matrix_cached_binary(fname):
+    return read_sample_binary('ky_matrix_cached', fname)
+
+def read_sample_fdr_binary(fname):
+    return read_sample_binary('fdr', fname)
+
+def read_sample_inversion_bernoulli_binary(fname):
+    return read_sample_binary('inversion_bernoulli', fname)
+
+def read_sample_rejection_uniform_binary(fname):
+    return read_sample_binary('rejection_uniform', fname)
+
+def read_sample_rejection_hash_table_binary(fname):
+    return read_sample_binary('rejection_hash_table', fname)
+
+def read_sample_rejection_binary_search_binary(fname):
+    return read_sample_binary('rejection_binary_search', fname)
+
+def read_sample_interval_binary(fname):
+    return read_sample_binary('interval', fname)
+
+def read_sample_alias_binary(fname):
+    return read_sample_binary('alias', fname)
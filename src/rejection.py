@@ -1,19 +1,23 @@
 # Released under Apache 2.0; refer to LICENSE.txt
 
+import itertools
+
 from fractions import Fraction
-from math import ceil
-from math import log2
 
-from numpy import cumsum
+import numpy
 
 from discrete_sampling.entropy import compute_entropy
 from discrete_sampling.utils import get_binary_expansion
 from discrete_sampling.utils import get_common_denominator
 from discrete_sampling.utils import get_common_numerators
 
+def get_rejection_k(Z):
+    """Return the number of bits k of a uniform draw W < 2^k for Z."""
+    return (Z - 1).bit_length()
+
 def get_rejection_precision(p_target):
     Z = get_common_denominator(p_target)
-    return ceil(log2(Z))
+    return get_rejection_k(Z)
 
 def get_rejection_p_success(p_target):
     Z = get_common_denominator(p_target)
@@ -35,14 +39,18 @@ def get_rejection_probabilities(p_target):
     return [Fraction(n, 2**k) for n in numerators] + [p_reject]
 
 def get_rejection_Ms_k(p_target):
-    # TODO: Use get_common_numerators from utils.
-    p_rejection = get_rejection_probabilities(p_target)
+    Z = get_common_denominator(p_target)
     k = get_rejection_precision(p_target)
-    return [int(2**k * p) for p in p_rejection], k
+    numerators = get_common_numerators(Z, p_target)
+    return numerators + [2**k - Z], k
 
 def get_rejection_table(p_target):
     Z = get_common_denominator(p_target)
     numerators = get_common_numerators(Z, p_target)
+    return make_rejection_table(numerators)
+
+def make_rejection_table(numerators):
+    Z = sum(numerators)
     T = [0] * Z
     j = 0
     for i, n in enumerate(numerators):
@@ -54,8 +62,24 @@ def get_rejection_table(p_target):
 def get_rejection_cdf(p_target):
     Z = get_common_denominator(p_target)
     numerators = get_common_numerators(Z, p_target)
-    cdf = [0] + list(cumsum(numerators))
-    return cdf
+    return make_rejection_cdf(numerators)
+
+def make_rejection_cdf(numerators):
+    return [0] + list(itertools.accumulate(numerators))
+
+def get_bit_planes(numerators, k):
+    """Return the bits of the numerators (one row each) as a uint8 matrix,
+    most significant bit first, using k bits for each numerator."""
+    if k < 63:
+        M = numpy.array(numerators, dtype=numpy.int64)
+        shifts = numpy.arange(k-1, -1, -1, dtype=numpy.int64)
+        return ((M[:, None] >> shifts[None, :]) & 1).astype(numpy.uint8)
+    # Unpack the big-endian bytes of the (arbitrary precision) numerators.
+    nbytes = (k + 7) // 8
+    data = b''.join(int(M).to_bytes(nbytes, 'big') for M in numerators)
+    octets = numpy.frombuffer(data, dtype=numpy.uint8)
+    bits = numpy.unpackbits(octets.reshape(len(numerators), nbytes), axis=1)
+    return bits[:, 8*nbytes - k:]
 
 def make_rejection_ddg_matrix(p_target):
     n = len(p_target)
@@ -64,20 +88,14 @@ def make_rejection_ddg_matrix(p_target):
     Ms = get_common_numerators(Z, p_target)
     M_reject = (1 << k) - Z
 
-    h = [0] * k
-    H = [-1] * ((n+1)*k)
-
-    for j in range(k):
-        d = 0
-        for i in range(n):
-            w = (Ms[i] >> ((k-1) -j)) & 1
-            h[j] += (w > 0)
-            if w > 0:
-                H[d*k + j] = i
-                d += 1
-        w = (M_reject >> ((k-1) -j)) & 1
-        h[j] += (w > 0)
-        if w > 0:
-            H[d*k +j] = n
-
-    return h, H
+    # The bit planes of the numerators, most significant bit first.
+    bits = get_bit_planes(Ms + [M_reject], k)
+    h = bits.sum(axis=0, dtype=numpy.int32)
+
+    # A stable sort of each column moves the rows with a nonzero bit to
+    # the top, in increasing order of the row index.
+    order = numpy.argsort(1 - bits, axis=0, kind='stable')
+    depth = numpy.arange(n+1)[:, None]
+    H = numpy.where(depth < h[None, :], order, -1).astype(numpy.int32)
+
+    return h, H.ravel()
@@ -1,5 +1,18 @@
 # Released under Apache 2.0; refer to LICENSE.txt
 
+from bisect import bisect_left
+from bisect import bisect_right
+
+import numpy
+
+from discrete_sampling.flip import BufferedBitStream
+from discrete_sampling.flip import get_random_words
+
+def get_bitstream(rng):
+    """Return rng if it is a BufferedBitStream, else one drawing from rng."""
+    return rng if isinstance(rng, BufferedBitStream) \
+        else BufferedBitStream(rng)
+
 def sample_ky_encoding(enc, bitstream):
     if len(enc) == 1:
         assert enc[0] == -1
@@ -12,6 +25,24 @@ def sample_ky_encoding(enc, bitstream):
         if enc[c] < 0:
             return -enc[c]
 
+def sample_ky_encoding_table(r, steps, targets, bitstream):
+    """Walk the tables of make_encoding_table, r bits per lookup.
+
+    Each lookup peeks at r bits and consumes only those the bitwise walk
+    would, so the samples equal those of sample_ky_encoding on the same
+    bitstream (a BufferedBitStream).
+    """
+    if len(steps) == 0:
+        return 1
+    i = 0
+    while True:
+        e = (i << r) | bitstream.peek(r)
+        # The tables may be arrays loaded from disk.
+        bitstream.take(int(steps[e]))
+        i = int(targets[e])
+        if i < 0:
+            return -i
+
 def sample_ky_matrix(P, k, l, bitstream):
     if len(P) == 1:
         assert P[0][0] == 1
@@ -54,6 +85,35 @@ def sample_ky_matrix_cached(k, l, h, T, bitstream):
         else:
             c = c + 1
 
+def sample_ky_word(h, T, chunks, cycle, bitstream):
+    """Sample the Knuth-Yao tree of sample_ky_matrix_cached, one chunk of
+    levels at a time.
+
+    Entering the chunk of levels a, ..., a+m-1 with depth d, let V be d
+    followed by the next m (complemented) bits.  The walk stops at level
+    a+j for the least j with V < G[j], where G[j] is the cumulative leaf
+    count B[j] = 2*B[j-1] + h[a+j] shifted left by m-1-j.  G is increasing
+    in j, so a bisection replaces the per-bit branches.  Only the bits up
+    to the stopping level are consumed, as in the bitwise walk, so the
+    samples are the same for the same bitstream (a BufferedBitStream).
+    """
+    if len(T) == 1:
+        return 1
+    d = 0
+    i = 0
+    while True:
+        a, m, G = chunks[i]
+        V = (d << m) | (bitstream.peek(m) ^ ((1 << m) - 1))
+        j = bisect_right(G, V)
+        if j < m:
+            bitstream.take(j + 1)
+            s = m - 1 - j
+            d = (V >> s) - (G[j] >> s) + h[a + j]
+            return T[d][a + j] + 1
+        bitstream.take(m)
+        d = V - G[m - 1]
+        i = i + 1 if i + 1 < len(chunks) else cycle
+
 def sample_fdr(n, bitstream):
     # https://arxiv.org/pdf/1304.1916.pdf
     v = 1
@@ -112,6 +172,12 @@ def sample_rejection_encoding(enc, n, bitstream):
         if s < n:
             return s
 
+def sample_rejection_encoding_table(r, steps, targets, n, bitstream):
+    while True:
+        s = sample_ky_encoding_table(r, steps, targets, bitstream)
+        if s < n:
+            return s
+
 def sample_rejection_matrix(P, k, l, bitstream):
     n = len(P)
     while True:
@@ -126,29 +192,138 @@ def sample_rejection_matrix_cached(k, l, h, T, bitstream):
         if s < n:
             return s
 
-def sample_interval(cdf, Z, bitstream):
-    from .utils import binary_search_interval_nested
-    alpha = 0
-    beta = 1
-    denominator = 1
-    location = None
+def sample_ddg_lockstep(h, start, get_labels, n, rng):
+    """Return one sample per walk, advancing all random walks in lockstep.
 
-    while location is None:
-        b = next(bitstream)
-        alpha_prev = alpha
-        alpha = 2 * alpha + (beta - alpha) * b
-        beta = 2 * alpha_prev + (beta - alpha_prev) * (b+1)
+    Walk i starts at level start[i], where level t has h[t] leaves whose
+    labels are get_labels(t, d) for arrays of levels t and leaves d.  A
+    label s < n returns sample s + 1, and any other label restarts the walk.
+    """
+    size = len(start)
+    samples = numpy.zeros(size, dtype=numpy.int64)
+    # Each active walk has an output slot, a word of random bits, and its
+    # position (d, t) in the tree.
+    idx = numpy.arange(size)
+    start = numpy.asarray(start, dtype=numpy.int64)
+    d = numpy.zeros(size, dtype=numpy.int64)
+    t = start.copy()
+    pos = 0
+    while len(idx) > 0:
+        if pos == 0:
+            words = get_random_words(rng, len(idx))
+            pos = 64
+        pos -= 1
+        b = (words >> numpy.uint64(pos)) & numpy.uint64(1)
+        d = 2*d + 1 - b.astype(numpy.int64)
+        ht = h[t]
+        leaf = d < ht
+        s = numpy.full(len(idx), n, dtype=numpy.int64)
+        s[leaf] = get_labels(t[leaf], d[leaf])
+        d = numpy.where(leaf, 0, d - ht)
+        t = numpy.where(leaf, start, t + 1)
+        done = s < n
+        if numpy.any(done):
+            samples[idx[done]] = s[done] + 1
+            keep = ~done
+            idx = idx[keep]
+            words = words[keep]
+            start = start[keep]
+            d = d[keep]
+            t = t[keep]
+    return samples
 
-        if (alpha % 2 == 0) and (beta % 2 == 0):
-            alpha //= 2
-            beta //= 2
+def sample_rejection_matrix_cached_batch(k, l, h, T, size, rng):
+    """Return size samples, advancing all random walks in lockstep."""
+    h = numpy.asarray(h, dtype=numpy.int64)
+    T = numpy.asarray(T, dtype=numpy.int64)
+    n = len(T)
+    assert T.shape == (n, k)
+    assert l == k
+    # Label n - 1 is the rejection outcome.
+    return sample_ddg_lockstep(h, numpy.zeros(size, dtype=numpy.int64),
+        lambda t, d: T[d, t], n - 1, rng)
+
+def sample_fldr_columns(n, h, offsets, H, bitstream):
+    d = 0
+    c = 0
+    while True:
+        b = next(bitstream)
+        d = 2*d + (1 - b)
+        if d < h[c]:
+            s = H[offsets[c] + d]
+            if s < n:
+                return s + 1
+            d = 0
+            c = 0
         else:
-            denominator *= 2
+            d = d - h[c]
+            c = c + 1
 
-        location = binary_search_interval_nested(
-            cdf, Z, alpha, beta, denominator)
+def sample_fldr_columns_batch(n, h, offsets, H, size, rng):
+    """Return size samples, advancing all random walks in lockstep."""
+    h = numpy.asarray(h, dtype=numpy.int64)
+    offsets = numpy.asarray(offsets, dtype=numpy.int64)
+    H = numpy.asarray(H, dtype=numpy.int64)
+    return sample_ddg_lockstep(h, numpy.zeros(size, dtype=numpy.int64),
+        lambda t, d: H[offsets[t] + d], n, rng)
 
-    return location
+def sample_interval(cdf, Z, bitstream):
+    """Return i in 0, ..., n-1 such that cdf[i] <= Z*U < cdf[i+1], where
+    the bits of U are drawn from bitstream until i is determined."""
+    return resume_interval(cdf, Z, 0, 0, bitstream)
+
+def resume_interval(cdf, Z, y, m, bitstream):
+    """Continue sample_interval after m bits, when Z*U is in [y, y+Z)/2^m.
+
+    While the interval holds two or more distinct points of cdf, y has at
+    most m + bits(Z) bits, and m <= bits(Z) + 1.  Once only one point c is
+    left, the state renormalises to t = c*2^m - y, which stays in (0, Z)
+    until the interval falls on either side of c.
+    """
+    lo = 0
+    hi = len(cdf)
+    while True:
+        lo = bisect_right(cdf, y >> m, lo, hi) - 1
+        hi = bisect_left(cdf, ((y + Z - 1) >> m) + 1, lo, hi)
+        if hi == lo + 1:
+            return lo
+        if cdf[lo + 1] == cdf[hi - 1]:
+            break
+        y = 2*y + next(bitstream) * Z
+        m += 1
+    t = (cdf[lo + 1] << m) - y
+    while True:
+        t = 2*t - next(bitstream) * Z
+        if t <= 0:
+            return hi - 1
+        if Z <= t:
+            return lo
+
+def sample_interval_batch(cdf, Z, size, rng):
+    """Return size samples of sample_interval (in 0, ..., n-1).
+
+    Each sample starts from w = 64 - bits(Z) random bits at once, so that
+    y = W*Z fits in a uint64, and the few samples whose interval still
+    holds a point of cdf continue with resume_interval.
+    """
+    Z = int(Z)
+    w = 64 - Z.bit_length()
+    bitstream = get_bitstream(rng)
+    if w < 1:
+        return numpy.fromiter(
+            (sample_interval(cdf, Z, bitstream) for _i in range(size)),
+            dtype=numpy.int64, count=size)
+    cdf_array = numpy.asarray(cdf, dtype=numpy.uint64)
+    words = get_random_words(rng, size) >> numpy.uint64(64 - w)
+    y = words * numpy.uint64(Z)
+    lo = numpy.searchsorted(cdf_array, y >> numpy.uint64(w), side='right') - 1
+    hi = numpy.searchsorted(cdf_array,
+        ((y + numpy.uint64(Z - 1)) >> numpy.uint64(w)) + numpy.uint64(1),
+        side='left')
+    samples = lo.astype(numpy.int64)
+    for i in numpy.flatnonzero(hi != lo + 1):
+        samples[i] = resume_interval(cdf, Z, int(y[i]), w, bitstream)
+    return samples
 
 def sample_alias(n, qs, Ms, j, bitstream):
     n = sample_fdr(n, bitstream)
@@ -156,3 +331,39 @@ def sample_alias(n, qs, Ms, j, bitstream):
     if x == 1:
         return n
     return j[n-1] + 1
+
+def sample_alias_batch(n, qs, Ms, j, size, rng):
+    """Return size samples of the alias method with a shared modulus Z.
+
+    Each sample draws one integer u uniform on {0, ..., n*Z - 1}, by
+    rejection on w-bit words where 2^(w-1) < n*Z <= 2^w.  Column u // Z
+    keeps its outcome if u % Z < qs[u // Z], which has probability
+    qs[u // Z] / Z, so no floating point is involved.
+    """
+    Z = int(Ms[0])
+    assert all(M == Z for M in Ms)
+    N = n * Z
+    if 2**64 < N:
+        bitstream = get_bitstream(rng)
+        return numpy.fromiter(
+            (sample_alias(n, qs, Ms, j, bitstream) for _i in range(size)),
+            dtype=numpy.int64, count=size)
+    w = (N - 1).bit_length()
+    qs = numpy.asarray(qs, dtype=numpy.uint64)
+    j = numpy.asarray(j, dtype=numpy.int64)
+    u = numpy.zeros(size, dtype=numpy.uint64)
+    idx = numpy.arange(size)
+    while len(idx) > 0:
+        words = get_random_words(rng, len(idx))
+        # Shifting a uint64 by 64 is undefined, so handle w == 0 apart.
+        v = words >> numpy.uint64(64 - w) if w else numpy.zeros_like(words)
+        if N < 2**64:
+            accept = v < numpy.uint64(N)
+        else:
+            accept = numpy.ones(len(v), dtype=bool)
+        u[idx[accept]] = v[accept]
+        idx = idx[~accept]
+    column = u // numpy.uint64(Z)
+    keep = u % numpy.uint64(Z) < qs[column]
+    column = column.astype(numpy.int64)
+    return numpy.where(keep, column, j[column]) + 1
@@ -0,0 +1,556 @@
+# Released under Apache 2.0; refer to LICENSE.txt
+
+"""Registry of samplers which hold their preprocessed data structures.
+
+Each class wraps one construct_sample_X / sample_X / write_sample_X
+triple.  The structure is built (or loaded) once and kept in the slots of
+the instance, so that drawing a sample does not rebuild or re-validate
+the argument tuple.  The registry is keyed by the names of the samplers
+in experiments/dists.py and c/main.c.
+"""
+
+from abc import ABC
+from abc import abstractmethod
+from fractions import Fraction
+
+import numpy
+
+from discrete_sampling.construct import construct_sample_alias
+from discrete_sampling.construct import construct_sample_alias_from_weights
+from discrete_sampling.construct import construct_sample_fldr_columns
+from discrete_sampling.construct import construct_sample_fldr_columns_from_weights
+from discrete_sampling.construct import construct_sample_interval
+from discrete_sampling.construct import construct_sample_interval_from_weights
+from discrete_sampling.construct import construct_sample_ky_approx_encoding
+from discrete_sampling.construct import construct_sample_ky_approx_encoding_from_weights
+from discrete_sampling.construct import construct_sample_ky_approx_matrix
+from discrete_sampling.construct import construct_sample_ky_approx_matrix_from_weights
+from discrete_sampling.construct import construct_sample_ky_approx_matrix_cached
+from discrete_sampling.construct import construct_sample_ky_approx_matrix_cached_from_weights
+from discrete_sampling.construct import construct_sample_ky_encoding
+from discrete_sampling.construct import construct_sample_ky_encoding_from_weights
+from discrete_sampling.construct import construct_sample_ky_encoding_table
+from discrete_sampling.construct import construct_sample_ky_encoding_table_from_weights
+from discrete_sampling.construct import construct_sample_ky_matrix
+from discrete_sampling.construct import construct_sample_ky_matrix_from_weights
+from discrete_sampling.construct import construct_sample_ky_matrix_cached
+from discrete_sampling.construct import construct_sample_ky_matrix_cached_from_weights
+from discrete_sampling.construct import construct_sample_ky_word
+from discrete_sampling.construct import construct_sample_ky_word_from_weights
+from discrete_sampling.construct import construct_sample_rejection_binary_search
+from discrete_sampling.construct import construct_sample_rejection_binary_search_from_weights
+from discrete_sampling.construct import construct_sample_rejection_encoding
+from discrete_sampling.construct import construct_sample_rejection_encoding_from_weights
+from discrete_sampling.construct import construct_sample_rejection_encoding_table
+from discrete_sampling.construct import construct_sample_rejection_encoding_table_from_weights
+from discrete_sampling.construct import construct_sample_rejection_hash_table
+from discrete_sampling.construct import construct_sample_rejection_hash_table_from_weights
+from discrete_sampling.construct import construct_sample_rejection_matrix
+from discrete_sampling.construct import construct_sample_rejection_matrix_from_weights
+from discrete_sampling.construct import construct_sample_rejection_matrix_cached
+from discrete_sampling.construct import construct_sample_rejection_matrix_cached_from_weights
+from discrete_sampling.construct import construct_sample_rejection_uniform
+from discrete_sampling.construct import construct_sample_rejection_uniform_from_weights
+
+from discrete_sampling.sample import sample_alias
+from discrete_sampling.sample import sample_alias_batch
+from discrete_sampling.sample import sample_fldr_columns
+from discrete_sampling.sample import sample_fldr_columns_batch
+from discrete_sampling.sample import sample_interval
+from discrete_sampling.sample import sample_interval_batch
+from discrete_sampling.sample import sample_ky_encoding
+from discrete_sampling.sample import sample_ky_encoding_table
+from discrete_sampling.sample import sample_ky_matrix
+from discrete_sampling.sample import sample_ky_word
+from discrete_sampling.sample import sample_rejection_binary_search
+from discrete_sampling.sample import sample_rejection_encoding_table
+from discrete_sampling.sample import sample_rejection_hash_table
+from discrete_sampling.sample import sample_rejection_matrix_cached_batch
+from discrete_sampling.sample import sample_rejection_uniform
+
+from discrete_sampling.writeio import get_binary_array
+from discrete_sampling.writeio import write_binary
+from discrete_sampling.writeio import write_sample_alias
+from discrete_sampling.writeio import write_sample_interval
+from discrete_sampling.writeio import write_sample_ky_encoding
+from discrete_sampling.writeio import write_sample_ky_matrix
+from discrete_sampling.writeio import write_sample_ky_matrix_cached
+from discrete_sampling.writeio import write_sample_rejection_binary_search
+from discrete_sampling.writeio import write_sample_rejection_hash_table
+from discrete_sampling.writeio import write_sample_rejection_uniform
+
+from discrete_sampling.entropy import compute_ddg_expected_bits
+from discrete_sampling.entropy import compute_fdr_expected_bits
+from discrete_sampling.entropy import compute_interval_expected_bits
+from discrete_sampling.entropy import compute_table_expected_bits
+from discrete_sampling.flip import BufferedBitStream
+from discrete_sampling.matrix import make_hamming_vector
+from discrete_sampling.packing import get_encoding_levels
+from discrete_sampling.readio import read_sample_binary
+from discrete_sampling.stream import iter_alias
+from discrete_sampling.stream import iter_rejection_uniform
+
+SAMPLERS = {}
+
+def register(cls):
+    SAMPLERS[cls.name] = cls
+    return cls
+
+def get_sampler(name):
+    """Return the Sampler class registered under name, e.g., 'rej.matc'."""
+    if name not in SAMPLERS:
+        raise ValueError('Unknown sampler: %s' % (name,))
+    return SAMPLERS[name]
+
+class Sampler(ABC):
+    """Base class for a sampler and its preprocessed structure.
+
+    Subclasses set fields to the names of the entries of the tuple
+    returned by f_construct (which are also their __slots__), and kind to
+    the kind of the structure in the binary format of writeio.  The
+    method sample returns an outcome in 1, ..., n.
+    """
+    __slots__ = ('bitstream',)
+    name = None
+    kind = None
+    fields = ()
+    f_construct = None
+    f_construct_weights = None
+    f_write = None
+
+    def __init__(self, structure, bitstream=None):
+        assert len(structure) == len(self.fields)
+        for field, value in zip(self.fields, structure):
+            setattr(self, field, value)
+        self.bitstream = BufferedBitStream() \
+            if bitstream is None else bitstream
+
+    @classmethod
+    def from_target(cls, p_target, bitstream=None):
+        return cls(cls.f_construct(p_target), bitstream)
+
+    @classmethod
+    def from_weights(cls, weights, bitstream=None):
+        """Build the sampler from nonnegative integer weights."""
+        return cls(cls.f_construct_weights(weights), bitstream)
+
+    @classmethod
+    def load(cls, fname, bitstream=None):
+        if cls.kind is None:
+            raise TypeError('%s has no binary format' % (cls.name,))
+        return cls(read_sample_binary(cls.kind, fname), bitstream)
+
+    def save(self, fname):
+        if self.kind is None:
+            raise TypeError('%s has no binary format' % (self.name,))
+        write_binary(self.kind, self.structure(), fname)
+
+    def write(self, fname):
+        """Write the structure in the text format read by c/readio.c."""
+        self.f_write(*self.structure(), fname)
+
+    def structure(self):
+        return tuple(getattr(self, field) for field in self.fields)
+
+    @property
+    def nbytes(self):
+        """Size of the arrays of the structure, as stored on disk."""
+        return sum(get_binary_array(x).nbytes
+            for x in self.structure() if 0 < numpy.ndim(x))
+
+    @property
+    @abstractmethod
+    def expected_bits_per_sample(self):
+        pass
+
+    @abstractmethod
+    def sample(self):
+        pass
+
+    def sample_n(self, n):
+        """Return n samples as an array.  Subclasses which vectorize this
+        draw whole words through bitstream.bytes, which counts them."""
+        return numpy.fromiter((self.sample() for _i in range(n)),
+            dtype=numpy.int64, count=n)
+
+    def iter_samples(self, bitstream):
+        """Yield samples forever, drawing the bits from bitstream."""
+        sampler = self if bitstream is self.bitstream \
+            else type(self)(self.structure(), bitstream)
+        sample = sampler.sample
+        while True:
+            yield sample()
+
+def get_rejection_expected_bits(h, k, l, p_reject):
+    return compute_ddg_expected_bits(h, k, l) / (1 - p_reject)
+
+@register
+class KYEncodingSampler(Sampler):
+    name = 'ky.enc'
+    kind = 'ky_encoding'
+    __slots__ = fields = ('enc', 'n', 'k')
+    f_construct = staticmethod(construct_sample_ky_encoding)
+    f_construct_weights = staticmethod(
+        construct_sample_ky_encoding_from_weights)
+    f_write = staticmethod(write_sample_ky_encoding)
+
+    def sample(self):
+        return sample_ky_encoding(self.enc, self.bitstream)
+
+    @property
+    def expected_bits_per_sample(self):
+        leaves, k, l = get_encoding_levels(self.enc)
+        return compute_ddg_expected_bits([len(x) for x in leaves], k, l)
+
+@register
+class KYMatrixSampler(Sampler):
+    name = 'ky.mat'
+    kind = 'ky_matrix'
+    __slots__ = fields = ('P', 'k', 'l')
+    f_construct = staticmethod(construct_sample_ky_matrix)
+    f_construct_weights = staticmethod(construct_sample_ky_matrix_from_weights)
+    f_write = staticmethod(write_sample_ky_matrix)
+
+    def sample(self):
+        return sample_ky_matrix(self.P, self.k, self.l, self.bitstream)
+
+    @property
+    def expected_bits_per_sample(self):
+        if len(self.P) == 1:
+            return 0.
+        h = make_hamming_vector(self.P)
+        return compute_ddg_expected_bits(h, self.k, self.l)
+
+@register
+class KYMatrixCachedSampler(Sampler):
+    name = 'ky.matc'
+    kind = 'ky_matrix_cached'
+    __slots__ = fields = ('k', 'l', 'h', 'T')
+    f_construct = staticmethod(construct_sample_ky_matrix_cached)
+    f_construct_weights = staticmethod(
+        construct_sample_ky_matrix_cached_from_weights)
+    f_write = staticmethod(write_sample_ky_matrix_cached)
+
+    def __init__(self, structure, bitstream=None):
+        Sampler.__init__(self, structure, bitstream)
+        assert len(self.T) == 1 or len(self.T[0]) == self.k
+        assert 0 <= self.l <= self.k
+
+    def walk(self):
+        # Return the 0-based row of the leaf reached from the root.
+        k, l, h, T = self.k, self.l, self.h, self.T
+        bitstream = self.bitstream
+        d = 0
+        c = 0
+        while True:
+            b = next(bitstream)
+            d = 2*d + (1 - b)
+            if d < h[c]:
+                return T[d][c]
+            d = d - h[c]
+            c = c + 1 if c < k - 1 else l
+
+    def sample(self):
+        if len(self.T) == 1:
+            return 1
+        return self.walk() + 1
+
+    @property
+    def expected_bits_per_sample(self):
+        if len(self.T) == 1:
+            return 0.
+        return compute_ddg_expected_bits(self.h, self.k, self.l)
+
+@register
+class KYWordSampler(Sampler):
+    # The chunks are ragged, so this structure has no binary format.
+    name = 'ky.word'
+    __slots__ = fields = ('h', 'T', 'chunks', 'cycle')
+    f_construct = staticmethod(construct_sample_ky_word)
+    f_construct_weights = staticmethod(construct_sample_ky_word_from_weights)
+
+    def sample(self):
+        return sample_ky_word(self.h, self.T, self.chunks, self.cycle,
+            self.bitstream)
+
+    @property
+    def nbytes(self):
+        return get_binary_array(self.h).nbytes \
+            + get_binary_array(self.T).nbytes \
+            + 8 * sum(m for _a, m, _G in self.chunks)
+
+    @property
+    def expected_bits_per_sample(self):
+        if len(self.T) == 1:
+            return 0.
+        k = len(self.h)
+        l = self.chunks[self.cycle][0] if self.cycle < len(self.chunks) else k
+        return compute_ddg_expected_bits(self.h, k, l)
+
+@register
+class KYEncodingTableSampler(Sampler):
+    name = 'ky.enc.table'
+    kind = 'ky_encoding_table'
+    __slots__ = fields = ('r', 'steps', 'targets')
+    f_construct = staticmethod(construct_sample_ky_encoding_table)
+    f_construct_weights = staticmethod(
+        construct_sample_ky_encoding_table_from_weights)
+
+    def sample(self):
+        return sample_ky_encoding_table(self.r, self.steps, self.targets,
+            self.bitstream)
+
+    @property
+    def expected_bits_per_sample(self):
+        return compute_table_expected_bits(self.r, self.steps, self.targets)
+
+@register
+class KYApproxEncodingSampler(KYEncodingSampler):
+    name = 'ky.approx.enc'
+    __slots__ = ()
+    f_construct = staticmethod(construct_sample_ky_approx_encoding)
+    f_construct_weights = staticmethod(
+        construct_sample_ky_approx_encoding_from_weights)
+
+@register
+class KYApproxMatrixSampler(KYMatrixSampler):
+    name = 'ky.approx.mat'
+    __slots__ = ()
+    f_construct = staticmethod(construct_sample_ky_approx_matrix)
+    f_construct_weights = staticmethod(
+        construct_sample_ky_approx_matrix_from_weights)
+
+@register
+class KYApproxMatrixCachedSampler(KYMatrixCachedSampler):
+    name = 'ky.approx.matc'
+    __slots__ = ()
+    f_construct = staticmethod(construct_sample_ky_approx_matrix_cached)
+    f_construct_weights = staticmethod(
+        construct_sample_ky_approx_matrix_cached_from_weights)
+
+@register
+class RejectionUniformSampler(Sampler):
+    name = 'rej.uniform'
+    kind = 'rejection_uniform'
+    __slots__ = fields = ('Ms', 'M', 'n')
+    f_construct = staticmethod(construct_sample_rejection_uniform)
+    f_construct_weights = staticmethod(
+        construct_sample_rejection_uniform_from_weights)
+    f_write = staticmethod(write_sample_rejection_uniform)
+
+    def sample(self):
+        return sample_rejection_uniform(self.Ms, self.M, self.n,
+            self.bitstream)
+
+    def iter_samples(self, bitstream):
+        return iter_rejection_uniform(self.Ms, self.M, self.n, bitstream)
+
+    @property
+    def expected_bits_per_sample(self):
+        # Each trial draws a uniform index and a Bernoulli (two flips on
+        # average), and succeeds with probability Z / (n M).
+        Z = sum(int(M) for M in self.Ms)
+        bits_per_trial = compute_fdr_expected_bits(self.n) + 2
+        return bits_per_trial * self.n * self.M / Z
+
+@register
+class RejectionHashTableSampler(Sampler):
+    name = 'rej.table'
+    kind = 'rejection_hash_table'
+    __slots__ = fields = ('T', 'Z', 'k')
+    f_construct = staticmethod(construct_sample_rejection_hash_table)
+    f_construct_weights = staticmethod(
+        construct_sample_rejection_hash_table_from_weights)
+    f_write = staticmethod(write_sample_rejection_hash_table)
+
+    def sample(self):
+        return sample_rejection_hash_table(self.T, self.Z, self.k,
+            self.bitstream)
+
+    @property
+    def expected_bits_per_sample(self):
+        return self.k * 2**self.k / self.Z
+
+@register
+class RejectionBinarySearchSampler(Sampler):
+    name = 'rej.binary'
+    kind = 'rejection_binary_search'
+    __slots__ = fields = ('cdf', 'Z', 'k')
+    f_construct = staticmethod(construct_sample_rejection_binary_search)
+    f_construct_weights = staticmethod(
+        construct_sample_rejection_binary_search_from_weights)
+    f_write = staticmethod(write_sample_rejection_binary_search)
+
+    def sample(self):
+        return sample_rejection_binary_search(self.cdf, self.Z, self.k,
+            self.bitstream)
+
+    @property
+    def expected_bits_per_sample(self):
+        return self.k * 2**self.k / self.Z
+
+@register
+class RejectionEncodingSampler(KYEncodingSampler):
+    name = 'rej.enc'
+    __slots__ = ()
+    f_construct = staticmethod(construct_sample_rejection_encoding)
+    f_construct_weights = staticmethod(
+        construct_sample_rejection_encoding_from_weights)
+
+    def sample(self):
+        while True:
+            s = sample_ky_encoding(self.enc, self.bitstream)
+            if s < self.n:
+                return s
+
+    @property
+    def expected_bits_per_sample(self):
+        leaves, k, l = get_encoding_levels(self.enc)
+        p_reject = sum(Fraction(x.count(self.n), 2**(j+1))
+            for j, x in enumerate(leaves))
+        h = [len(x) for x in leaves]
+        return get_rejection_expected_bits(h, k, l, p_reject)
+
+@register
+class RejectionEncodingTableSampler(KYEncodingTableSampler):
+    name = 'rej.enc.table'
+    kind = 'rejection_encoding_table'
+    __slots__ = ('n',)
+    fields = ('r', 'steps', 'targets', 'n')
+    f_construct = staticmethod(construct_sample_rejection_encoding_table)
+    f_construct_weights = staticmethod(
+        construct_sample_rejection_encoding_table_from_weights)
+
+    def sample(self):
+        return sample_rejection_encoding_table(self.r, self.steps,
+            self.targets, self.n, self.bitstream)
+
+    @property
+    def expected_bits_per_sample(self):
+        return compute_table_expected_bits(self.r, self.steps, self.targets,
+            self.n)
+
+@register
+class RejectionMatrixSampler(KYMatrixSampler):
+    name = 'rej.mat'
+    __slots__ = ()
+    f_construct = staticmethod(construct_sample_rejection_matrix)
+    f_construct_weights = staticmethod(
+        construct_sample_rejection_matrix_from_weights)
+
+    def sample(self):
+        n = len(self.P)
+        while True:
+            s = sample_ky_matrix(self.P, self.k, self.l, self.bitstream)
+            if s < n:
+                return s
+
+    @property
+    def expected_bits_per_sample(self):
+        p_reject = sum(Fraction(int(x), 2**(j+1))
+            for j, x in enumerate(self.P[-1]))
+        h = make_hamming_vector(self.P)
+        return get_rejection_expected_bits(h, self.k, self.l, p_reject)
+
+@register
+class RejectionMatrixCachedSampler(KYMatrixCachedSampler):
+    name = 'rej.matc'
+    __slots__ = ()
+    f_construct = staticmethod(construct_sample_rejection_matrix_cached)
+    f_construct_weights = staticmethod(
+        construct_sample_rejection_matrix_cached_from_weights)
+
+    def sample(self):
+        n = len(self.T)
+        while True:
+            s = self.walk() + 1
+            if s < n:
+                return s
+
+    def sample_n(self, n):
+        if self.l < self.k:
+            return Sampler.sample_n(self, n)
+        return sample_rejection_matrix_cached_batch(self.k, self.l,
+            self.h, self.T, n, self.bitstream)
+
+    @property
+    def expected_bits_per_sample(self):
+        n = len(self.T)
+        p_reject = sum(Fraction(1, 2**(c+1))
+            for c in range(self.k) for d in range(self.h[c])
+            if self.T[d][c] == n - 1)
+        return get_rejection_expected_bits(self.h, self.k, self.l, p_reject)
+
+@register
+class FLDRColumnsSampler(Sampler):
+    name = 'fldr.columns'
+    kind = 'fldr_columns'
+    __slots__ = fields = ('n', 'h', 'offsets', 'H')
+    f_construct = staticmethod(construct_sample_fldr_columns)
+    f_construct_weights = staticmethod(
+        construct_sample_fldr_columns_from_weights)
+
+    def sample(self):
+        return sample_fldr_columns(self.n, self.h, self.offsets, self.H,
+            self.bitstream)
+
+    def sample_n(self, n):
+        return sample_fldr_columns_batch(self.n, self.h, self.offsets,
+            self.H, n, self.bitstream)
+
+    @property
+    def expected_bits_per_sample(self):
+        k = len(self.h)
+        p_reject = sum(Fraction(int(s == self.n), 2**(c+1))
+            for c in range(k)
+            for s in self.H[self.offsets[c]:self.offsets[c+1]])
+        return get_rejection_expected_bits(self.h, k, k, p_reject)
+
+@register
+class IntervalSampler(Sampler):
+    name = 'interval'
+    kind = 'interval'
+    __slots__ = fields = ('cdf', 'Z', 'k')
+    f_construct = staticmethod(construct_sample_interval)
+    f_construct_weights = staticmethod(construct_sample_interval_from_weights)
+    f_write = staticmethod(write_sample_interval)
+
+    def sample(self):
+        return sample_interval(self.cdf, self.Z, self.bitstream) + 1
+
+    def sample_n(self, n):
+        return sample_interval_batch(self.cdf, self.Z, n,
+            self.bitstream) + 1
+
+    @property
+    def expected_bits_per_sample(self):
+        return compute_interval_expected_bits(self.cdf, self.Z)
+
+@register
+class AliasSampler(Sampler):
+    name = 'alias.exact'
+    kind = 'alias'
+    __slots__ = fields = ('n', 'qs', 'Ms', 'j')
+    f_construct = staticmethod(construct_sample_alias)
+    f_construct_weights = staticmethod(construct_sample_alias_from_weights)
+    f_write = staticmethod(write_sample_alias)
+
+    def sample(self):
+        return sample_alias(self.n, self.qs, self.Ms, self.j, self.bitstream)
+
+    def iter_samples(self, bitstream):
+        return iter_alias(self.n, self.qs, self.Ms, self.j, bitstream)
+
+    def sample_n(self, n):
+        # sample_alias_batch needs the shared modulus Z of the Ms.  When
+        # n*Z > 2^64, so that u does not fit in a uint64 word, it falls back
+        # to sample_alias one sample at a time.
+        if any(M != self.Ms[0] for M in self.Ms):
+            return Sampler.sample_n(self, n)
+        return sample_alias_batch(self.n, self.qs, self.Ms, self.j, n,
+            self.bitstream)
+
+    @property
+    def expected_bits_per_sample(self):
+        # A uniform index followed by a Bernoulli (two flips on average).
+        return compute_fdr_expected_bits(self.n) + 2
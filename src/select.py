@@ -0,0 +1,182 @@
+# Released under Apache 2.0; refer to LICENSE.txt
+
+"""Choose a sampler for a distribution from a simple cost model.
+
+For each method the model estimates, without building the structure,
+
+    nbytes      size of the arrays of the structure (as int32)
+    preprocess  seconds to build the structure
+    bits        expected number of random bits per sample
+    seconds     expected seconds per sample
+
+The bits use closed forms (or the Knuth-Yao and Han-Hoshi bounds on the
+entropy) and the seconds use per-method constants, which can be measured
+on the local machine with calibrate, stored with write_costs, and passed
+back to estimate_costs and choose_sampler after read_costs.
+"""
+
+import json
+import time
+
+from math import log2
+
+import numpy
+
+from discrete_sampling.entropy import compute_entropy
+from discrete_sampling.entropy import compute_fdr_expected_bits
+from discrete_sampling.flip import BufferedBitStream
+from discrete_sampling.rejection import get_rejection_num_trials
+from discrete_sampling.rejection import get_rejection_precision
+from discrete_sampling.rejection import get_rejection_probabilities
+from discrete_sampling.samplers import get_sampler
+from discrete_sampling.utils import get_binary_expansion_length
+from discrete_sampling.utils import get_common_denominator
+from discrete_sampling.utils import sample_dirichlet_multinomial_positive
+
+METHODS = ('ky.enc', 'rej.matc', 'rej.table', 'alias.exact', 'interval')
+
+# Seconds per preprocessed cell, per random bit, and per sample, from
+# calibrate with the Python samplers.  For interval, every bit triggers a
+# binary search, so its bit cost is scaled by log2(n+1).
+COSTS = {
+    'ky.enc':       {'cell': 4.5e-7, 'bit': 4.2e-7, 'sample': 1e-7},
+    'rej.matc':     {'cell': 1.7e-6, 'bit': 6e-7, 'sample': 2e-7},
+    'rej.table':    {'cell': 7.5e-7, 'bit': 3.1e-7, 'sample': 3e-8},
+    'alias.exact':  {'cell': 2.7e-6, 'bit': 3e-7, 'sample': 1e-6},
+    'interval':     {'cell': 6.5e-6, 'bit': 4.3e-7, 'sample': 4e-6},
+}
+
+def get_method_cells(method, n, Z):
+    """Return the number of cells of the structure, and the precision."""
+    if method == 'ky.enc':
+        # The expansions of M/Z have a preperiod of l = v2(Z) bits and a
+        # period of the order of 2 modulo Z >> l (cached by orderm2).
+        # Factoring phi(Z >> l) can be slow beyond 64 bits, where the
+        # order is bounded by Z >> l instead.
+        if Z.bit_length() <= 64:
+            k, _l = get_binary_expansion_length(Z)
+        else:
+            l = (Z & -Z).bit_length() - 1
+            k = max(1, l + (Z >> l) - 1)
+        # At most n leaves and n internal nodes at each of the k levels.
+        return 3*n*k, k
+    k = max(1, (Z - 1).bit_length())
+    if method == 'rej.matc':
+        return (n + 2) * k, k
+    if method == 'rej.table':
+        return Z, k
+    if method == 'alias.exact':
+        return 3*n, k
+    if method == 'interval':
+        return n + 1, k
+    raise ValueError('Unknown method: %s' % (method,))
+
+def get_method_bits(method, p_target, entropy):
+    if method == 'ky.enc':
+        # Knuth and Yao: entropy <= bits < entropy + 2.
+        return entropy + 1
+    if method == 'rej.matc':
+        p_rejection = get_rejection_probabilities(p_target)
+        trials = float(get_rejection_num_trials(p_target))
+        return trials * (compute_entropy(p_rejection) + 1)
+    if method == 'rej.table':
+        trials = float(get_rejection_num_trials(p_target))
+        return trials * get_rejection_precision(p_target)
+    if method == 'alias.exact':
+        return compute_fdr_expected_bits(len(p_target)) + 2
+    if method == 'interval':
+        # Han and Hoshi: entropy <= bits < entropy + 3.
+        return entropy + 2
+    raise ValueError('Unknown method: %s' % (method,))
+
+def get_method_levels(method, n):
+    return log2(n + 1) if method == 'interval' else 1
+
+def estimate_costs(p_target, methods=METHODS, costs=None):
+    """Return dictionary from method to its estimated costs."""
+    costs = COSTS if costs is None else costs
+    n = len(p_target)
+    Z = get_common_denominator(p_target)
+    entropy = compute_entropy(p_target)
+    estimates = {}
+    for method in methods:
+        cells, _k = get_method_cells(method, n, Z)
+        bits = get_method_bits(method, p_target, entropy)
+        c = costs[method]
+        estimates[method] = {
+            'nbytes': 4 * cells,
+            'preprocess': c['cell'] * cells,
+            'bits': bits,
+            'seconds': c['bit'] * bits * get_method_levels(method, n)
+                + c['sample'],
+        }
+    return estimates
+
+def choose_sampler(p_target, budget, num_samples=None, methods=METHODS,
+        costs=None):
+    """Return the fastest method whose structure fits in budget bytes.
+
+    If num_samples is given, the preprocessing time is amortised over that
+    many samples; otherwise only the time per sample is compared.
+    """
+    estimates = estimate_costs(p_target, methods, costs)
+    def total(method):
+        e = estimates[method]
+        if num_samples is None:
+            return e['seconds']
+        return e['preprocess'] + num_samples * e['seconds']
+    feasible = [m for m in methods if estimates[m]['nbytes'] <= budget]
+    if not feasible:
+        raise ValueError('No sampler fits in %d bytes' % (budget,))
+    return min(feasible, key=total)
+
+def calibrate(methods=METHODS, Ns=(10, 100, 1000), Z=4095,
+        num_samples=20000, seed=1):
+    """Measure the constants of COSTS on random distributions.
+
+    For each method and distribution, time the preprocessing and the
+    sampling, then fit the seconds per cell by a ratio and the seconds per
+    bit and per sample by least squares.  The default Z = 2^12 - 1 keeps
+    the depth of the exact Knuth-Yao trees small.
+    """
+    rng = numpy.random.RandomState(seed)
+    dists = [sample_dirichlet_multinomial_positive(1, N, Z, rng) for N in Ns]
+    costs = {}
+    for method in methods:
+        cls = get_sampler(method)
+        rows = []
+        seconds = []
+        cells_total = 0
+        preprocess_total = 0
+        for p_target in dists:
+            start = time.time()
+            sampler = cls.from_target(p_target,
+                BufferedBitStream(numpy.random.default_rng(seed)))
+            preprocess_total += time.time() - start
+            cells_total += get_method_cells(method, len(p_target), Z)[0]
+            start = time.time()
+            for _i in range(num_samples):
+                sampler.sample()
+            elapsed = time.time() - start
+            bits = sampler.bitstream.calls / num_samples
+            levels = get_method_levels(method, len(p_target))
+            rows.append([bits * levels, 1])
+            seconds.append(elapsed / num_samples)
+        fit = numpy.linalg.lstsq(rows, seconds, rcond=None)[0]
+        costs[method] = {
+            'cell': preprocess_total / cells_total,
+            'bit': max(0., float(fit[0])),
+            'sample': max(0., float(fit[1])),
+        }
+    return costs
+
+def write_costs(costs, fname):
+    """Write the constants returned by calibrate to fname, as JSON."""
+    with open(fname, 'w') as f:
+        json.dump(costs, f, indent=2, sort_keys=True)
+
+def read_costs(fname):
+    """Return the constants written by write_costs, over those of COSTS."""
+    with open(fname, 'r') as f:
+        costs = json.load(f)
+    return dict(COSTS, **costs)
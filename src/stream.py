@@ -0,0 +1,62 @@
+# Released under Apache 2.0; refer to LICENSE.txt
+
+"""Generators which draw an unbounded stream of samples.
+
+Unlike the functions in sample, which start afresh on each call, the
+generators keep their state between draws.  For the uniform distribution
+this is the pair (v, c) of Lumbroso's Fast Dice Roller, where c is
+uniform on {0, ..., v-1}: after emitting c mod n, the quotient c // n is
+still uniform on {0, ..., v // n - 1} and is recycled into the next draw
+instead of being thrown away.  The state is topped up with bits in bulk
+through bitstream.take, so the bits per sample approach log2(n).
+"""
+
+from discrete_sampling.sample import sample_inversion_bernoulli
+
+def iter_fdr(n, bitstream, margin=32):
+    """Yield uniform outcomes in 1, ..., n forever.
+
+    The state is kept at v >= n * 2^margin before each draw, so that a
+    draw is rejected (discarding c) with probability less than 2^-margin.
+    """
+    assert 0 < n
+    N = n << margin
+    v = 1
+    c = 0
+    while True:
+        if v < N:
+            t = N.bit_length() - v.bit_length() + 1
+            v = v << t
+            c = (c << t) | bitstream.take(t)
+        q = v // n
+        if c < q * n:
+            yield c % n + 1
+            v = q
+            c = c // n
+        else:
+            v = v - q * n
+            c = c - q * n
+
+def iter_alias(n, qs, Ms, j, bitstream):
+    """Yield samples of the alias method, drawing columns with iter_fdr."""
+    for i in iter_fdr(n, bitstream):
+        x = sample_inversion_bernoulli(qs[i-1], Ms[i-1], bitstream)
+        yield i if x == 1 else j[i-1] + 1
+
+def iter_rejection_uniform(Ms, M, n, bitstream):
+    """Yield samples of sample_rejection_uniform, drawing the proposals
+    with iter_fdr."""
+    for i in iter_fdr(n, bitstream):
+        if sample_inversion_bernoulli(Ms[i-1], M, bitstream) == 1:
+            yield i
+
+def iter_samples(sampler, bitstream=None):
+    """Yield samples from a Sampler in samplers forever.
+
+    If bitstream is None, the bit source of the sampler is used.  The
+    samples come from the iter_samples method of the sampler, which
+    recycles random bits between draws where the method allows it.
+    """
+    if bitstream is None:
+        bitstream = sampler.bitstream
+    yield from sampler.iter_samples(bitstream)
@@ -1,28 +1,69 @@
 # Released under Apache 2.0; refer to LICENSE.txt
 
 import itertools
-import os
-import subprocess
 
 from fractions import Fraction
+from math import gcd
 from math import isinf
 from math import isnan
+from math import isqrt
+from math import lcm
 from math import log2
 
-from numpy import lcm
-
-PATH = os.path.dirname(os.path.abspath(__file__))
-ORDERM2 = os.path.join(PATH, 'orderm2')
-BINEXP = os.path.join(PATH, 'binexp')
+from discrete_sampling.cache import LRUCache
+
+def get_lcm(integers):
+    """Return the least common multiple of positive integers, as a Python int.
+
+    The multiples are combined pairwise in a balanced tree, so that most
+    products are of small operands, which is much faster than a running
+    lcm when the result grows to thousands of bits.
+    """
+    values = [int(x) for x in integers]
+    if not values:
+        return 1
+    while len(values) > 1:
+        reduced = [lcm(values[i], values[i+1])
+            for i in range(0, len(values) - 1, 2)]
+        if len(values) % 2:
+            reduced.append(values[-1])
+        values = reduced
+    return values[0]
 
 def get_common_denominator(probabilities):
     """Return least Z such that each probability is a multiple of 1/Z."""
-    denominators = [p.denominator for p in probabilities]
-    return lcm.reduce(denominators)
+    denominators = {p.denominator for p in probabilities}
+    return get_lcm(sorted(denominators))
 
 def get_common_numerators(Z, probabilities):
     """Return numerator of probabilities expresses in the common base Z."""
-    return [int(Z*p) for p in probabilities]
+    Z = int(Z)
+    quotients = {}
+    numerators = []
+    for p in probabilities:
+        d = int(p.denominator)
+        if d not in quotients:
+            quotients[d] = divmod(Z, d)
+        q, r = quotients[d]
+        # Same as int(Z*p), without building the Fraction Z*p.
+        a = int(p.numerator)
+        numerators.append(q * a if r == 0 else Z * a // d)
+    return numerators
+
+def reduce_weights(weights):
+    """Return (Ms, Z) for nonnegative integer weights (list or numpy array).
+
+    The weights are divided by their gcd, so that Z is the common
+    denominator which get_common_denominator returns for the distribution
+    they define, and Ms are its numerators.
+    """
+    Ms = [int(w) for w in weights]
+    assert all(0 <= M for M in Ms)
+    g = gcd(*Ms)
+    assert 0 < g
+    if 1 < g:
+        Ms = [M // g for M in Ms]
+    return Ms, sum(Ms)
 
 def get_bitstrings(k):
     """Return all length-k binary strings."""
@@ -137,6 +178,8 @@ def bits_to_int(bits):
     return int(sbits, 2)
 
 def randint(k, bitstream):
+    if hasattr(bitstream, 'take'):
+        return bitstream.take(k)
     bits = [next(bitstream) for i in range(k)]
     return bits_to_int(bits)
 
@@ -179,39 +222,149 @@ def binary_search_interval(arr, x):
         else:
             r = mid - 1
 
-def binary_search_interval_nested(arr, arr_denominator, a, b, denominator):
-    l = 0
-    r = len(arr) - 1
-    common_a = a * arr_denominator
-    common_b = b * arr_denominator
-    while l <= r:
-        mid = l + (r - l) // 2
-        if (arr[mid-1] * denominator <= common_a) and \
-                (common_b <= arr[mid] * denominator):
-            return mid - 1
-        elif arr[mid] * denominator <= common_a:
-            l = mid + 1
+def get_small_primes(n):
+    """Return list of primes less than n, using the sieve of Eratosthenes."""
+    sieve = [True] * n
+    for i in range(2, isqrt(n - 1) + 1):
+        if sieve[i]:
+            sieve[i*i::i] = [False] * len(range(i*i, n, i))
+    return [i for i in range(2, n) if sieve[i]]
+
+SMALL_PRIMES = get_small_primes(1024)
+PRIME_FACTORS = LRUCache()
+
+def is_probable_prime(n):
+    """Return True if n is prime (deterministic for n < 3.3 * 10**24)."""
+    if n < 2:
+        return False
+    for p in SMALL_PRIMES[:13]:
+        if n % p == 0:
+            return n == p
+    d = n - 1
+    s = 0
+    while d % 2 == 0:
+        d >>= 1
+        s += 1
+    for a in SMALL_PRIMES[:13]:
+        x = pow(a, d, n)
+        if x in (1, n - 1):
+            continue
+        for _i in range(s - 1):
+            x = pow(x, 2, n)
+            if x == n - 1:
+                break
         else:
-            r = mid - 1
-    return None
+            return False
+    return True
+
+def pollard_rho(n):
+    """Return a nontrivial factor of odd composite n."""
+    for c in itertools.count(1):
+        x = 2
+        y = 2
+        d = 1
+        while d == 1:
+            x = (x*x + c) % n
+            y = (y*y + c) % n
+            y = (y*y + c) % n
+            d = gcd(abs(x - y), n)
+        if d != n:
+            return d
+
+def set_prime_factors_cache(maxsize=4096):
+    """Replace the cache of prime factorizations."""
+    global PRIME_FACTORS
+    PRIME_FACTORS = LRUCache(maxsize=maxsize)
+    return PRIME_FACTORS
+
+def get_prime_factors(n):
+    """Return dict mapping the prime factors of n to their multiplicities."""
+    n = int(n)
+    assert 0 < n
+    return dict(PRIME_FACTORS.get(n, compute_prime_factors))
+
+def compute_prime_factors(n):
+    """Return dict mapping the prime factors of n to their multiplicities."""
+    factors = {}
+    m = n
+    for p in SMALL_PRIMES:
+        if m < p*p:
+            break
+        while m % p == 0:
+            factors[p] = factors.get(p, 0) + 1
+            m //= p
+    stack = [m] if m > 1 else []
+    while stack:
+        x = stack.pop()
+        if is_probable_prime(x):
+            factors[x] = factors.get(x, 0) + 1
+        else:
+            d = pollard_rho(x)
+            stack.extend([d, x // d])
+    return factors
+
+def get_totient_prime_factors(M):
+    """Return prime factorization of Euler's totient phi(M)."""
+    factors = {}
+    for p, e in get_prime_factors(M).items():
+        if 1 < e:
+            factors[p] = factors.get(p, 0) + e - 1
+        for q, f in get_prime_factors(p - 1).items():
+            factors[q] = factors.get(q, 0) + f
+    return factors
+
+ORDERM2_CACHE = LRUCache()
+
+def set_orderm2_cache(maxsize=4096, path=None):
+    """Replace the orderm2 cache, optionally persisting it to sqlite path."""
+    global ORDERM2_CACHE
+    ORDERM2_CACHE = LRUCache(maxsize=maxsize, path=path)
+    return ORDERM2_CACHE
 
 def orderm2(M):
+    """Return the multiplicative of 2 modulo odd integer M (cached)."""
+    M = int(M)
+    assert M % 2 == 1
+    return ORDERM2_CACHE.get(M, compute_orderm2)
+
+def compute_orderm2(M):
     """Return the multiplicative of 2 modulo odd integer M."""
-    output = subprocess.check_output([ORDERM2, '%d' % (M,)])
-    result = output.split(b'\n')[-2]
-    return int(result)
+    if M == 1:
+        return 1
+    factors = get_totient_prime_factors(M)
+    t = 1
+    for p, e in factors.items():
+        t *= pow(p, e)
+    # The order divides phi(M); strip each prime factor while 2^t = 1.
+    for p in factors:
+        while t % p == 0 and pow(2, t // p, M) == 1:
+            t //= p
+    return t
 
 def binexp(a, b):
     """Return the preperiod and period digits of a/b."""
-    r = subprocess.check_output([BINEXP, '%d' % (a,), '%d' % (b,)])
-    parts = r.split(b'\n')
-    bits = lambda s: tuple(map(int, s.split(b':')[1].strip().split(b',')[:-1]))
-    prefix = () if len(parts) == 3 else bits(parts[0])
-    suffix = bits(parts[0] if len(parts)==3 else parts[1])
-    return (prefix, suffix)
+    assert 0 < a < b
+    g = gcd(a, b)
+    a, b = a // g, b // g
+    # The preperiod has length w, where 2^w is the largest power of two
+    # dividing b, and the period is the order of 2 modulo the odd part.
+    w = (b & -b).bit_length() - 1
+    Mp = b >> w
+    p = orderm2(Mp) if Mp > 1 else 1
+    digits = [0] * (w + p)
+    x = a
+    for i in range(w + p):
+        x = 2*x
+        if b <= x:
+            digits[i] = 1
+            x = x - b
+    return (tuple(digits[:w]), tuple(digits[w:]))
 
 def get_binary_expansion_length(M):
-    """Return the length of prefix and suffix of binary expansion of 1/M."""
+    """Return the length of prefix and suffix of binary expansion of 1/M.
+
+    The work is cached by the odd part of M through orderm2.
+    """
     if M % 2 == 1:
         k = orderm2(M)
         return (k, 0)
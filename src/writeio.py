@@ -1,5 +1,9 @@
 # Released under Apache 2.0; refer to LICENSE.txt
 
+import struct
+
+import numpy
+
 def write_array(array, f):
     n = len(array)
     f.write('%d ' % (n,))
@@ -64,3 +68,104 @@ def write_sample_alias(n, qs, Ms, j, fname):
         write_array(qs, f)
         write_array(Ms, f)
         write_array(j, f)
+
+# Binary container, which is read by readio.read_binary and c/readio.c.
+#
+#   magic       8 bytes, BINARY_MAGIC
+#   version     int32
+#   nfields     int32
+#   kind        32 bytes, NUL padded name of the structure
+#   fields      nfields records of five int64
+#                   (ndim, itemsize, value or offset, nrows, ncols)
+#   data        each array at an offset which is a multiple of BINARY_PAGE
+#
+# A scalar field has ndim 0 and stores its value in the third slot.  An
+# array field stores its little-endian int32 (or int64, if some entry
+# does not fit in 32 bits) entries in row-major order at the offset.
+# Scalars and entries of 2**63 or more are rejected.
+
+BINARY_MAGIC = b'DSAMPLER'
+BINARY_VERSION = 1
+BINARY_PAGE = 4096
+BINARY_HEADER = struct.Struct('<8sii32s')
+BINARY_FIELD = struct.Struct('<5q')
+
+BINARY_INT = numpy.iinfo(numpy.int64)
+
+def check_binary_int(x):
+    """Assert that the scalar or array entry x fits in an int64 field."""
+    assert BINARY_INT.min <= x <= BINARY_INT.max, \
+        'Value does not fit in int64: %d' % (x,)
+
+def get_binary_array(field):
+    # Keep Python ints exact (numpy would turn 2**63 into a float) and
+    # check them, and uint64 entries, before the conversion below.
+    array = field if isinstance(field, numpy.ndarray) \
+        else numpy.asarray(field, dtype=object)
+    assert array.ndim in [1, 2]
+    if array.size and array.dtype.kind in 'uO':
+        check_binary_int(array.min())
+        check_binary_int(array.max())
+    array = array.astype(numpy.int64)
+    info = numpy.iinfo(numpy.int32)
+    if array.size == 0 or info.min <= array.min() <= array.max() <= info.max:
+        return array.astype('<i4')
+    return array.astype('<i8')
+
+def write_binary(kind, fields, fname):
+    kind = kind.encode('ascii')
+    assert len(kind) <= 32
+    size = BINARY_HEADER.size + len(fields) * BINARY_FIELD.size
+    offset = -(-size // BINARY_PAGE) * BINARY_PAGE
+    records = []
+    arrays = []
+    for field in fields:
+        if numpy.ndim(field) == 0:
+            check_binary_int(int(field))
+            records.append((0, 8, int(field), 0, 0))
+            continue
+        array = get_binary_array(field)
+        nrows = array.shape[0]
+        ncols = array.shape[1] if array.ndim == 2 else 0
+        records.append((array.ndim, array.itemsize, offset, nrows, ncols))
+        arrays.append((offset, array))
+        offset += -(-array.nbytes // BINARY_PAGE) * BINARY_PAGE
+    with open(fname, 'wb') as f:
+        f.write(BINARY_HEADER.pack(
+            BINARY_MAGIC, BINARY_VERSION, len(fields), kind))
+        for record in records:
+            f.write(BINARY_FIELD.pack(*record))
+        for start, array in arrays:
+            f.seek(start)
+            f.write(array.tobytes())
+        f.truncate(offset)
+
+def write_sample_ky_encoding_binary(enc, n, k, fname):
+    write_binary('ky_encoding', [enc, n, k], fname)
+
+def write_sample_ky_matrix_binary(P, k, l, fname):
+    write_binary('ky_matrix', [P, k, l], fname)
+
+def write_sample_ky_matrix_cached_binary(k, l, h, T, fname):
+    write_binary('ky_matrix_cached', [k, l, h, T], fname)
+
+def write_sample_fdr_binary(n, fname):
+    write_binary('fdr', [n], fname)
+
+def write_sample_inversion_bernoulli_binary(a, M, fname):
+    write_binary('inversion_bernoulli', [a, M], fname)
+
+def write_sample_rejection_uniform_binary(Ms, M, n, fname):
+    write_binary('rejection_uniform', [Ms, M, n], fname)
+
+def write_sample_rejection_hash_table_binary(T, Z, k, fname):
+    write_binary('rejection_hash_table', [T, Z, k], fname)
+
+def write_sample_rejection_binary_search_binary(cdf, Z, k, fname):
+    write_binary('rejection_binary_search', [cdf, Z, k], fname)
+
+def write_sample_interval_binary(cdf, Z, k, fname):
+    write_binary('interval', [cdf, Z, k], fname)
+
+def write_sample_alias_binary(n, qs, Ms, j, fname):
+    write_binary('alias', [n, qs, Ms, j], fname)
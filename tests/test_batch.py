@@ -0,0 +1,55 @@
+# Released under Apache 2.0; refer to LICENSE.txt
+
+import numpy
+
+from discrete_sampling.batch import construct_fldr_batch
+from discrete_sampling.batch import get_bit_lengths
+from discrete_sampling.batch import get_fldr_row
+from discrete_sampling.batch import get_precisions
+from discrete_sampling.batch import sample_rows
+from discrete_sampling.fldr import FLDRSampler
+from discrete_sampling.fldr import get_fldr_precision
+
+def test_get_precisions():
+    Z = [1, 2, 3, 4, 5, 2**40, 2**40 + 1, 2**61 - 1, 2**61, 2**61 + 1]
+    k = get_precisions(numpy.array(Z, dtype=numpy.int64))
+    assert k.tolist() == [get_fldr_precision(z) for z in Z]
+    x = [0, 1, 2, 3, 2**31, 2**32 - 1, 2**62 + 5, 2**63 - 1]
+    b = get_bit_lengths(numpy.array(x, dtype=numpy.int64))
+    assert b.tolist() == [y.bit_length() for y in x]
+
+def test_construct_fldr_batch():
+    rng = numpy.random.default_rng(1)
+    numerators = rng.integers(0, 30, size=(200, 7))
+    numerators[:, 0] += 1
+    numerators[5] = [0, 0, 1, 0, 0, 0, 0]
+    numerators[6] = [0, 64, 0, 0, 0, 0, 0]
+    batch = construct_fldr_batch(numerators)
+    n, k, k_ptr, h, H_ptr, H = batch
+    assert n == 7
+    assert len(k_ptr) == 201
+    assert len(H) == H_ptr[-1] == h.sum()
+    for i, weights in enumerate(numerators):
+        sampler = FLDRSampler(weights)
+        k_i, l_i, h_i, T_i = get_fldr_row(batch, i)
+        assert k_i == l_i == sampler.k
+        assert h_i == sampler.h
+        assert numpy.reshape(T_i, -1).tolist() == sampler.H
+
+def test_sample_rows():
+    numerators = numpy.array([
+        [1, 6, 10, 2],
+        [0, 0, 3, 0],
+        [5, 5, 0, 1],
+    ])
+    batch = construct_fldr_batch(numpy.repeat(numerators, 5000, axis=0))
+    samples = sample_rows(batch, numpy.random.default_rng(1))
+    assert samples.shape == (15000,)
+    for i, weights in enumerate(numerators):
+        block = samples[5000*i:5000*(i+1)]
+        counts = numpy.bincount(block, minlength=5)[1:]
+        assert numpy.allclose(counts / 5000, weights / weights.sum(),
+            atol=.02)
+    samples = sample_rows(batch, numpy.random.default_rng(1),
+        rows=[5000, 5001, 5000])
+    assert samples.tolist() == [3, 3, 3]
@@ -0,0 +1,70 @@
+# Released under Apache 2.0; refer to LICENSE.txt
+
+import os
+
+from discrete_sampling.cache import LRUCache
+
+from discrete_sampling import utils
+
+def test_lru_cache_counters_eviction():
+    calls = []
+    def f(x):
+        calls.append(x)
+        return x**2
+    cache = LRUCache(maxsize=2)
+    assert cache.get(3, f) == 9
+    assert cache.get(3, f) == 9
+    assert cache.get(5, f) == 25
+    assert cache.get(7, f) == 49
+    assert calls == [3, 5, 7]
+    assert cache.info()['hits'] == 1
+    assert cache.info()['misses'] == 3
+    assert cache.info()['size'] == 2
+    # The least recently used key 3 was evicted.
+    assert cache.get(3, f) == 9
+    assert calls == [3, 5, 7, 3]
+
+def test_lru_cache_persistent(tmp_path):
+    path = os.path.join(str(tmp_path), 'orderm2.sqlite')
+    cache = LRUCache(path=path)
+    big = 2**80 + 1
+    assert cache.get(big, lambda x: x + 1) == big + 1
+    assert cache.misses == 1
+
+    cache = LRUCache(path=path)
+    assert cache.get(big, lambda x: None) == big + 1
+    assert cache.misses == 0
+    assert cache.disk_hits == 1
+    assert cache.get(big, lambda x: None) == big + 1
+    assert cache.hits == 1
+
+def test_orderm2_cache(tmp_path):
+    cache = utils.ORDERM2_CACHE
+    try:
+        path = os.path.join(str(tmp_path), 'orderm2.sqlite')
+        cache_new = utils.set_orderm2_cache(maxsize=10, path=path)
+        assert utils.get_binary_expansion_length(40001) == (360, 0)
+        assert utils.get_binary_expansion_length(2*40001) == (361, 1)
+        assert utils.orderm2(40001) == 360
+        assert cache_new.misses == 1
+        assert cache_new.hits == 2
+    finally:
+        utils.ORDERM2_CACHE = cache
+
+def test_prime_factors_cache():
+    cache = utils.PRIME_FACTORS
+    try:
+        cache_new = utils.set_prime_factors_cache(maxsize=2)
+        assert utils.get_prime_factors(12) == {2: 2, 3: 1}
+        assert utils.get_prime_factors(2**61 - 1) == {2**61 - 1: 1}
+        assert utils.get_prime_factors(3 * 1000003**2) == {3: 1, 1000003: 2}
+        assert utils.get_prime_factors(1) == {}
+        assert cache_new.info()['size'] == 2
+        # The factors of 12 were evicted, and the copies are not shared.
+        factors = utils.get_prime_factors(12)
+        factors[2] = 5
+        assert utils.get_prime_factors(12) == {2: 2, 3: 1}
+        assert cache_new.misses == 5
+        assert cache_new.hits == 1
+    finally:
+        utils.PRIME_FACTORS = cache
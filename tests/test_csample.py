@@ -0,0 +1,226 @@
+# Released under Apache 2.0; refer to LICENSE.txt
+
+import os
+import shutil
+import subprocess
+import sys
+
+from fractions import Fraction
+
+import numpy
+import pytest
+
+from discrete_sampling.chacha import ChaCha20
+from discrete_sampling.construct import construct_sample_alias
+from discrete_sampling.construct import construct_sample_fldr_columns
+from discrete_sampling.construct import construct_sample_interval
+from discrete_sampling.construct import construct_sample_interval_from_weights
+from discrete_sampling.construct import construct_sample_ky_encoding
+from discrete_sampling.construct import construct_sample_ky_matrix
+from discrete_sampling.construct import construct_sample_ky_matrix_cached
+from discrete_sampling.construct import construct_sample_rejection_binary_search
+from discrete_sampling.construct import construct_sample_rejection_encoding
+from discrete_sampling.construct import construct_sample_rejection_hash_table
+from discrete_sampling.construct import construct_sample_rejection_matrix
+from discrete_sampling.construct import construct_sample_rejection_matrix_cached
+from discrete_sampling.construct import construct_sample_rejection_uniform
+from discrete_sampling.flip import BufferedBitStream
+from discrete_sampling.fldr import FLDRSampler
+from discrete_sampling.fldr import get_weight_limbs
+
+from discrete_sampling.tests.utils import get_c_sources
+
+csample = pytest.importorskip('discrete_sampling._csample')
+
+samplers = [
+    (construct_sample_ky_encoding, 'sample_ky_encoding', 1),
+    (construct_sample_ky_matrix, 'sample_ky_matrix', 1),
+    (construct_sample_ky_matrix_cached, 'sample_ky_matrix_cached', 1),
+    (construct_sample_rejection_uniform, 'sample_rejection_uniform', 1),
+    (construct_sample_rejection_hash_table, 'sample_rejection_hash_table', 1),
+    (construct_sample_rejection_binary_search,
+        'sample_rejection_binary_search', 1),
+    (construct_sample_rejection_encoding, 'sample_rejection_encoding', 1),
+    (construct_sample_rejection_matrix, 'sample_rejection_matrix', 1),
+    (construct_sample_rejection_matrix_cached,
+        'sample_rejection_matrix_cached', 1),
+    (construct_sample_fldr_columns, 'sample_fldr_columns', 1),
+    (construct_sample_interval, 'sample_interval', 0),
+    (construct_sample_alias, 'sample_alias_exact', 1),
+]
+@pytest.mark.parametrize('f_construct, name, offset', samplers)
+def test_csample(f_construct, name, offset):
+    p_target = [Fraction(1, 19), Fraction(6, 19), Fraction(10, 19),
+        Fraction(2, 19)]
+    structure = f_construct(p_target)
+    out = numpy.zeros(100000, dtype=numpy.intc)
+    csample.seed(1)
+    getattr(csample, name)(*structure, out)
+    assert 0 < csample.num_rng_calls()
+    counts = numpy.bincount(out - offset, minlength=len(p_target))
+    frequencies = counts / len(out)
+    assert numpy.allclose(frequencies, [float(p) for p in p_target], atol=.01)
+
+def test_csample_interval_large():
+    # The old sample_interval overflowed a C int after about 31 flips.
+    weights = [715827882, 715827883, 715827882]
+    cdf, Z, k = construct_sample_interval_from_weights(weights)
+    assert Z == 2**31 - 1
+    out = numpy.zeros(30000, dtype=numpy.intc)
+    csample.seed(2)
+    csample.sample_interval(cdf, Z, k, out)
+    counts = numpy.bincount(out, minlength=3)
+    assert len(counts) == 3
+    assert numpy.allclose(counts / len(out), 1/3, atol=.015)
+
+def test_csample_seed():
+    k, l, h, T = construct_sample_rejection_matrix_cached(
+        [Fraction(1, 7), Fraction(6, 7)])
+    out0 = numpy.zeros(100, dtype=numpy.intc)
+    out1 = numpy.zeros(100, dtype=numpy.intc)
+    csample.seed(10)
+    csample.sample_rejection_matrix_cached(k, l, h, T, out0)
+    csample.seed(10)
+    csample.sample_rejection_matrix_cached(k, l, h, T, out1)
+    assert numpy.all(out0 == out1)
+
+def test_csample_binary_search_first_page(tmp_path):
+    # The cdf of rej.binary is placed right after a page which cannot be
+    # read, so reading cdf[-1] (for one outcome) crashes the process.
+    csrc = get_c_sources()
+    if shutil.which('gcc') is None or csrc is None:
+        pytest.skip('requires gcc and the C sources')
+    lib = str(tmp_path / 'libutils.so')
+    subprocess.check_call(['gcc', '-shared', '-fPIC', '-o', lib,
+        os.path.join(csrc, 'utils.c')])
+    script = '''if True:
+        import ctypes
+        import mmap
+        import sys
+        page = mmap.PAGESIZE
+        buf = mmap.mmap(-1, 2 * page)
+        libc = ctypes.CDLL(None)
+        libc.mprotect.argtypes = [ctypes.c_void_p, ctypes.c_size_t,
+            ctypes.c_int]
+        utils = ctypes.CDLL(sys.argv[1])
+        for cdf in [[0, 4], [0, 1, 3, 4]]:
+            arr = (ctypes.c_int * len(cdf)).from_buffer(buf, page)
+            arr[:] = cdf
+            start = ctypes.addressof(ctypes.c_char.from_buffer(buf))
+            assert libc.mprotect(start, page, 0) == 0
+            print(*[utils.binary_search_interval(arr, len(cdf), x)
+                for x in range(4)])
+            assert libc.mprotect(start, page, mmap.PROT_READ) == 0
+    '''
+    result = subprocess.run([sys.executable, '-c', script, lib],
+        stdout=subprocess.PIPE, universal_newlines=True)
+    assert result.returncode == 0
+    assert result.stdout.splitlines() == ['0 0 0 0', '0 1 1 2']
+
+def test_csample_seed_chacha20():
+    key = ChaCha20.from_seed(3).key
+    out = numpy.zeros(300, dtype=numpy.intc)
+    csample.seed_chacha20(key)
+    csample.sample_fdr(2, out)
+    bitstream = BufferedBitStream(ChaCha20(key))
+    bits = [next(bitstream) for _i in range(len(out))]
+    assert numpy.all(out - 1 == bits)
+    assert csample.num_rng_calls() == 5
+    with pytest.raises(ValueError):
+        csample.seed_chacha20(key[:16])
+
+def test_csample_output_type():
+    with pytest.raises(TypeError):
+        csample.sample_fdr(3, numpy.zeros(10, dtype=numpy.float64))
+    with pytest.raises(BufferError):
+        csample.sample_fdr(3, bytes(40))
+
+@pytest.mark.parametrize('weights', [
+    [3, 2, 1, 7, 2, 1],
+    [2**40, 2**40 + 3, 5],
+    [2**63 + 1, 2**64 - 1, 7],
+    [5**60, 3**90, 2**130 + 7],
+])
+def test_csample_preprocess_fldr(weights):
+    sampler = FLDRSampler(weights)
+    limbs, nlimbs = get_weight_limbs(weights)
+    k, h, H = csample.preprocess_fldr(limbs, nlimbs)
+    assert (k, h, H) == (sampler.k, sampler.h, sampler.H)
+    out = numpy.zeros(100000, dtype=numpy.intc)
+    csample.seed(1)
+    csample.sample_fldr(len(weights), k, h, H, out)
+    Z = sum(weights)
+    frequencies = numpy.bincount(out, minlength=len(weights)+1)[1:] / len(out)
+    assert numpy.allclose(frequencies, [w / Z for w in weights], atol=.01)
+
+def test_csample_preprocess_fldr_format():
+    limbs, nlimbs = get_weight_limbs([3, 2, 1])
+    with pytest.raises(TypeError):
+        csample.preprocess_fldr(limbs.astype(numpy.int32), nlimbs)
+    with pytest.raises(TypeError):
+        csample.preprocess_fldr(limbs.astype(numpy.float64), nlimbs)
+
+def test_csample_invalid():
+    out = numpy.zeros(10, dtype=numpy.intc)
+    k, l, h, T = construct_sample_rejection_matrix_cached(
+        [Fraction(1, 7), Fraction(6, 7)])
+    invalid = [
+        (csample.sample_fdr, (0,)),
+        (csample.sample_inversion_bernoulli, (0, 0)),
+        (csample.sample_inversion_bernoulli, (3, 2)),
+        (csample.sample_rejection_uniform, ([0, 0], 1, 2)),
+        (csample.sample_rejection_uniform, ([1, 2], 2, 3)),
+        (csample.sample_ky_matrix_cached, (k, l, h[:-1], T)),
+        (csample.sample_rejection_matrix_cached,
+            (k, l, h, [r[:-1] for r in T])),
+        (csample.sample_rejection_hash_table, ([1, 2], 3, 2)),
+        (csample.sample_rejection_hash_table, ([1, 2, 2, 2, 2], 5, 2)),
+        (csample.sample_rejection_binary_search, ([0, 1, 3], 4, 2)),
+        (csample.sample_interval, ([0, 2, 1], 1, 1)),
+        (csample.sample_alias_exact, (2, [1, 1], [2, 2], [0, 2])),
+        (csample.sample_alias_exact, (2, [1], [2, 2], [0, 1])),
+    ]
+    for func, args in invalid:
+        with pytest.raises(ValueError):
+            func(*args, out)
+
+def test_csample_invalid_structure():
+    out = numpy.zeros(10, dtype=numpy.intc)
+    p_target = [Fraction(1, 19), Fraction(6, 19), Fraction(10, 19),
+        Fraction(2, 19)]
+    enc, n, k_enc = construct_sample_ky_encoding(p_target)
+    P, k, l = construct_sample_ky_matrix(p_target)
+    _k, _l, h, T = construct_sample_ky_matrix_cached(p_target)
+    k_fldr, h_fldr, H_fldr = csample.preprocess_fldr(
+        *get_weight_limbs([1, 6, 10, 2]))
+    n_cols, h_cols, offsets, H_cols = construct_sample_fldr_columns(p_target)
+    c = h.index(max(h))
+    enc_past = [len(enc)] + list(enc[1:])
+    P_bits = [list(row) for row in P]
+    P_bits[0][0] = 2
+    h_rows = list(h)
+    h_rows[c] = len(T) + 1
+    T_label = [list(row) for row in T]
+    T_label[0][c] = len(T)
+    H_label = numpy.array(H_fldr)
+    H_label[:] = 5
+    invalid = [
+        (csample.sample_ky_encoding, (enc_past, n, k_enc)),
+        (csample.sample_ky_encoding, (enc, n - 1, k_enc)),
+        (csample.sample_rejection_encoding, ([-1], 1, 0)),
+        (csample.sample_ky_matrix, (P_bits, k, l)),
+        (csample.sample_ky_matrix, (P, k, k + 1)),
+        (csample.sample_ky_matrix_cached, (k, l, h_rows, T)),
+        (csample.sample_ky_matrix_cached, (k, l, h, T_label)),
+        (csample.sample_ky_matrix_cached, (k, l, [0] * k, T)),
+        (csample.sample_rejection_matrix_cached, (k, l, h, T)),
+        (csample.sample_fldr, (4, k_fldr, [6] * k_fldr, H_fldr)),
+        (csample.sample_fldr, (4, k_fldr, h_fldr, H_label)),
+        (csample.sample_fldr_columns,
+            (n_cols, h_cols, [0] + list(offsets[1:-1]) + [0], H_cols)),
+        (csample.sample_fldr_columns,
+            (n_cols, h_cols, offsets, [n_cols + 1] * len(H_cols))),
+    ]
+    for func, args in invalid:
+        with pytest.raises(ValueError):
+            func(*args, out)
@@ -0,0 +1,110 @@
+# Released under Apache 2.0; refer to LICENSE.txt
+
+import os
+import shutil
+import subprocess
+
+from collections import Counter
+from fractions import Fraction
+
+import numpy
+import pytest
+
+from discrete_sampling.fldr import FLDRSampler
+from discrete_sampling.rejection import make_rejection_ddg_matrix
+from discrete_sampling.utils import get_bitstrings
+
+from discrete_sampling.tests.utils import get_c_sources
+
+def check_fldr_sampler(sampler):
+    # Compare with the structure built from scratch, up to the order of
+    # the outcomes within each column.
+    Z = sum(sampler.weights)
+    p_target = [Fraction(w, Z) for w in sampler.weights]
+    h, H = make_rejection_ddg_matrix(p_target)
+    k = len(h)
+    assert sampler.k == k
+    assert sampler.h == list(h)
+    for j in range(k):
+        column = sorted(sampler.H[d*k + j] for d in range(h[j]))
+        assert column == [H[d*k + j] for d in range(h[j])]
+        assert all(sampler.H[d*k + j] == -1
+            for d in range(h[j], sampler.n + 1))
+        for d in range(h[j]):
+            assert sampler.loc[sampler.H[d*k + j]*k + j] == d
+
+def test_fldr_sampler_exact():
+    sampler = FLDRSampler([3, 2, 1, 7, 2, 1])
+    check_fldr_sampler(sampler)
+    samples = []
+    for bits in get_bitstrings(sampler.k):
+        s = sampler.sample(int(b) for b in bits)
+        samples.append(s)
+    assert Counter(samples) == {1: 3, 2: 2, 3: 1, 4: 7, 5: 2, 6: 1}
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_fldr_sampler_update(seed):
+    rng = numpy.random.RandomState(seed)
+    weights = list(rng.randint(0, 100, size=20))
+    weights[0] += 1
+    sampler = FLDRSampler(weights)
+    for _step in range(200):
+        i = rng.randint(len(weights))
+        w = rng.randint(0, 100)
+        if sum(sampler.weights) - sampler.weights[i] + w == 0:
+            continue
+        sampler.update(i, w)
+        check_fldr_sampler(sampler)
+
+def test_fldr_sampler_rebuild():
+    sampler = FLDRSampler([1, 1, 1])
+    assert sampler.k == 2
+    sampler.update(1, 6)
+    assert sampler.k == 3
+    check_fldr_sampler(sampler)
+    sampler.update(1, 0)
+    assert sampler.k == 1
+    check_fldr_sampler(sampler)
+
+def test_fldr_sampler_sample_n():
+    sampler = FLDRSampler([10, 1, 4])
+    sampler.update(0, 2)
+    samples = sampler.sample_n(100000, numpy.random.RandomState(1))
+    frequencies = numpy.bincount(samples, minlength=4)[1:] / len(samples)
+    assert numpy.allclose(frequencies, [2/7, 1/7, 4/7], atol=.01)
+
+def test_fldr_sampler_large():
+    # Z is above 2^64 and 2^128, so k needs more than one machine word.
+    for weights in [[2**63 + 1, 2**64 - 1, 7], [5**60, 3**90, 2**130 + 7]]:
+        sampler = FLDRSampler(weights)
+        assert 64 < sampler.k
+        check_fldr_sampler(sampler)
+        sampler.update(2, 1)
+        check_fldr_sampler(sampler)
+        samples = sampler.sample_n(20000, numpy.random.RandomState(1))
+        assert set(samples) <= {1, 2, 3}
+
+def test_fldr_preprocess_cli(tmp_path):
+    # The CLI in c/preprocess.c, built without GSL, reads 64-bit weights.
+    csrc = get_c_sources()
+    if shutil.which('gcc') is None or csrc is None:
+        pytest.skip('requires gcc and the C sources')
+    prog = str(tmp_path / 'preprocess.out')
+    sources = [os.path.join(csrc, f)
+        for f in ['fldr.c', 'readio.c', 'preprocess.c']]
+    subprocess.check_call(['gcc', '-DSAMPLE_NO_GSL', '-o', prog] + sources)
+    weights = [2**63 + 1, 2**62 + 3, 5, 2**40]
+    Z = sum(weights)
+    assert 2**32 < Z < 2**64
+    def run(Z):
+        path = str(tmp_path / 'dist')
+        with open(path, 'w') as f:
+            f.write('%d\n%d %s\n'
+                % (Z, len(weights), ' '.join(map(str, weights))))
+        return subprocess.run([prog, path], stdout=subprocess.PIPE,
+            universal_newlines=True)
+    result = run(Z)
+    assert result.returncode == 0
+    sampler = FLDRSampler(weights)
+    assert result.stdout.split()[0] == '%dc' % (sampler.h[-1],)
+    assert run(Z + 1).returncode == 1
@@ -0,0 +1,93 @@
+# Released under Apache 2.0; refer to LICENSE.txt
+
+import numpy
+import pytest
+
+from discrete_sampling.chacha import ChaCha20
+from discrete_sampling.chacha import chacha20_blocks
+
+from discrete_sampling.flip import BACKENDS
+from discrete_sampling.flip import BitStream
+from discrete_sampling.flip import BufferedBitStream
+from discrete_sampling.flip import get_random_words
+from discrete_sampling.flip import make_rng
+from discrete_sampling.utils import bits_to_int
+from discrete_sampling.utils import randint
+
+def test_buffered_bitstream_bits():
+    words = get_random_words(numpy.random.RandomState(1), 20).tolist()
+    bits = [(w >> (63 - i)) & 1 for w in words for i in range(64)]
+    bitstream = BufferedBitStream(numpy.random.RandomState(1), block=7)
+    assert [next(bitstream) for _i in range(len(bits))] == bits
+    assert bitstream.calls == len(bits)
+    assert bitstream.words == len(words)
+
+def test_buffered_bitstream_take():
+    bitstream0 = BufferedBitStream(numpy.random.default_rng(2), block=3)
+    bitstream1 = BufferedBitStream(numpy.random.default_rng(2), block=3)
+    for m in [1, 5, 64, 0, 63, 130, 7, 200]:
+        x = bitstream0.take(m)
+        bits = [next(bitstream1) for _i in range(m)]
+        assert x == (bits_to_int(bits) if bits else 0)
+    assert bitstream0.calls == bitstream1.calls
+    assert randint(10, bitstream0) < 2**10
+    assert bitstream0.calls == bitstream1.calls + 10
+
+def test_buffered_bitstream_peek():
+    bitstream0 = BufferedBitStream(numpy.random.default_rng(3), block=2)
+    bitstream1 = BufferedBitStream(numpy.random.default_rng(3), block=2)
+    for m in [3, 64, 1, 200, 0, 100, 61]:
+        x = bitstream0.peek(m + 5)
+        assert bitstream0.peek(m) == x >> 5
+        assert bitstream0.take(m) == bitstream1.take(m) == x >> 5
+    assert bitstream0.calls == bitstream1.calls
+
+def test_buffered_bitstream_bytes():
+    words = get_random_words(numpy.random.RandomState(4), 6).tolist()
+    bitstream = BufferedBitStream(numpy.random.RandomState(4), block=3)
+    assert next(bitstream) == words[0] >> 63
+    # The buffered words come first, then fresh words from rng.
+    data = get_random_words(bitstream, 4)
+    assert data.tolist() == words[1:5]
+    assert bitstream.calls == 1 + 4*64
+    assert bitstream.words == 5
+    # The bits of the current word are not lost.
+    assert next(bitstream) == (words[0] >> 62) & 1
+
+def test_buffered_bitstream_urandom():
+    bitstream = BufferedBitStream(block=2)
+    bits = [next(bitstream) for _i in range(1000)]
+    assert set(bits) == {0, 1}
+    assert bitstream.words == 16
+
+def test_bitstream_take():
+    bitstream0 = BitStream(10, numpy.random.RandomState(1))
+    bitstream1 = BitStream(10, numpy.random.RandomState(1))
+    x = randint(25, bitstream0)
+    bits = [next(bitstream1) for _i in range(25)]
+    assert x == bits_to_int(bits)
+    assert bitstream0.calls == bitstream1.calls == 25
+
+def test_chacha20_rfc7539():
+    # Test vector from Section 2.3.2 of RFC 7539.
+    key = bytes(range(32))
+    nonce = bytes.fromhex('000000090000004a00000000')
+    block = chacha20_blocks(key, nonce, 1, 1)
+    assert block[:16].hex() == '10f1e7e4d13b5915500fdd1fa32071c4'
+    assert block[-16:].hex() == 'b5129cd1de164eb9cbd083e8a2503c4e'
+    rng = ChaCha20(key, nonce, 1)
+    assert b''.join(rng.bytes(m) for m in [5, 100, 0, 23]) \
+        == chacha20_blocks(key, nonce, 1, 2)
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_make_rng(backend):
+    bitstream = BufferedBitStream(make_rng(backend, seed=1), block=4)
+    bits = [next(bitstream) for _i in range(2000)]
+    assert abs(sum(bits) - 1000) < 150
+    if backend != 'urandom':
+        bitstream_seed = BufferedBitStream(make_rng(backend, seed=1), block=3)
+        assert bitstream_seed.take(2000) == bits_to_int(bits)
+
+def test_make_rng_unknown():
+    with pytest.raises(ValueError):
+        make_rng('mt19937')
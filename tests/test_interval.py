@@ -2,11 +2,16 @@
 
 from collections import Counter
 from fractions import Fraction
+from itertools import product
 
 import numpy
+import pytest
 
 from discrete_sampling.flip import BitStream
+from discrete_sampling.construct import construct_sample_interval_from_weights
 from discrete_sampling.interval import sample_interval
+from discrete_sampling.sample import sample_interval as sample_interval_exact
+from discrete_sampling.sample import sample_interval_batch
 
 def test_sample_interval_crash():
     rng = numpy.random.RandomState(1)
@@ -22,3 +27,37 @@ def test_sample_interval_crash():
     assert low <= Counter(samples)[0] / n <= high
     assert low <= Counter(samples)[1] / n <= high
     assert low <= Counter(samples)[2] / n <= high
+
+weights_list = [
+    [1, 2],
+    [1, 6, 10, 2],
+    [0, 3, 0, 8, 0],
+    [5, 0, 0],
+    [1000, 1, 1, 998, 7],
+]
+
+@pytest.mark.parametrize('weights', weights_list)
+def test_sample_interval_exact(weights):
+    cdf, Z, _k = construct_sample_interval_from_weights(weights)
+    L = 12
+    counts = Counter()
+    for bits in product([0, 1], repeat=L):
+        try:
+            counts[sample_interval_exact(cdf, Z, iter(bits))] += 1
+        except StopIteration:
+            pass
+    # Only the dyadic intervals which straddle cdf[i] and cdf[i+1] are
+    # undecided after L bits, so outcome i misses at most two of them.
+    for i, w in enumerate(weights):
+        deficit = Fraction(w * 2**L, sum(weights)) - counts[i]
+        assert 0 <= deficit < 2
+
+@pytest.mark.parametrize('weights', weights_list + [[2**70, 3, 2**69 + 1]])
+def test_sample_interval_batch(weights):
+    cdf, Z, _k = construct_sample_interval_from_weights(weights)
+    N = 50000
+    samples = sample_interval_batch(cdf, Z, N, numpy.random.default_rng(1))
+    frequencies = numpy.bincount(samples, minlength=len(weights)) / N
+    assert numpy.allclose(frequencies, [w / sum(weights) for w in weights],
+        atol=.01)
+
@@ -1,7 +1,13 @@
 # Released under Apache 2.0; refer to LICENSE.txt
 
+import pytest
+
+from discrete_sampling.matrix import make_ddg_matrix
+from discrete_sampling.packing import make_dyadic_encoding
 from discrete_sampling.packing import pack_tree
+from discrete_sampling.sample import sample_ky_encoding
 from discrete_sampling.tree import make_ddg_tree
+from discrete_sampling.utils import get_bitstrings
 
 def test_one_back_edge():
     k, l = 4, 0
@@ -22,3 +28,36 @@ def test_one_back_edge():
 
     leaves_twelve = sum(1 for b in encoding.values() if b == -2)
     assert leaves_twelve == 2
+
+@pytest.mark.parametrize('Ms, k', [
+    ([3, 12, 1], 4),
+    ([1, 1, 1, 1], 2),
+    ([8, 16, 2, 4, 2], 5),
+    ([0, 5, 0, 7, 3, 1, 0, 16], 5),
+    ([1, 0, 1, 3, 6, 13, 39, 2, 3, 60], 7),
+])
+def test_make_dyadic_encoding(Ms, k):
+    P, kp, lp = make_ddg_matrix(Ms, k, k)
+    root = make_ddg_tree(P, kp, lp)
+    encoding = {}
+    pack_tree(encoding, root, 0)
+    enc_tree = [encoding[i] for i in range(len(encoding))]
+
+    enc, depth = make_dyadic_encoding(Ms, k)
+    assert len(enc) == len(enc_tree)
+    assert depth == kp
+    # Both encodings map every k-bit string to the same outcome.
+    for bits in get_bitstrings(k):
+        result0 = sample_ky_encoding(enc_tree, (int(b) for b in bits))
+        result1 = sample_ky_encoding(enc, (int(b) for b in bits))
+        assert result0 == result1
+
+def test_make_dyadic_encoding_deep():
+    # A geometric distribution whose tree is as deep as k.
+    k = 3000
+    Ms = [1 << (k - j) for j in range(1, k)] + [1]
+    enc, depth = make_dyadic_encoding(Ms + [1], k)
+    assert depth == k
+    assert len(enc) == 3*k + 1
+    assert sample_ky_encoding(enc, iter([1])) == 1
+    assert sample_ky_encoding(enc, iter([0]*(k-1) + [1])) == k
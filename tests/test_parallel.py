@@ -0,0 +1,41 @@
+# Released under Apache 2.0; refer to LICENSE.txt
+
+import mmap
+
+from fractions import Fraction
+
+import numpy
+
+from discrete_sampling.fldr import FLDRSampler
+from discrete_sampling.parallel import parallel_sample
+from discrete_sampling.samplers import get_sampler
+
+def test_parallel_sample_fldr():
+    sampler = FLDRSampler([1, 6, 10, 2])
+    samples0 = parallel_sample(sampler, 40000, workers=3, seed=1, chunk=5000)
+    samples1 = parallel_sample(sampler, 40000, workers=3, seed=1, chunk=5000)
+    assert numpy.all(samples0 == samples1)
+    counts = numpy.bincount(samples0, minlength=5)
+    assert counts[0] == 0
+    assert numpy.allclose(counts[1:] / 40000, [1/19, 6/19, 10/19, 2/19],
+        atol=.01)
+    samples2 = parallel_sample(sampler, 40000, workers=2, seed=1, chunk=5000)
+    assert not numpy.all(samples0 == samples2)
+
+def test_parallel_sample_rejection_matrix_cached():
+    p_target = [Fraction(1, 3), Fraction(2, 3)]
+    sampler = get_sampler('rej.matc').from_target(p_target)
+    samples = parallel_sample(sampler, 10001, workers=1, seed=2)
+    assert len(samples) == 10001
+    assert abs(numpy.mean(samples == 1) - 1/3) < .02
+
+def test_parallel_sample_shared_output():
+    sampler = FLDRSampler([1, 2])
+    samples = parallel_sample(sampler, 1000, workers=2, seed=3)
+    # The result is the shared memory written by the workers, not a copy.
+    assert not samples.flags['OWNDATA']
+    assert isinstance(samples.base, mmap.mmap)
+    assert set(samples) <= {1, 2}
+    view = samples[10:]
+    del samples
+    assert set(view) <= {1, 2}
@@ -0,0 +1,155 @@
+# Released under Apache 2.0; refer to LICENSE.txt
+
+import os
+import shutil
+import subprocess
+
+from fractions import Fraction
+
+import numpy
+import pytest
+
+from discrete_sampling.construct import construct_sample_alias
+from discrete_sampling.construct import construct_sample_interval
+from discrete_sampling.construct import construct_sample_ky_encoding
+from discrete_sampling.construct import construct_sample_ky_matrix
+from discrete_sampling.construct import construct_sample_ky_matrix_cached
+from discrete_sampling.construct import construct_sample_rejection_binary_search
+from discrete_sampling.construct import construct_sample_rejection_hash_table
+from discrete_sampling.construct import construct_sample_rejection_uniform
+
+from discrete_sampling import readio
+from discrete_sampling import writeio
+
+from discrete_sampling.flip import BitStream
+from discrete_sampling.sample import sample_ky_encoding
+
+from discrete_sampling.tests.utils import get_c_sources
+
+p_target = [Fraction(1, 19), Fraction(6, 19), Fraction(10, 19),
+    Fraction(2, 19)]
+
+structures = [
+    (construct_sample_ky_encoding, 'ky_encoding'),
+    (construct_sample_ky_matrix, 'ky_matrix'),
+    (construct_sample_ky_matrix_cached, 'ky_matrix_cached'),
+    (construct_sample_rejection_uniform, 'rejection_uniform'),
+    (construct_sample_rejection_hash_table, 'rejection_hash_table'),
+    (construct_sample_rejection_binary_search, 'rejection_binary_search'),
+    (construct_sample_interval, 'interval'),
+    (construct_sample_alias, 'alias'),
+]
+@pytest.mark.parametrize('f_construct, kind', structures)
+def test_binary_roundtrip(tmp_path, f_construct, kind):
+    fname = os.path.join(str(tmp_path), 'd.bin')
+    structure = f_construct(p_target)
+    getattr(writeio, 'write_sample_%s_binary' % (kind,))(*structure, fname)
+    assert readio.is_binary(fname)
+    loaded = getattr(readio, 'read_sample_%s_binary' % (kind,))(fname)
+    assert len(loaded) == len(structure)
+    for x, y in zip(structure, loaded):
+        if isinstance(y, numpy.memmap):
+            assert y.offset % writeio.BINARY_PAGE == 0
+            assert y.dtype == numpy.dtype('<i4')
+        assert numpy.array_equal(x, y)
+
+def test_binary_int64_scalars(tmp_path):
+    fname = os.path.join(str(tmp_path), 'd.bin')
+    writeio.write_sample_fdr_binary(7, fname)
+    assert readio.read_sample_fdr_binary(fname) == (7,)
+    writeio.write_sample_inversion_bernoulli_binary(3, 2**40, fname)
+    assert readio.read_sample_inversion_bernoulli_binary(fname) == (3, 2**40)
+    writeio.write_sample_rejection_uniform_binary([1, 2**40], 2**41, 2, fname)
+    Ms, M, n = readio.read_sample_rejection_uniform_binary(fname)
+    assert Ms.dtype == numpy.dtype('<i8')
+    assert list(Ms) == [1, 2**40]
+    with pytest.raises(AssertionError):
+        readio.read_sample_interval_binary(fname)
+
+def test_binary_int64_overflow(tmp_path):
+    fname = os.path.join(str(tmp_path), 'd.bin')
+    invalid = [
+        ('inversion_bernoulli', [3, 2**63]),
+        ('rejection_uniform', [[1, 2**63], 2**62, 2]),
+        ('rejection_uniform', [numpy.array([1, 2**63], dtype=numpy.uint64),
+            2**62, 2]),
+        ('rejection_uniform', [[1, -2**63 - 1], 2**62, 2]),
+    ]
+    for kind, fields in invalid:
+        with pytest.raises(AssertionError):
+            writeio.write_binary(kind, fields, fname)
+        assert not os.path.exists(fname)
+    writeio.write_binary('inversion_bernoulli', [3, 2**63 - 1], fname)
+    assert readio.read_sample_inversion_bernoulli_binary(fname) \
+        == (3, 2**63 - 1)
+
+def test_binary_sample(tmp_path):
+    fname = os.path.join(str(tmp_path), 'd.bin')
+    enc, n, k = construct_sample_ky_encoding(p_target)
+    writeio.write_sample_ky_encoding_binary(enc, n, k, fname)
+    enc_mm, _n, _k = readio.read_sample_ky_encoding_binary(fname)
+    bits0 = BitStream(k, numpy.random.RandomState(1))
+    bits1 = BitStream(k, numpy.random.RandomState(1))
+    samples0 = [sample_ky_encoding(enc, bits0) for _i in range(1000)]
+    samples1 = [sample_ky_encoding(enc_mm, bits1) for _i in range(1000)]
+    assert samples0 == samples1
+
+c_samplers = [
+    (construct_sample_ky_encoding, 'ky_encoding', 'ky.enc'),
+    (construct_sample_ky_matrix, 'ky_matrix', 'ky.mat'),
+    (construct_sample_ky_matrix_cached, 'ky_matrix_cached', 'rej.matc'),
+    (construct_sample_rejection_uniform, 'rejection_uniform', 'rej.uniform'),
+    (construct_sample_rejection_hash_table, 'rejection_hash_table',
+        'rej.table'),
+    (construct_sample_rejection_binary_search, 'rejection_binary_search',
+        'rej.binary'),
+    (construct_sample_interval, 'interval', 'interval'),
+    (construct_sample_alias, 'alias', 'alias.exact'),
+]
+def test_binary_c_loader(tmp_path):
+    # The CLI in c/main.c, built without GSL, maps the binary files.
+    csrc = get_c_sources()
+    if shutil.which('gcc') is None or csrc is None:
+        pytest.skip('requires gcc and the C sources')
+    prog = str(tmp_path / 'main.out')
+    sources = [os.path.join(csrc, f) for f in
+        ['flip.c', 'fldr.c', 'main.c', 'readio.c', 'sample.c', 'utils.c']]
+    subprocess.check_call(['gcc', '-DSAMPLE_NO_GSL', '-o', prog]
+        + sources + ['-lm'])
+    def run(sampler, fname):
+        return subprocess.run([prog, '1', '1000', sampler, fname],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            universal_newlines=True)
+    fname_txt = str(tmp_path / 'd.txt')
+    fname_bin = str(tmp_path / 'd.bin')
+    for f_construct, kind, sampler in c_samplers:
+        structure = f_construct(p_target)
+        getattr(writeio, 'write_sample_%s' % (kind,))(*structure, fname_txt)
+        writeio.write_binary(kind, structure, fname_bin)
+        result_txt = run(sampler, fname_txt)
+        result_bin = run(sampler, fname_bin)
+        assert result_bin.returncode == 0
+        # Same seed and structure, so the same number of PRNG calls.
+        assert result_txt.stdout.split()[-1] == result_bin.stdout.split()[-1]
+    # Wrong kind.
+    assert run('ky.enc', fname_bin).returncode == 1
+    # Array of int64 entries.
+    writeio.write_binary('rejection_uniform', [[1, 2**40], 2**41, 2],
+        fname_bin)
+    assert run('rej.uniform', fname_bin).returncode == 1
+    # Unsupported version, and array past the end of file.
+    writeio.write_binary('alias', construct_sample_alias(p_target), fname_bin)
+    with open(fname_bin, 'rb') as f:
+        data = f.read()
+    corrupt = [
+        data[:8] + b'\x02' + data[9:],
+        data[:writeio.BINARY_PAGE],
+    ]
+    for content in corrupt:
+        with open(fname_bin, 'wb') as f:
+            f.write(content)
+        result = run('alias.exact', fname_bin)
+        assert result.returncode == 1
+        assert result.stderr.startswith(fname_bin)
+        # The loader returns the error to main, which stops before sampling.
+        assert len(result.stdout.splitlines()) == 1
@@ -9,7 +9,10 @@ import numpy
 
 from numpy.random import RandomState
 
+from discrete_sampling.alias import alias_preprocess_weights
 from discrete_sampling.construct import construct_sample_alias
+from discrete_sampling.construct import construct_sample_alias_from_weights
+from discrete_sampling.construct import construct_sample_fldr_columns
 from discrete_sampling.construct import construct_sample_interval
 from discrete_sampling.construct import construct_sample_rejection_binary_search
 from discrete_sampling.construct import construct_sample_rejection_encoding
@@ -28,12 +31,16 @@ from discrete_sampling.rejection import get_rejection_probabilities
 from discrete_sampling.rejection import make_rejection_ddg_matrix
 
 from discrete_sampling.sample import sample_alias
+from discrete_sampling.sample import sample_alias_batch
+from discrete_sampling.sample import sample_fldr_columns
+from discrete_sampling.sample import sample_fldr_columns_batch
 from discrete_sampling.sample import sample_interval
 from discrete_sampling.sample import sample_rejection_binary_search
 from discrete_sampling.sample import sample_rejection_encoding
 from discrete_sampling.sample import sample_rejection_hash_table
 from discrete_sampling.sample import sample_rejection_matrix
 from discrete_sampling.sample import sample_rejection_matrix_cached
+from discrete_sampling.sample import sample_rejection_matrix_cached_batch
 from discrete_sampling.sample import sample_rejection_uniform
 
 from discrete_sampling.tests.utils import get_chisquare_pval
@@ -161,7 +168,91 @@ def test_make_rejection_ddg_matrix(p_target):
     assert k == l == get_rejection_precision(p_target)
 
     h_rj, T_rej = make_rejection_ddg_matrix(p_target)
-    assert h_rj == h
+    assert h_rj.dtype == T_rej.dtype == numpy.int32
+    assert T_rej.flags['C_CONTIGUOUS']
+    assert list(h_rj) == h
 
     T_rej_reshape = numpy.reshape(T_rej, (len(T), k))
     assert numpy.all(T_rej_reshape == T)
+
+@pytest.mark.parametrize('p_target', p_targets)
+def test_sample_rejection_matrix_cached_batch(p_target):
+    k, l, h, T = construct_sample_rejection_matrix_cached(p_target)
+    rng = RandomState(1)
+    N_sample = 100000
+    samples = sample_rejection_matrix_cached_batch(k, l, h, T, N_sample, rng)
+    assert len(samples) == N_sample
+    counts = numpy.bincount(samples, minlength=len(p_target)+1)
+    assert counts[0] == 0
+    frequencies = counts[1:] / N_sample
+    assert numpy.allclose(frequencies, [float(p) for p in p_target], atol=.01)
+
+@pytest.mark.parametrize('p_target', p_targets)
+def test_construct_sample_fldr_columns(p_target):
+    n, h, offsets, H = construct_sample_fldr_columns(p_target)
+    h_rej, T_rej = make_rejection_ddg_matrix(p_target)
+    k = len(h_rej)
+    assert n == len(p_target)
+    assert h == list(h_rej)
+    assert len(H) == sum(h) == offsets[-1]
+    for j in range(k):
+        column = [T_rej[d*k + j] for d in range(h[j])]
+        assert H[offsets[j]:offsets[j+1]] == column
+    # Enumerate all k-bit strings, labelling rejection as outcome n+1, so
+    # that each outcome is reached by exactly its numerator of strings.
+    Z = get_common_denominator(p_target)
+    counts = [0] * (n + 2)
+    for bits in product([0, 1], repeat=k):
+        counts[sample_fldr_columns(n + 1, h, offsets, H, iter(bits))] += 1
+    assert counts[1:] == [int(Z*p) for p in p_target] + [2**k - Z]
+    samples = sample_fldr_columns_batch(n, h, offsets, H, 100000,
+        RandomState(1))
+    frequencies = numpy.bincount(samples, minlength=n+1)[1:] / len(samples)
+    assert numpy.allclose(frequencies, [float(p) for p in p_target], atol=.01)
+
+@pytest.mark.parametrize('Ms', [
+    [1, 6, 10, 2],
+    [0, 3, 0, 8],
+    [5, 5, 5],
+    [2**70 + 1, 3**50, 7, 0, 2**64],
+])
+def test_alias_preprocess_weights(Ms):
+    Z = sum(Ms)
+    K, Q, j = alias_preprocess_weights(Ms, Z)
+    assert K == len(Ms)
+    assert all(0 <= q <= Z for q in Q)
+    # Column l gives l with probability Q[l]/Z and j[l] otherwise, so the
+    # total mass of outcome i over the K columns is K*Ms[i]/Z.
+    mass = list(Q)
+    for l in range(K):
+        mass[j[l]] += Z - Q[l]
+    assert mass == [K * M for M in Ms]
+
+@pytest.mark.parametrize('p_target', p_targets)
+def test_sample_alias_batch(p_target):
+    n, qs, Ms, j = construct_sample_alias(p_target)
+    N_sample = 100000
+    samples = sample_alias_batch(n, qs, Ms, j, N_sample, RandomState(1))
+    counts = numpy.bincount(samples, minlength=len(p_target)+1)
+    assert counts[0] == 0
+    frequencies = counts[1:] / N_sample
+    assert numpy.allclose(frequencies, [float(p) for p in p_target], atol=.01)
+
+def test_sample_alias_batch_large():
+    # n*Z exceeds 2^64, so the batch falls back to the bitwise sampler.
+    n, qs, Ms, j = construct_sample_alias_from_weights([2**63, 2**63 - 1])
+    samples = sample_alias_batch(n, qs, Ms, j, 1000, RandomState(1))
+    assert set(samples) == {1, 2}
+
+def test_make_rejection_ddg_matrix_zeros():
+    p_target = [Fraction(0), Fraction(3, 11), Fraction(0), Fraction(8, 11)]
+    h, H = make_rejection_ddg_matrix(p_target)
+    # Numerators are 0, 3, 0, 8, and 16 - 11 = 5 for rejection.
+    assert list(h) == [1, 1, 1, 2]
+    assert list(H) == [
+        3, 4, 1, 1,
+        -1, -1, -1, 4,
+        -1, -1, -1, -1,
+        -1, -1, -1, -1,
+        -1, -1, -1, -1,
+    ]
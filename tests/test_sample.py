@@ -16,10 +16,22 @@ from discrete_sampling.tree import make_ddg_tree
 from discrete_sampling.sample import sample_fdr
 from discrete_sampling.sample import sample_inversion_bernoulli
 from discrete_sampling.sample import sample_ky_encoding
+from discrete_sampling.sample import sample_ky_encoding_table
 from discrete_sampling.sample import sample_ky_matrix
 from discrete_sampling.sample import sample_ky_matrix_cached
+from discrete_sampling.sample import sample_ky_word
+from discrete_sampling.sample import sample_rejection_encoding
+from discrete_sampling.sample import sample_rejection_encoding_table
+
+from discrete_sampling.construct import construct_sample_ky_encoding
+from discrete_sampling.construct import construct_sample_ky_encoding_table
+from discrete_sampling.construct import construct_sample_ky_matrix_cached
+from discrete_sampling.construct import construct_sample_ky_word
+from discrete_sampling.construct import construct_sample_rejection_encoding
+from discrete_sampling.construct import construct_sample_rejection_encoding_table
 
 from discrete_sampling.flip import BitStream
+from discrete_sampling.flip import BufferedBitStream
 from discrete_sampling.utils import frac_to_bits_rat
 from discrete_sampling.utils import get_bitstrings
 
@@ -111,3 +123,48 @@ def test_fdr(n):
     samples = [sample_fdr(n, bits) for i in range(N_sample)]
     pval = get_chisquare_pval([1/n]*n, samples)
     assert pval > 0.05
+
+@pytest.mark.parametrize('p_target, width', list(product([
+    [Fraction(1, 3), Fraction(2, 3)],
+    [Fraction(1, 4), Fraction(3, 4)],
+    [Fraction(1, 19), Fraction(6, 19), Fraction(10, 19), Fraction(2, 19)],
+    [Fraction(3, 1009), Fraction(1000, 1009), Fraction(6, 1009)],
+    [Fraction(1)],
+], [64, 5, 1])))
+def test_sample_ky_word(p_target, width):
+    # The word sampler consumes the same bits as the bitwise walk.
+    k, l, h, T = construct_sample_ky_matrix_cached(p_target)
+    structure = construct_sample_ky_word(p_target, width)
+    bitstream0 = BufferedBitStream(numpy.random.default_rng(1), block=3)
+    bitstream1 = BufferedBitStream(numpy.random.default_rng(1), block=3)
+    for _i in range(2000):
+        x = sample_ky_matrix_cached(k, l, h, T, bitstream0) \
+            if 1 < len(T) else 1
+        assert sample_ky_word(*structure, bitstream1) == x
+    assert bitstream0.calls == bitstream1.calls
+
+@pytest.mark.parametrize('p_target, r', list(product([
+    [Fraction(1, 3), Fraction(2, 3)],
+    [Fraction(1, 19), Fraction(6, 19), Fraction(10, 19), Fraction(2, 19)],
+    [Fraction(3, 1009), Fraction(1000, 1009), Fraction(6, 1009)],
+    [Fraction(1)],
+], [1, 4, 8])))
+def test_sample_encoding_table(p_target, r):
+    # The table walk consumes the same bits as the bitwise walk.
+    enc, _n, _k = construct_sample_ky_encoding(p_target)
+    structure = construct_sample_ky_encoding_table(p_target, r)
+    bitstream0 = BufferedBitStream(numpy.random.default_rng(1), block=3)
+    bitstream1 = BufferedBitStream(numpy.random.default_rng(1), block=3)
+    for _i in range(2000):
+        x = sample_ky_encoding(enc, bitstream0)
+        assert sample_ky_encoding_table(*structure, bitstream1) == x
+    assert bitstream0.calls == bitstream1.calls
+    if len(p_target) == 1:
+        return
+    enc, n, _k = construct_sample_rejection_encoding(p_target)
+    structure = construct_sample_rejection_encoding_table(p_target, r)
+    for _i in range(2000):
+        x = sample_rejection_encoding(enc, n, bitstream0)
+        assert sample_rejection_encoding_table(*structure, bitstream1) == x
+    assert bitstream0.calls == bitstream1.calls
+
@@ -0,0 +1,97 @@
+# Released under Apache 2.0; refer to LICENSE.txt
+
+import os
+
+from fractions import Fraction
+
+import numpy
+import pytest
+
+from discrete_sampling.entropy import compute_ddg_expected_bits
+from discrete_sampling.entropy import compute_fdr_expected_bits
+from discrete_sampling.flip import BufferedBitStream
+from discrete_sampling.samplers import SAMPLERS
+from discrete_sampling.samplers import Sampler
+from discrete_sampling.samplers import get_sampler
+
+p_target = [Fraction(1, 19), Fraction(6, 19), Fraction(10, 19),
+    Fraction(2, 19)]
+
+@pytest.mark.parametrize('name', list(SAMPLERS))
+def test_sampler(name):
+    bitstream = BufferedBitStream(numpy.random.default_rng(1))
+    sampler = get_sampler(name).from_target(p_target, bitstream)
+    N = 20000
+    samples = [sampler.sample() for _i in range(N)]
+    counts = numpy.bincount(samples, minlength=len(p_target)+1)
+    assert counts[0] == 0
+    assert numpy.allclose(counts[1:] / N, [float(p) for p in p_target],
+        atol=.015)
+    assert numpy.allclose(bitstream.calls / N,
+        sampler.expected_bits_per_sample, rtol=.05)
+    assert 0 < sampler.nbytes
+    calls = bitstream.calls
+    samples = sampler.sample_n(1000)
+    assert samples.shape == (1000,)
+    assert set(samples) <= {1, 2, 3, 4}
+    # The bits of sample_n are drawn through the bitstream.
+    assert calls < bitstream.calls
+
+@pytest.mark.parametrize('name', ['ky.enc', 'rej.matc', 'alias.exact',
+    'fldr.columns', 'ky.enc.table', 'rej.enc.table'])
+def test_sampler_save_load(tmp_path, name):
+    fname = os.path.join(str(tmp_path), 'd.bin')
+    cls = get_sampler(name)
+    sampler = cls.from_target(p_target,
+        BufferedBitStream(numpy.random.default_rng(2)))
+    sampler.save(fname)
+    loaded = cls.load(fname, BufferedBitStream(numpy.random.default_rng(2)))
+    for x, y in zip(sampler.structure(), loaded.structure()):
+        assert numpy.array_equal(x, y)
+    assert loaded.nbytes == sampler.nbytes
+    samples0 = [sampler.sample() for _i in range(100)]
+    samples1 = [loaded.sample() for _i in range(100)]
+    assert samples0 == samples1
+
+def test_sampler_save_load_no_format(tmp_path):
+    fname = os.path.join(str(tmp_path), 'd.bin')
+    cls = get_sampler('ky.word')
+    assert cls.kind is None
+    sampler = cls.from_target(p_target)
+    with pytest.raises(TypeError):
+        sampler.save(fname)
+    assert not os.path.exists(fname)
+    get_sampler('ky.enc').from_target(p_target).save(fname)
+    with pytest.raises(TypeError):
+        cls.load(fname)
+
+def test_sampler_abstract():
+    with pytest.raises(TypeError):
+        Sampler(())
+
+def test_sampler_slots():
+    sampler = get_sampler('rej.table').from_target(p_target)
+    with pytest.raises(AttributeError):
+        sampler.foo = 1
+    with pytest.raises(ValueError):
+        get_sampler('rej.foo')
+
+def test_compute_expected_bits():
+    # Dyadic: 1/2, 1/4, 1/4.
+    assert compute_ddg_expected_bits([1, 2], 2, 2) == 1.5
+    # Uniform on three outcomes: 1/3 = 0.010101... so h = [0, 3].
+    assert compute_ddg_expected_bits([0, 3], 2, 0) == pytest.approx(8/3)
+    assert compute_fdr_expected_bits(1) == pytest.approx(2)
+    assert compute_fdr_expected_bits(4) == 2
+    assert compute_fdr_expected_bits(3) == pytest.approx(8/3)
+
+@pytest.mark.parametrize('name', list(SAMPLERS))
+def test_sampler_from_weights(name):
+    cls = get_sampler(name)
+    expected = cls.from_target(p_target).structure()
+    # Unreduced weights, as a list and as a numpy array.
+    for weights in [[3, 18, 30, 6], numpy.array([3, 18, 30, 6])]:
+        structure = cls.from_weights(weights).structure()
+        assert len(structure) == len(expected)
+        for x, y in zip(structure, expected):
+            assert x == y
@@ -0,0 +1,77 @@
+# Released under Apache 2.0; refer to LICENSE.txt
+
+import os
+
+from fractions import Fraction
+
+import numpy
+import pytest
+
+from discrete_sampling.samplers import get_sampler
+from discrete_sampling.select import METHODS
+from discrete_sampling.select import calibrate
+from discrete_sampling.select import choose_sampler
+from discrete_sampling.select import estimate_costs
+from discrete_sampling.select import get_method_cells
+from discrete_sampling.select import read_costs
+from discrete_sampling.select import write_costs
+from discrete_sampling.utils import sample_dirichlet_multinomial_positive
+
+def test_estimate_costs():
+    p_target = [Fraction(1, 19), Fraction(6, 19), Fraction(10, 19),
+        Fraction(2, 19)]
+    estimates = estimate_costs(p_target)
+    assert set(estimates) == set(METHODS)
+    for method in METHODS:
+        sampler = get_sampler(method).from_target(p_target)
+        bits = sampler.expected_bits_per_sample
+        assert bits == pytest.approx(estimates[method]['bits'], abs=1.5)
+        assert sampler.nbytes <= estimates[method]['nbytes']
+
+def test_choose_sampler_budget():
+    rng = numpy.random.RandomState(1)
+    Z = 100003
+    p_target = sample_dirichlet_multinomial_positive(1, 1000, Z, rng)
+    estimates = estimate_costs(p_target)
+    # The exact Knuth-Yao tree of a large prime Z is enormous.
+    assert 10**8 < estimates['ky.enc']['nbytes']
+    assert estimates['rej.table']['nbytes'] == 4*Z
+    method = choose_sampler(p_target, budget=4*Z - 1)
+    assert method not in ['ky.enc', 'rej.table']
+    assert choose_sampler(p_target, budget=4*1001) == 'interval'
+    with pytest.raises(ValueError):
+        choose_sampler(p_target, budget=100)
+
+def test_choose_sampler_amortised():
+    p_target = [Fraction(1, 2), Fraction(1, 2)]
+    costs = {
+        'rej.table': {'cell': 1., 'bit': 0., 'sample': 1.},
+        'interval': {'cell': 0., 'bit': 0., 'sample': 2.},
+    }
+    methods = ['rej.table', 'interval']
+    assert choose_sampler(p_target, 100, None, methods, costs) == 'rej.table'
+    assert choose_sampler(p_target, 100, 1, methods, costs) == 'interval'
+    assert choose_sampler(p_target, 100, 10, methods, costs) == 'rej.table'
+
+def test_calibrate(tmp_path):
+    costs = calibrate(Ns=(4, 8), num_samples=200)
+    assert set(costs) == set(METHODS)
+    assert all(0 <= c for cost in costs.values() for c in cost.values())
+    fname = os.path.join(str(tmp_path), 'costs.json')
+    write_costs(costs, fname)
+    assert read_costs(fname) == costs
+    p_target = [Fraction(1, 3), Fraction(2, 3)]
+    assert choose_sampler(p_target, 10**6, costs=read_costs(fname)) \
+        in METHODS
+
+def test_method_cells_ky_bound():
+    # The depth is the period of the expansion, not Z - 1.
+    assert get_method_cells('ky.enc', 2, 4095) == (3*2*12, 12)
+    assert get_method_cells('ky.enc', 2, 2**61 - 1) == (3*2*61, 61)
+    assert get_method_cells('ky.enc', 2, 100003) == (3*2*100002, 100002)
+    # Beyond 64 bits the period is bounded without factoring.
+    Z = 2**127 - 1
+    assert get_method_cells('ky.enc', 2, Z) == (3*2*(Z - 1), Z - 1)
+    assert get_method_cells('ky.enc', 2, 3 * 2**5) == (3*2*7, 7)
+    assert get_method_cells('ky.enc', 2, 2**5) == (3*2*5, 5)
+    assert get_method_cells('rej.table', 2, 2**5 + 1)[1] == 6
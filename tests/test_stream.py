@@ -0,0 +1,54 @@
+# Released under Apache 2.0; refer to LICENSE.txt
+
+from fractions import Fraction
+from itertools import islice
+from math import log2
+
+import numpy
+import pytest
+
+from discrete_sampling.entropy import compute_fdr_expected_bits
+from discrete_sampling.flip import BufferedBitStream
+from discrete_sampling.samplers import get_sampler
+from discrete_sampling.stream import iter_fdr
+from discrete_sampling.stream import iter_samples
+
+@pytest.mark.parametrize('n', [1, 3, 7, 12])
+def test_iter_fdr(n):
+    bitstream = BufferedBitStream(numpy.random.default_rng(1))
+    N = 30000
+    samples = list(islice(iter_fdr(n, bitstream), N))
+    counts = numpy.bincount(samples, minlength=n+1)
+    assert counts[0] == 0
+    assert numpy.allclose(counts[1:] / N, 1/n, atol=.015)
+    # Recycling the residue approaches the entropy log2(n).
+    bits = bitstream.calls / N
+    assert bits < log2(n) + .01
+    if n != 1:
+        assert bits < compute_fdr_expected_bits(n)
+
+@pytest.mark.parametrize('name', ['rej.matc', 'rej.uniform', 'alias.exact'])
+def test_iter_samples(name):
+    p_target = [Fraction(1, 19), Fraction(6, 19), Fraction(10, 19),
+        Fraction(2, 19)]
+    sampler = get_sampler(name).from_target(p_target)
+    bitstream = BufferedBitStream(numpy.random.default_rng(2))
+    N = 20000
+    samples = list(islice(iter_samples(sampler, bitstream), N))
+    counts = numpy.bincount(samples, minlength=len(p_target)+1)
+    assert numpy.allclose(counts[1:] / N, [float(p) for p in p_target],
+        atol=.015)
+    assert sampler.bitstream is not bitstream
+
+@pytest.mark.parametrize('name', ['rej.uniform', 'alias.exact'])
+def test_iter_samples_recycle(name):
+    p_target = [Fraction(1, 7), Fraction(2, 7), Fraction(4, 7)]
+    sampler = get_sampler(name).from_target(p_target)
+    bitstream = BufferedBitStream(numpy.random.default_rng(3))
+    N = 20000
+    samples = list(islice(iter_samples(sampler, bitstream), N))
+    counts = numpy.bincount(samples, minlength=len(p_target)+1)
+    assert numpy.allclose(counts[1:] / N, [float(p) for p in p_target],
+        atol=.015)
+    # The residue of each uniform proposal is recycled.
+    assert bitstream.calls / N < sampler.expected_bits_per_sample - .5
@@ -1,8 +1,12 @@
 # Released under Apache 2.0; refer to LICENSE.txt
 
+from fractions import Fraction
+from math import lcm
+
 import pytest
 
 from discrete_sampling.utils import binary_search_interval
+from discrete_sampling.utils import binexp
 from discrete_sampling.utils import bits_to_frac
 from discrete_sampling.utils import encode_binary
 from discrete_sampling.utils import frac_to_bits
@@ -11,7 +15,11 @@ from discrete_sampling.utils import frac_to_bits_rat
 from discrete_sampling.utils import get_Zkl
 from discrete_sampling.utils import get_binary_expansion
 from discrete_sampling.utils import get_binary_expansion_length
+from discrete_sampling.utils import get_common_denominator
+from discrete_sampling.utils import get_common_numerators
 from discrete_sampling.utils import get_k_bit_prefixes
+from discrete_sampling.utils import get_prime_factors
+from discrete_sampling.utils import orderm2
 from discrete_sampling.utils import reduce_fractions
 
 def test_binary_search():
@@ -157,3 +165,50 @@ def test_frac_to_bits_dyadic():
 @pytest.mark.parametrize('a, b', [(1,2), (1,3), (7,8), (3,199)])
 def test_frac_to_bits(a, b):
     assert frac_to_bits_rat(a, b) == get_binary_expansion(a, b)
+
+def test_orderm2_brute_force():
+    for M in range(1, 2000, 2):
+        t = 1
+        while pow(2, t, M) != 1 % M:
+            t += 1
+        assert orderm2(M) == t
+
+def test_orderm2_large():
+    # Mersenne prime 2^61 - 1 and a product of two large primes.
+    assert orderm2(2**61 - 1) == 61
+    M = (2**31 - 1) * 1000000007
+    assert orderm2(M) == lcm(31, orderm2(1000000007))
+    assert pow(2, orderm2(M), M) == 1
+
+def test_get_prime_factors():
+    assert get_prime_factors(1) == {}
+    assert get_prime_factors(360) == {2: 3, 3: 2, 5: 1}
+    assert get_prime_factors(1000000007 * 998244353) \
+        == {1000000007: 1, 998244353: 1}
+
+def test_binexp():
+    assert binexp(1, 2) == ((1,), (0,))
+    assert binexp(1, 3) == ((), (0, 1))
+    assert binexp(2, 12) == ((0,), (0, 1))
+    assert binexp(5, 8) == ((1, 0, 1), (0,))
+    for (a, b) in [(3, 4), (7, 10), (3, 199), (12, 97)]:
+        prefix, suffix = binexp(a, b)
+        k, l = len(prefix + suffix), len(prefix)
+        numerator, denominator = bits_to_frac(prefix + suffix, k, l)
+        assert Fraction(numerator, denominator) == Fraction(a, b)
+
+def test_get_common_denominator_large():
+    # The product of the first 40 primes is about 2^250.
+    primes = [p for p in range(2, 200) if get_prime_factors(p) == {p: 1}][:40]
+    probabilities = [Fraction(1, p) for p in primes]
+    Z = get_common_denominator(probabilities)
+    assert isinstance(Z, int)
+    assert Z == lcm(*primes)
+    assert 2**63 < Z
+    numerators = get_common_numerators(Z, probabilities)
+    assert numerators == [int(Z*p) for p in probabilities]
+    assert all(Fraction(a, Z) == p for a, p in zip(numerators, probabilities))
+    # Truncates like int(Z*p) when Z is not a multiple of the denominator.
+    assert get_common_numerators(10, [Fraction(1, 3), Fraction(2, 3)]) \
+        == [3, 6]
+    assert get_common_denominator([Fraction(1, 2), Fraction(1, 2)]) == 2
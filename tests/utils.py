@@ -1,5 +1,7 @@
 # Released under Apache 2.0; refer to LICENSE.txt
 
+import os
+
 from collections import Counter
 
 from scipy.stats import chisquare
@@ -11,3 +13,21 @@ def get_chisquare_pval(p_target, samples):
     keys = sorted(set(samples))
     f_actual = [counts[k] for k in keys]
     return chisquare(f_expected, f_actual)[1]
+
+def get_c_sources():
+    """Return the directory of the C sources, or None if it is not found.
+
+    The tests may run from a copy under build/ (as in check.sh), so look
+    in $DISCRETE_SAMPLING_CSRC and then in the parents of this file."""
+    path = os.environ.get('DISCRETE_SAMPLING_CSRC')
+    if path:
+        return path if os.path.isdir(path) else None
+    d = os.path.dirname(os.path.abspath(__file__))
+    while True:
+        path = os.path.join(d, 'c')
+        if os.path.isfile(os.path.join(path, 'flip.c')):
+            return path
+        parent = os.path.dirname(d)
+        if parent == d:
+            return None
+        d = parent